@@ -0,0 +1,96 @@
+import os
+import json
+import tempfile
+
+# Per-account settings and their defaults. Empty values fall back to the
+# global configuration from the Post Setup and Settings tabs.
+ACCOUNT_FIELDS = {
+    'name': '',
+    'username': '',
+    'password': '',
+    'session_file': '',
+    'csv_path': '',
+    'images_dir': '',
+    'queue_backend': '',
+    'queue_db': '',
+    'post_delay_min': None,
+    'post_delay_max': None,
+    'api_delay_min': None,
+    'api_delay_max': None,
+    'caption_signature': '',
+    'enabled': True,
+}
+
+
+def account_config(account, base_config):
+    """Worker configuration for an account, layered over the global config"""
+    config = dict(base_config)
+    for field in ACCOUNT_FIELDS:
+        value = account.get(field)
+        if field != 'enabled' and value not in ('', None):
+            config[field] = value
+
+    if not account.get('session_file'):
+        session_dir = os.path.dirname(base_config.get('session_file', '')) or 'sessions'
+        config['session_file'] = os.path.join(session_dir, f"{account['name']}_session.json")
+
+    config['account'] = account['name']
+    return config
+
+
+class AccountRegistry:
+    """Accounts stored in a JSON file, one entry per brand account"""
+
+    def __init__(self, path):
+        self.path = path
+        self.accounts = []
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            self.accounts = []
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.accounts = [dict(ACCOUNT_FIELDS, **account) for account in data.get('accounts', [])]
+
+    def save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix=".json", dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'accounts': self.accounts}, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def names(self):
+        return [account['name'] for account in self.accounts]
+
+    def get(self, name):
+        for account in self.accounts:
+            if account['name'] == name:
+                return account
+        return None
+
+    def set(self, account, previous_name=None):
+        """Add or replace an account, optionally renaming it"""
+        if not account.get('name'):
+            raise ValueError("Account name is required")
+        existing = self.get(previous_name or account['name'])
+        if account['name'] != (previous_name or account['name']) and self.get(account['name']):
+            raise ValueError(f"Account '{account['name']}' already exists")
+
+        account = dict(ACCOUNT_FIELDS, **account)
+        if existing is None:
+            self.accounts.append(account)
+        else:
+            self.accounts[self.accounts.index(existing)] = account
+        self.save()
+
+    def remove(self, name):
+        self.accounts = [account for account in self.accounts if account['name'] != name]
+        self.save()
@@ -0,0 +1,167 @@
+"""Runs many PostingEngines on one asyncio event loop.
+
+Each account is a coroutine instead of a thread. The blocking parts of the
+engine (login, loading the queue, uploads) run in a bounded executor shared
+by every account, while the waits between posts are asyncio timers, so an
+account that is sleeping until its next post costs a pending task rather
+than an OS thread.
+"""
+import time
+import asyncio
+from functools import partial
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncAccountRunner:
+    """Drives one PostingEngine from the event loop"""
+
+    def __init__(self, engine, executor):
+        self.engine = engine
+        self.executor = executor
+        self.loop = None
+        self.wake = None
+
+    def on_control_changed(self):
+        # RunControl listener, called from whichever thread paused, stopped
+        # or poked the engine
+        self.loop.call_soon_threadsafe(self.wake.set)
+
+    async def blocking(self, func, *args):
+        return await self.loop.run_in_executor(self.executor, func, *args)
+
+    async def run(self):
+        engine = self.engine
+        if not engine.running:
+            return
+        self.loop = asyncio.get_running_loop()
+        self.wake = asyncio.Event()
+        engine.control.add_listener(self.on_control_changed)
+        try:
+            engine.client.set_delay_range(engine.config['api_delay_min'], engine.config['api_delay_max'])
+            engine.listener.on_status("Logging in...")
+            await self.blocking(engine.login)
+
+            if not engine.running:
+                return
+
+            engine.listener.on_status("Processing posts...")
+            await self.process_posts()
+
+        except Exception as e:
+            engine.log(f"Unhandled error: {str(e)}", "error")
+        finally:
+            engine.control.remove_listener(self.on_control_changed)
+            if engine.running:
+                engine.listener.on_status("Finished")
+            else:
+                engine.listener.on_status("Stopped")
+
+    async def process_posts(self):
+        engine = self.engine
+        post_login_delay = engine.config.get('post_login_delay', 60)
+        if post_login_delay:
+            engine.log(f"Sleeping for {post_login_delay} seconds after login to appear human...")
+            if not await self.sleep(post_login_delay):
+                return
+
+        # The sources are context managers doing file and database work on
+        # enter and exit, so both ends run in the executor
+        stack = ExitStack()
+        try:
+            pending = await self.blocking(stack.enter_context, engine.pending_source())
+            if pending is None:
+                return
+            source, store = pending
+            prefetcher = await self.blocking(stack.enter_context, engine.prefetching(source))
+            await self.post_loop(prefetcher, store)
+        finally:
+            await self.blocking(stack.close)
+
+    async def post_loop(self, prefetcher, store):
+        engine = self.engine
+        while True:
+            post = await self.blocking(next, prefetcher, None)
+            if post is None:
+                break
+
+            if not await self.wait_if_paused():
+                engine.log("Process stopped by user")
+                break
+
+            if not engine.start_post(post):
+                continue
+
+            wait_time = engine.wait_time_for(post)
+            if wait_time:
+                # Looking ahead tops up the prefetch window, which prepares
+                # posts (hashing, database reads), so it runs in the executor
+                report_upcoming = partial(self.blocking, engine.report_upcoming, prefetcher)
+                await report_upcoming()
+                if not await self.sleep(wait_time, on_poke=report_upcoming):
+                    engine.log("Process stopped by user during waiting period")
+                    break
+
+            await self.blocking(engine.publish, post, store)
+
+    async def wait_if_paused(self):
+        """Async counterpart of RunControl.wait_if_paused"""
+        control = self.engine.control
+        while True:
+            self.wake.clear()
+            if not control.paused or not control.running:
+                return control.running
+            await self.wake.wait()
+
+    async def sleep(self, seconds, on_poke=None):
+        """Async counterpart of RunControl.sleep, with the same semantics;
+        on_poke returns an awaitable here"""
+        control = self.engine.control
+        deadline = time.monotonic() + seconds
+        seen = control.pokes
+        while True:
+            # Clear before reading the state: a change after this point sets
+            # the event again, so no wake-up is lost
+            self.wake.clear()
+            if not control.running:
+                return False
+            if control.paused:
+                paused_at = time.monotonic()
+                await self.wake.wait()
+                deadline += time.monotonic() - paused_at
+                continue
+            if on_poke is not None and control.pokes != seen:
+                seen = control.pokes
+                await on_poke()
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            try:
+                await asyncio.wait_for(self.wake.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+
+class AsyncPostingService:
+    """Event loop side of the asyncio engine.
+
+    max_blocking_calls bounds the executor running publisher calls and
+    other blocking steps; it is shared by every account, so it caps the
+    number of threads no matter how many accounts are scheduled.
+    """
+
+    def __init__(self, max_blocking_calls=16):
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(1, max_blocking_calls),
+            thread_name_prefix="posting"
+        )
+
+    async def run(self, engine):
+        await AsyncAccountRunner(engine, self.executor).run()
+
+    async def run_all(self, engines):
+        await asyncio.gather(*(self.run(engine) for engine in engines))
+
+    def close(self, wait=True):
+        self.executor.shutdown(wait=wait)
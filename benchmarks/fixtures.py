@@ -0,0 +1,104 @@
+"""Generated datasets for the benchmarks.
+
+Everything is derived from a fixed seed and cached under benchmarks/data,
+so repeated runs measure the same inputs and only pay generation once.
+"""
+import os
+import csv
+import random
+import shutil
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+WORDS = (
+    "sunset coffee morning city beach launch summer studio team behind the "
+    "scenes new drop limited today weekend vibes product story thanks"
+).split()
+
+
+def caption(rng):
+    words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 40)))
+    tags = " ".join(f"#{rng.choice(WORDS)}{rng.randint(1, 99)}" for _ in range(rng.randint(0, 12)))
+    return f"{words.capitalize()}. {tags}".strip()
+
+
+class Fixtures:
+    def __init__(self, data_dir=DATA_DIR):
+        self.data_dir = data_dir
+        os.makedirs(data_dir, exist_ok=True)
+
+    def path(self, name):
+        return os.path.join(self.data_dir, name)
+
+    def posts_csv(self, rows, posted_ratio=0.1):
+        """CSV with filename, caption, posted and timestamp columns"""
+        path = self.path(f"posts_{rows}.csv")
+        if os.path.exists(path):
+            return path
+        rng = random.Random(rows)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['filename', 'caption', 'posted', 'timestamp'])
+            for i in range(rows):
+                posted = rng.random() < posted_ratio
+                writer.writerow([
+                    f"img{i:06d}.jpg",
+                    caption(rng),
+                    posted,
+                    "2025-01-01 09:00:00" if posted else "",
+                ])
+        os.replace(tmp_path, path)
+        return path
+
+    def images_dir(self, count):
+        """Folder of count placeholder images named like posts_csv rows.
+
+        The fake publisher never decodes them, so each is a few bytes, but
+        no two are alike or the duplicate check would skip them.
+        """
+        path = self.path(f"unique_images_{count}")
+        if os.path.isdir(path):
+            return path
+        tmp_path = path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for i in range(count):
+            with open(os.path.join(tmp_path, f"img{i:06d}.jpg"), 'wb') as f:
+                f.write(b"\xff\xd8" + i.to_bytes(4, 'big') + b"\xff\xd9")
+        os.replace(tmp_path, path)
+        return path
+
+    def queue_db(self, rows):
+        """Pristine SQLite queue; copy it before a run that changes it"""
+        from post_queue import SQLitePostQueue
+
+        path = self.path(f"queue_{rows}.db")
+        if os.path.exists(path):
+            return path
+        tmp_path = path + ".tmp"
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(tmp_path + suffix):
+                os.remove(tmp_path + suffix)
+        queue = SQLitePostQueue(tmp_path)
+        queue.import_csv(self.posts_csv(rows))
+        queue.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        queue.close()
+        os.replace(tmp_path, path)
+        return path
+
+    def large_image(self, width=4000, height=3000):
+        """Noisy JPEG roughly the size of a camera original"""
+        path = self.path(f"large_{width}x{height}.jpg")
+        if os.path.exists(path):
+            return path
+        from PyQt5.QtGui import QImage
+
+        rng = random.Random(width * height)
+        row = bytes(rng.getrandbits(8) for _ in range(width * 4))
+        # Rotate each row so the image doesn't compress to nothing
+        data = b"".join(row[(y * 12) % len(row):] + row[:(y * 12) % len(row)] for y in range(height))
+        image = QImage(data, width, height, width * 4, QImage.Format_RGB32)
+        image.save(path + ".tmp.jpg", "JPG", 92)
+        os.replace(path + ".tmp.jpg", path)
+        return path
@@ -0,0 +1,503 @@
+"""Benchmarks for the posting pipeline hot paths.
+
+    python -m benchmarks.run                  # run all, compare with baseline.json
+    python -m benchmarks.run --filter e2e     # only names containing "e2e"
+    python -m benchmarks.run --save           # record a new baseline
+
+Each benchmark reports the median and best of --repeat runs, or of as
+many as fit in MIN_SECONDS for short ones. The best run is compared with
+the baseline's best, since noise from the rest of the machine only ever
+adds time; one slower than it by more than --tolerance is a regression
+and makes the run exit with status 1. Benchmarks whose optional
+dependencies (PyQt5) are missing are skipped.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import subprocess
+import platform
+import argparse
+import tempfile
+import statistics
+import importlib.util
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.fixtures import Fixtures  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+BENCHMARKS = []
+
+# Benchmarks of a few milliseconds repeat until they have run this long,
+# up to MAX_RUNS times, so their best is not down to a lucky run
+MIN_SECONDS = 1.0
+MAX_RUNS = 200
+
+
+def benchmark(name, requires=()):
+    """Register a benchmark.
+
+    The decorated function does the untimed setup and returns the callable
+    to time; it is called again before every repeat. A callable that
+    measures itself returns the time in seconds instead.
+    """
+    def register(func):
+        BENCHMARKS.append((name, tuple(requires), func))
+        return func
+    return register
+
+
+class Context:
+    def __init__(self, root):
+        self.root = root
+        self.fixtures = Fixtures()
+        self.app = None
+        self.counter = 0
+
+    def workdir(self):
+        self.counter += 1
+        path = os.path.join(self.root, f"run{self.counter}")
+        os.makedirs(path)
+        return path
+
+    def qt_app(self):
+        if self.app is None:
+            os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+            from PyQt5.QtWidgets import QApplication
+            self.app = QApplication.instance() or QApplication([])
+        return self.app
+
+    def engine_config(self, workdir, **overrides):
+        """Worker config for the fake publisher with every delay at zero"""
+        from cli import DEFAULT_CONFIG
+        import retry
+
+        config = dict(DEFAULT_CONFIG)
+        config.update({
+            'username': 'bench',
+            'session_file': os.path.join(workdir, 'sessions', 'session.json'),
+            'log_dir': os.path.join(workdir, 'logs'),
+            'dedup_dir': os.path.join(workdir, 'dedup'),
+            'api_delay_min': 0,
+            'api_delay_max': 0,
+            'post_delay_min': 0,
+            'post_delay_max': 0,
+            'post_login_delay': 0,
+            'publisher': 'fake',
+            'fake_publisher': {'seed': 1},
+            # Failed posts come round again at once instead of hours later
+            'retry_policies': {name: {'base_delay': 0, 'max_delay': 0} for name in retry.DEFAULT_POLICIES},
+            'circuit_breaker': {'cooldown': 0},
+            # Measured on its own by post_e2e_sqlite_1k_dedup
+            'dedup': False,
+        })
+        config.update(overrides)
+        return config
+
+    def queue_copy(self, rows, workdir):
+        path = os.path.join(workdir, "queue.db")
+        shutil.copyfile(self.fixtures.queue_db(rows), path)
+        return path
+
+
+def wait_for(signal, timeout_ms=600000):
+    from PyQt5.QtCore import QEventLoop, QTimer
+
+    loop = QEventLoop()
+    signal.connect(loop.quit)
+    QTimer.singleShot(timeout_ms, loop.quit)
+    return loop
+
+
+# Startup: what importing an entry module costs in a fresh interpreter,
+# as reported by python -X importtime. Modules in LAZY_MODULES must not be
+# imported at all; they load on first use.
+
+LAZY_MODULES = ("instagrapi", "pandas", "http.server", "concurrent.futures.process")
+
+
+def import_time(module):
+    """Seconds spent importing module, and the names of every module it loaded"""
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)  # Time imports from bytecode, as installs do
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    seconds = None
+    loaded = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # Header
+        loaded.add(name.strip())
+        if name.strip() == module:
+            seconds = int(cumulative) / 1e6
+    return seconds, loaded
+
+
+def startup(module, *lazy, requires=()):
+    @benchmark(f"startup_import_{module}", requires=requires)
+    def bench(ctx):
+        import_time(module)  # Compile bytecode outside the timed run
+
+        def run():
+            seconds, loaded = import_time(module)
+            eager = sorted(loaded.intersection(LAZY_MODULES + lazy))
+            assert not eager, f"{module} imports {', '.join(eager)} at startup"
+            return seconds
+        return run
+    return bench
+
+
+# The GUI doesn't load the engine until a task starts
+startup("main_window", "engine", requires=("PyQt5",))
+startup("engine")
+
+
+# CSV load and filter, as done by process_posts before posting starts
+
+def csv_load_filter(rows):
+    @benchmark(f"csv_load_filter_{rows // 1000}k")
+    def bench(ctx):
+        from engine import PostingEngine
+
+        workdir = ctx.workdir()
+        csv_path = os.path.join(workdir, "posts.csv")
+        shutil.copyfile(ctx.fixtures.posts_csv(rows), csv_path)
+        engine = PostingEngine(ctx.engine_config(workdir, csv_path=csv_path))
+
+        def run():
+            with engine.csv_source() as pending:
+                assert pending is not None
+        return run
+    return bench
+
+
+csv_load_filter(10000)
+csv_load_filter(100000)
+
+
+@benchmark("csv_stream_100k")
+def csv_stream(ctx):
+    """Every pending row read back through the source, as a run over the whole calendar would"""
+    from engine import PostingEngine
+
+    workdir = ctx.workdir()
+    csv_path = os.path.join(workdir, "posts.csv")
+    shutil.copyfile(ctx.fixtures.posts_csv(100000), csv_path)
+    engine = PostingEngine(ctx.engine_config(workdir, csv_path=csv_path))
+
+    def run():
+        with engine.csv_source() as pending:
+            source, _ = pending
+            for _ in source:
+                pass
+    return run
+
+
+# Recording a posted row: the journal append that replaced the per-post
+# to_csv rewrite, and the single rewrite left when the journal is compacted
+
+@benchmark("journal_record_1k")
+def journal_record(ctx):
+    from journal import PostJournal
+
+    journal = PostJournal(os.path.join(ctx.workdir(), "posts.csv"))
+
+    def run():
+        for i in range(1000):
+            journal.record(i, f"img{i:06d}.jpg", "posted", "2025-01-01 09:00:00", str(i))
+        journal.close()
+    return run
+
+
+def journal_compact(rows):
+    @benchmark(f"journal_compact_{rows // 1000}k")
+    def bench(ctx):
+        from journal import PostJournal
+
+        csv_path = os.path.join(ctx.workdir(), "posts.csv")
+        shutil.copyfile(ctx.fixtures.posts_csv(rows), csv_path)
+        journal = PostJournal(csv_path)
+        journal.record(0, "img000000.jpg", "posted", "2025-01-01 09:00:00")
+        journal.close()
+        return journal.compact
+    return bench
+
+
+journal_compact(10000)
+journal_compact(100000)
+
+
+# Caption templates: compiling once and rendering a whole calendar
+
+@benchmark("caption_render_100k")
+def caption_render(ctx):
+    from captions import load_renderer, render_csv
+
+    config = {
+        'caption_templates': {'default': "{caption}\n\n{#travel:8} {#brand:2}\n{signature}"},
+        'hashtag_pools': {
+            'travel': [f"travel{i}" for i in range(60)],
+            'brand': ["acme", "acmeoutdoors", "madebyacme"],
+        },
+        'caption_signature': "Shop the look at acme.example",
+    }
+    csv_path = ctx.fixtures.posts_csv(100000)
+    out_path = os.path.join(ctx.workdir(), "rendered.csv")
+
+    def run():
+        rows, invalid = render_csv(load_renderer(config), csv_path, out_path)
+        assert rows == 100000 and not invalid
+    return run
+
+
+@benchmark("queue_import_100k")
+def queue_import(ctx):
+    from post_queue import SQLitePostQueue
+
+    csv_path = ctx.fixtures.posts_csv(100000)
+    queue = SQLitePostQueue(os.path.join(ctx.workdir(), "queue.db"))
+
+    def run():
+        queue.import_csv(csv_path)
+        queue.close()
+    return run
+
+
+# Posts table: time until the last chunk is in the model
+
+def table_load(rows, source):
+    @benchmark(f"table_load_{source}_{rows // 1000}k", requires=("PyQt5",))
+    def bench(ctx):
+        ctx.qt_app()
+        from widgets import PostsTableWidget
+
+        images_dir = ctx.fixtures.images_dir(1000)
+        table = PostsTableWidget()
+        if source == "csv":
+            path = ctx.fixtures.posts_csv(rows)
+            load = table.load_data
+        else:
+            path = ctx.queue_copy(rows, ctx.workdir())
+            load = table.load_queue
+
+        def run():
+            loop = wait_for(table.loading_finished)
+            load(path, images_dir)
+            loop.exec_()
+            assert table.posts_model.rowCount() == rows
+        return run
+    return bench
+
+
+for _rows in (1000, 10000, 100000):
+    table_load(_rows, "csv")
+table_load(100000, "sqlite")
+
+
+# Preview of a camera-sized image, before and after it is cached
+
+@benchmark("preview_large_image_cold", requires=("PyQt5",))
+def preview_cold(ctx):
+    ctx.qt_app()
+    from widgets import PostPreviewWidget
+    from thumbnails import shared_cache
+
+    path = ctx.fixtures.large_image()
+    cache = shared_cache()
+    cache.memory.clear()
+    shutil.rmtree(cache.cache_dir, ignore_errors=True)
+    preview = PostPreviewWidget()
+
+    def run():
+        loop = wait_for(cache.thumbnail_ready)
+        preview.set_preview(path, "caption")
+        loop.exec_()
+    return run
+
+
+@benchmark("preview_large_image_warm", requires=("PyQt5",))
+def preview_warm(ctx):
+    ctx.qt_app()
+    from widgets import PostPreviewWidget
+    from thumbnails import shared_cache
+
+    path = ctx.fixtures.large_image()
+    preview = PostPreviewWidget()
+    if shared_cache().get(path, 400, 300) is None:
+        wait_for(shared_cache().thumbnail_ready).exec_()
+
+    def run():
+        # One cached preview takes microseconds, too little to time on its own
+        for _ in range(1000):
+            preview.set_preview(path, "caption")
+    return run
+
+
+# End to end: login, load, validate and post every row against the fake
+# publisher with all delays at zero
+
+def post_e2e(rows, dedup=False, **fake):
+    name = f"post_e2e_sqlite_{rows // 1000}k" + ("_faults" if fake else "") + ("_dedup" if dedup else "")
+
+    @benchmark(name)
+    def bench(ctx):
+        from engine import PostingEngine
+
+        workdir = ctx.workdir()
+        config = ctx.engine_config(
+            workdir,
+            queue_backend='sqlite',
+            queue_db=ctx.queue_copy(rows, workdir),
+            images_dir=ctx.fixtures.images_dir(rows),
+            fake_publisher=dict(seed=1, **fake),
+            dedup=dedup,
+        )
+        engine = PostingEngine(config)
+        return engine.run
+    return bench
+
+
+post_e2e(1000)
+post_e2e(10000)
+post_e2e(1000, throttle_rate=0.02, login_required_rate=0.02, connection_error_rate=0.02)
+# Every file is hashed on the way, as on a first run with a new dedup folder
+post_e2e(1000, dedup=True)
+
+
+@benchmark("post_e2e_csv_1k")
+def post_e2e_csv(ctx):
+    from engine import PostingEngine
+
+    workdir = ctx.workdir()
+    csv_path = os.path.join(workdir, "posts.csv")
+    shutil.copyfile(ctx.fixtures.posts_csv(1000), csv_path)
+    engine = PostingEngine(ctx.engine_config(
+        workdir, csv_path=csv_path, images_dir=ctx.fixtures.images_dir(1000)
+    ))
+    return engine.run
+
+
+@benchmark("post_e2e_asyncio_50x100")
+def post_e2e_asyncio(ctx):
+    from engine import PostingEngine
+    from async_engine import AsyncPostingService
+
+    engines = []
+    for account in range(50):
+        workdir = ctx.workdir()
+        engines.append(PostingEngine(ctx.engine_config(
+            workdir,
+            account=f"account{account}",
+            queue_backend='sqlite',
+            queue_db=ctx.queue_copy(100, workdir),
+            images_dir=ctx.fixtures.images_dir(100),
+        )))
+
+    def run():
+        service = AsyncPostingService(16)
+        try:
+            asyncio.run(service.run_all(engines))
+        finally:
+            service.close()
+    return run
+
+
+def missing_requirements(requires):
+    return [module for module in requires if importlib.util.find_spec(module) is None]
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('results', {})
+
+
+def save_baseline(path, results):
+    data = {
+        'machine': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine(),
+        },
+        'results': results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.splitlines()[0])
+    parser.add_argument('--filter', default='', help="only run benchmarks whose name contains this")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--tolerance', type=float, default=0.3, help="allowed slowdown, 0.3 = 30%%")
+    parser.add_argument('--save', action='store_true', help="write the results as the new baseline")
+    args = parser.parse_args(argv)
+
+    baseline = load_baseline(args.baseline)
+    results = dict(baseline) if args.save else {}
+    regressions = []
+
+    root = tempfile.mkdtemp(prefix="instagram-bench-")
+    cwd = os.getcwd()
+    os.chdir(root)  # Engine logs, sessions and caches stay out of the repo
+    try:
+        ctx = Context(root)
+        print(f"{'benchmark':34} {'median':>10} {'best':>10} {'baseline':>10}")
+        for name, requires, factory in BENCHMARKS:
+            if args.filter not in name:
+                continue
+            missing = missing_requirements(requires)
+            if missing:
+                print(f"{name:34} skipped, needs {', '.join(missing)}")
+                continue
+
+            times = []
+            while len(times) < max(1, args.repeat) or (sum(times) < MIN_SECONDS and len(times) < MAX_RUNS):
+                run = factory(ctx)
+                start = time.perf_counter()
+                measured = run()
+                elapsed = time.perf_counter() - start
+                times.append(measured if isinstance(measured, float) else elapsed)
+
+            median, best = statistics.median(times), min(times)
+            results[name] = {'median': round(median, 6), 'best': round(best, 6)}
+            previous = baseline.get(name, {}).get('best')
+            note = ""
+            if previous:
+                ratio = best / previous
+                note = f"{ratio:6.2f}x"
+                if ratio > 1 + args.tolerance:
+                    regressions.append(name)
+                    note += "  REGRESSION"
+            print(f"{name:34} {median:10.4f} {best:10.4f} {previous or 0:10.4f} {note}")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(root, ignore_errors=True)
+
+    if args.save:
+        save_baseline(args.baseline, results)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
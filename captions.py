@@ -0,0 +1,209 @@
+"""Caption validation and templating.
+
+A template is caption text with fields: {column} takes the value of a CSV
+column, {signature} the account's signature, and {#pool} or {#pool:N}
+the hashtags of a named pool, or N of them. Templates are compiled once
+per run into a list of parts, so rendering a row is a join.
+"""
+import re
+import csv
+import zlib
+from string import Formatter
+
+# Instagram caption limits
+MAX_CAPTION_LENGTH = 2200
+MAX_HASHTAGS = 30
+MAX_MENTIONS = 20
+
+HASHTAG_RE = re.compile(r'#\w+')
+MENTION_RE = re.compile(r'@[\w.]+')
+
+
+def validate_caption(caption):
+    """Return a list of problems that would make Instagram reject the caption"""
+    if not isinstance(caption, str):
+        return ["caption is missing"]
+
+    problems = []
+    if len(caption) > MAX_CAPTION_LENGTH:
+        problems.append(f"caption is {len(caption)} characters (limit {MAX_CAPTION_LENGTH})")
+    hashtags = len(HASHTAG_RE.findall(caption))
+    if hashtags > MAX_HASHTAGS:
+        problems.append(f"caption has {hashtags} hashtags (limit {MAX_HASHTAGS})")
+    mentions = len(MENTION_RE.findall(caption))
+    if mentions > MAX_MENTIONS:
+        problems.append(f"caption has {mentions} mentions (limit {MAX_MENTIONS})")
+    return problems
+
+
+class TemplateError(ValueError):
+    """A caption template that can't be compiled or rendered"""
+
+
+def parse_pools(text):
+    """Hashtag pools from lines of "name: #tag #tag ...", as the settings store them"""
+    pools = {}
+    for line in text.splitlines():
+        name, sep, tags = line.partition(':')
+        if sep and name.strip():
+            pools[name.strip()] = tags.replace(',', ' ').split()
+    return pools
+
+
+def normalize_tags(tags):
+    if isinstance(tags, str):
+        tags = tags.replace(',', ' ').split()
+    return ['#' + tag.strip().lstrip('#') for tag in tags if tag.strip().lstrip('#')]
+
+
+def pool_part(tags, count):
+    """Render count tags of a pool, starting where the post's filename hashes to.
+
+    Each post gets its own slice of the pool, the same one every time it
+    is rendered.
+    """
+    if count >= len(tags):
+        text = ' '.join(tags)
+        return lambda row, key: text
+    ring = tags + tags[:count]
+    return lambda row, key: ' '.join(ring[(zlib.crc32(key.encode('utf-8')) % len(tags)):][:count])
+
+
+def column_part(column, spec):
+    def render(row, key):
+        value = row.get(column)
+        if value is None or value != value:  # NaN from pandas
+            value = ''
+        return format(str(value), spec) if spec else str(value)
+    return render
+
+
+class CaptionTemplate:
+    """A template compiled into literal text and field renderers"""
+
+    def __init__(self, text, pools=None, signature=''):
+        self.text = text
+        self.columns = set()
+        self.hashtags = len(HASHTAG_RE.findall(text.replace('{#', '{')))
+        parts = []
+        try:
+            parsed = list(Formatter().parse(text))
+        except ValueError as e:
+            raise TemplateError(f"invalid template: {e}")
+        for literal, field, spec, conversion in parsed:
+            if literal:
+                parts.append(lambda row, key, literal=literal: literal)
+            if field is None:
+                continue
+            if conversion:
+                raise TemplateError(f"{{{field}!{conversion}}}: conversions are not supported")
+            if field.startswith('#'):
+                parts.append(self.compile_pool(field[1:], spec, pools or {}))
+            elif field == 'signature':
+                parts.append(lambda row, key, signature=signature or '': signature)
+                self.hashtags += len(HASHTAG_RE.findall(signature or ''))
+            elif field:
+                self.columns.add(field)
+                parts.append(column_part(field, spec))
+            else:
+                raise TemplateError("empty {} field, name a column")
+        if self.hashtags > MAX_HASHTAGS:
+            raise TemplateError(f"template adds {self.hashtags} hashtags (limit {MAX_HASHTAGS})")
+        self.parts = parts
+
+    def compile_pool(self, name, spec, pools):
+        if name not in pools:
+            raise TemplateError(f"unknown hashtag pool '{name}'")
+        tags = normalize_tags(pools[name])
+        if not tags:
+            raise TemplateError(f"hashtag pool '{name}' is empty")
+        try:
+            count = int(spec) if spec else len(tags)
+        except ValueError:
+            raise TemplateError(f"{{#{name}:{spec}}}: the count must be a number")
+        count = min(max(count, 0), len(tags))
+        self.hashtags += count
+        return pool_part(tags, count)
+
+    def render(self, row):
+        key = str(row.get('filename', ''))
+        caption = ''.join([part(row, key) for part in self.parts])
+        return BLANK_LINES_RE.sub('\n\n', caption).strip()
+
+
+BLANK_LINES_RE = re.compile(r'\n\s*\n(\s*\n)+')
+
+
+class CaptionRenderer:
+    """Compiled templates of a run; a row's template column picks one by name.
+
+    Rows without a template column use the "default" template, and with
+    no default template their caption is posted as written.
+    """
+
+    def __init__(self, templates, pools=None, signature=''):
+        self.templates = {}
+        for name, text in (templates or {}).items():
+            try:
+                self.templates[name] = CaptionTemplate(text, pools, signature)
+            except TemplateError as e:
+                raise TemplateError(f"template '{name}': {e}")
+        self.default = self.templates.get('default')
+
+    def __bool__(self):
+        return bool(self.templates)
+
+    @property
+    def columns(self):
+        """CSV columns the templates read, including the template column"""
+        columns = {'template'}
+        for template in self.templates.values():
+            columns.update(template.columns)
+        return columns
+
+    def render(self, row):
+        name = row.get('template')
+        if isinstance(name, str) and name.strip():
+            template = self.templates.get(name.strip())
+            if template is None:
+                raise TemplateError(f"unknown caption template '{name.strip()}'")
+        else:
+            template = self.default
+        if template is None:
+            return row['caption']
+        return template.render(row)
+
+
+def load_renderer(config):
+    """CaptionRenderer from the caption_templates, hashtag_pools and
+    caption_signature settings, or None if no templates are set"""
+    templates = config.get('caption_templates') or {}
+    if not templates:
+        return None
+    return CaptionRenderer(templates, config.get('hashtag_pools'), config.get('caption_signature', ''))
+
+
+def render_csv(renderer, csv_path, out_path):
+    """Write csv_path to out_path with every caption rendered.
+
+    Returns (rows, invalid) where invalid lists (filename, problems) of
+    the captions Instagram would reject.
+    """
+    rows = 0
+    invalid = []
+    with open(csv_path, 'r', encoding='utf-8-sig', newline='') as src, \
+            open(out_path, 'w', encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(src)
+        writer = csv.DictWriter(f, reader.fieldnames or [])
+        writer.writeheader()
+        for row in reader:
+            rows += 1
+            try:
+                row['caption'] = renderer.render(row)
+                problems = validate_caption(row['caption'])
+            except TemplateError as e:
+                problems = [str(e)]
+            if problems:
+                invalid.append((row.get('filename'), problems))
+            writer.writerow(row)
+    return rows, invalid
@@ -0,0 +1,222 @@
+"""Headless entry point, for servers without Qt or a display.
+
+    python -m cli --config config.json
+    python -m cli --config config.json --accounts-file accounts.json --all-accounts
+    python -m cli --config config.json --accounts-file accounts.json --all-accounts --asyncio
+    python -m cli --config config.json --render-captions rendered.csv
+
+The config file holds the same keys the GUI passes to the worker. PyQt5
+is never imported, and CSV calendars are streamed with the csv module.
+"""
+import os
+import sys
+import json
+import time
+import signal
+import logging
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor, wait
+
+DEFAULT_CONFIG = {
+    'username': '',
+    'password': '',
+    'session_file': 'sessions/instagram_session.json',
+    'csv_path': 'posts.csv',
+    'images_dir': 'images',
+    'api_delay_min': 1,
+    'api_delay_max': 3,
+    'post_delay_min': 0,  # Hours
+    'post_delay_max': 0,
+    'log_dir': 'logs',
+    'hashtags_in_first_comment': False,
+    'caption_templates': {},  # name: template, "default" applies to rows without a template column
+    'hashtag_pools': {},  # name: list of hashtags, used as {#name} or {#name:count}
+    'caption_signature': '',  # {signature} in templates, can be set per account
+    'repost_existing': False,
+    'queue_backend': 'csv',
+    'queue_db': 'posts_queue.db',
+    'dedup': True,  # Skip posts the account already published, even with repost_existing
+    'dedup_captions': False,  # Also skip on a repeated caption alone
+    'dedup_dir': 'dedup',
+    'session_validation_ttl': 6 * 3600,  # Seconds a checked session is trusted, 0 to check every login
+    'publisher': 'instagrapi',  # or 'fake' for offline load tests
+    'fake_publisher': {},  # FakePublisher arguments, e.g. {"latency": [0.1, 0.5], "seed": 1}
+}
+
+logger = logging.getLogger("InstagramAutoPost.cli")
+
+
+def load_config(path):
+    config = dict(DEFAULT_CONFIG)
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            config.update(json.load(f))
+    return config
+
+
+def build_listener(name):
+    from listener import EngineListener
+
+    class CliListener(EngineListener):
+        """Routes engine events to the log; prompts for codes on a terminal"""
+
+        def __init__(self):
+            self.engine = None
+
+        def on_status(self, status):
+            logger.info("[%s] Status: %s", name, status)
+
+        def on_progress(self, current, total):
+            logger.info("[%s] Progress: %d/%d", name, current, total)
+
+        def on_require_2fa(self):
+            code = self.prompt("Two-factor authentication code")
+            if code:
+                self.engine.complete_2fa(code)
+            else:
+                self.engine.stop()
+
+        def on_require_challenge(self, username):
+            code = self.prompt(f"Verification code for {username}")
+            if code:
+                self.engine.complete_challenge(code)
+            else:
+                self.engine.stop()
+
+        def prompt(self, label):
+            if not sys.stdin or not sys.stdin.isatty():
+                logger.error("[%s] %s required; log in once interactively to create a session", name, label)
+                return None
+            return input(f"[{name}] {label}: ").strip()
+
+    return CliListener()
+
+
+def build_configs(args, base_config):
+    if not args.accounts_file:
+        return [base_config]
+
+    from accounts import AccountRegistry, account_config
+
+    registry = AccountRegistry(args.accounts_file)
+    if args.all_accounts:
+        accounts = [a for a in registry.accounts if a.get('enabled', True)]
+    else:
+        accounts = []
+        for name in args.account:
+            account = registry.get(name)
+            if account is None:
+                raise SystemExit(f"Unknown account: {name}")
+            accounts.append(account)
+    if not accounts:
+        raise SystemExit("No accounts selected, use --account NAME or --all-accounts")
+    return [account_config(account, base_config) for account in accounts]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m cli", description="Instagram Auto Poster (headless)")
+    parser.add_argument('--config', help="JSON file with worker settings")
+    parser.add_argument('--accounts-file', help="accounts.json from the Accounts tab")
+    parser.add_argument('--account', action='append', default=[], help="account to run (repeatable)")
+    parser.add_argument('--all-accounts', action='store_true', help="run every enabled account")
+    parser.add_argument('--max-workers', type=int, default=8,
+                        help="accounts posting at the same time (with --asyncio: concurrent API calls)")
+    parser.add_argument('--asyncio', action='store_true',
+                        help="run every account on one event loop instead of a thread each")
+    parser.add_argument('--metrics-port', type=int, default=0,
+                        help="serve Prometheus metrics on 127.0.0.1:PORT/metrics")
+    parser.add_argument('--render-captions', metavar='OUT',
+                        help="write the CSV with captions rendered from the templates to OUT and exit")
+    parser.add_argument('--log-level', default='INFO')
+    args = parser.parse_args(argv)
+
+    # Logging to stderr ends up in the journal when run under systemd
+    from log_setup import TextFormatter
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(TextFormatter())
+    logging.basicConfig(level=args.log_level.upper(), handlers=[handler])
+
+    configs = build_configs(args, load_config(args.config))
+    if args.render_captions:
+        return render_captions(configs, args.render_captions)
+
+    if args.metrics_port:
+        from metrics import default_registry, MetricsExporter
+        exporter = MetricsExporter(default_registry(), args.metrics_port)
+        exporter.start()
+        logger.info("Serving metrics at %s", exporter.url)
+
+    from engine import PostingEngine
+
+    engines = []
+    for config in configs:
+        listener = build_listener(config.get('account') or config['username'])
+        listener.engine = PostingEngine(config, listener)
+        engines.append(listener.engine)
+
+    def shutdown(signum, frame):
+        logger.info("Received signal %d, stopping...", signum)
+        for engine in engines:
+            engine.stop()
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    if args.asyncio:
+        run_async(engines, args.max_workers)
+        return 0
+
+    with ThreadPoolExecutor(max_workers=max(1, args.max_workers)) as pool:
+        futures = [pool.submit(engine.run) for engine in engines]
+        wait(futures)
+    return 0
+
+
+def render_captions(configs, out_path):
+    """Render each config's CSV captions into out_path (suffixed by account
+    when there are several); returns 1 if any caption is invalid"""
+    from captions import load_renderer, render_csv, TemplateError
+
+    status = 0
+    for config in configs:
+        name = config.get('account') or config['username']
+        path = out_path
+        if len(configs) > 1:
+            root, ext = os.path.splitext(out_path)
+            path = f"{root}_{name}{ext}"
+        try:
+            renderer = load_renderer(config)
+        except TemplateError as e:
+            logger.error("[%s] Caption template error: %s", name, e)
+            status = 1
+            continue
+        if renderer is None:
+            logger.error("[%s] No caption_templates configured", name)
+            status = 1
+            continue
+
+        start = time.perf_counter()
+        rows, invalid = render_csv(renderer, config['csv_path'], path)
+        logger.info("[%s] Rendered %d captions into %s in %.2fs", name, rows, path, time.perf_counter() - start)
+        for filename, problems in invalid[:20]:
+            logger.warning("[%s] %s: %s", name, filename, "; ".join(problems))
+        if invalid:
+            logger.warning("[%s] %d captions would be rejected", name, len(invalid))
+            status = 1
+    return status
+
+
+def run_async(engines, max_blocking_calls):
+    from async_engine import AsyncPostingService
+
+    service = AsyncPostingService(max_blocking_calls)
+    try:
+        asyncio.run(service.run_all(engines))
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
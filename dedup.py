@@ -0,0 +1,316 @@
+"""Index of what each account has already published.
+
+Before an upload the post is looked up by content hash (the same file
+under any name), by perceptual hash (the same picture re-encoded or
+resized) and by caption fingerprint. The lookups are dict hits on data
+loaded from the account's SQLite index, so they cost the same however
+much has been posted.
+
+File hashes are cached by path, size and mtime in a database shared by
+all accounts. Importing a calendar fills it in parallel across worker
+processes, so posting only has to look them up.
+"""
+import os
+import re
+import csv
+import sqlite3
+import time
+import hashlib
+import functools
+from preprocess import content_hash
+import media
+
+# A dhash is 64 bits; two within MAX_DISTANCE bits of each other agree on
+# at least one of DHASH_BANDS 16-bit bands, so only posts sharing a band
+# are compared
+DHASH_BANDS = 4
+MAX_DISTANCE = 3
+
+HASHES_DB = "file_hashes.db"
+CAPTION_WORDS = re.compile(r"[\w#@]+")
+
+
+@functools.lru_cache(maxsize=None)
+def pillow():
+    """PIL.Image, or None if Pillow is not installed (a failed import is not cached by Python)"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    return Image
+
+
+def dhash(path, size=8):
+    """Difference hash of an image as 16 hex digits, None for videos or without Pillow"""
+    Image = pillow()
+    if Image is None or media.is_video(path):
+        return None
+    try:
+        with Image.open(path) as image:
+            image.draft('L', (size * 4, size * 4))  # JPEGs decode straight to a small size
+            small = image.convert('L').resize((size + 1, size), Image.BILINEAR)
+    except (OSError, ValueError):
+        return None
+    pixels = list(small.getdata())
+    bits = 0
+    for y in range(size):
+        row = pixels[y * (size + 1):(y + 1) * (size + 1)]
+        for x in range(size):
+            bits = bits << 1 | (row[x] > row[x + 1])
+    return f"{bits:016x}"
+
+
+def hash_file(path):
+    """(sha256, dhash) of a file, (None, None) if it can't be read"""
+    try:
+        return content_hash(path), dhash(path)
+    except OSError:
+        return None, None
+
+
+def caption_fingerprint(caption):
+    """Equal for captions that differ only in case, spacing and punctuation"""
+    words = CAPTION_WORDS.findall(str(caption).lower())
+    if not words:
+        return None
+    return hashlib.sha1(" ".join(words).encode('utf-8')).hexdigest()
+
+
+def bands(value):
+    width = 16 // DHASH_BANDS
+    return [(i, value[i * width:(i + 1) * width]) for i in range(DHASH_BANDS)]
+
+
+def distance(a, b):
+    return bin(int(a, 16) ^ int(b, 16)).count('1')
+
+
+def safe_name(name):
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+
+
+def connect(db_path):
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class FileHashes:
+    """Cache of (sha256, dhash) per file, invalidated when a file changes.
+
+    Hashes computed one at a time while posting are written in batches;
+    losing some in a crash only means hashing those files again.
+    """
+
+    BATCH_SIZE = 500
+
+    def __init__(self, db_path):
+        self.conn = connect(db_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS file_hashes (path TEXT PRIMARY KEY, size INTEGER NOT NULL, "
+            "mtime_ns INTEGER NOT NULL, sha256 TEXT NOT NULL, dhash TEXT)"
+        )
+        self.unsaved = {}
+
+    def close(self):
+        self.save()
+        self.conn.close()
+
+    def save(self):
+        if self.unsaved:
+            self.store(list(self.unsaved.values()))
+            self.unsaved = {}
+
+    def cached(self, path, size, mtime_ns):
+        entry = self.unsaved.get(path)
+        if entry is not None and entry[1:3] == (size, mtime_ns):
+            return entry[3:]
+        row = self.conn.execute(
+            "SELECT sha256, dhash FROM file_hashes WHERE path = ? AND size = ? AND mtime_ns = ?",
+            (path, size, mtime_ns)
+        ).fetchone()
+        return None if row is None else (row['sha256'], row['dhash'])
+
+    def store(self, rows):
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?, ?)", rows)
+
+    def get(self, path):
+        """(sha256, dhash) of path, hashing it now if it is not cached"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        hashes = self.cached(path, stat.st_size, stat.st_mtime_ns)
+        if hashes is None:
+            hashes = hash_file(path)
+            if hashes[0] is None:
+                raise OSError(f"Could not read {path}")
+            self.unsaved[path] = (path, stat.st_size, stat.st_mtime_ns) + hashes
+            if len(self.unsaved) >= self.BATCH_SIZE:
+                self.save()
+        return hashes
+
+    def hash_files(self, paths, max_workers=None):
+        """Hash the files that are not cached yet across worker processes.
+
+        Returns how many files were hashed.
+        """
+        todo = []
+        for path in sorted({os.path.abspath(p) for p in paths}):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if self.cached(path, stat.st_size, stat.st_mtime_ns) is None:
+                todo.append((path, stat.st_size, stat.st_mtime_ns))
+        if not todo:
+            return 0
+
+        from concurrent.futures import ProcessPoolExecutor
+        hashed = 0
+        batch = []
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = pool.map(hash_file, [path for path, _, _ in todo], chunksize=64)
+            for entry, hashes in zip(todo, results):
+                if hashes[0] is None:
+                    continue
+                batch.append(entry + hashes)
+                hashed += 1
+                if len(batch) >= self.BATCH_SIZE:
+                    self.store(batch)
+                    batch = []
+        self.store(batch)
+        return hashed
+
+
+class PostFingerprint:
+    def __init__(self, content_hash, dhash=None, caption_fp=None):
+        self.content_hash = content_hash
+        self.dhash = dhash
+        self.caption_fp = caption_fp
+
+
+def fingerprint(paths, caption, hashes):
+    """PostFingerprint of a post's files and caption.
+
+    An album is identified by its files in order and is never matched
+    perceptually.
+    """
+    file_hashes = [hashes.get(path) for path in paths]
+    if len(file_hashes) == 1:
+        content, image_hash = file_hashes[0]
+    else:
+        content = hashlib.sha256("|".join(sha for sha, _ in file_hashes).encode('ascii')).hexdigest()
+        image_hash = None
+    return PostFingerprint(content, image_hash, caption_fingerprint(caption))
+
+
+class PublishedIndex:
+    """What one account has published, kept in memory for duplicate checks.
+
+    New entries count at once but are written in batches: when BATCH_SIZE
+    are waiting, when SAVE_INTERVAL has passed since the last write (so a
+    post after the usual hours-long delay is saved straight away) and on
+    close. Posts lost in a crash are still marked posted by the queue or
+    journal, so only repost_existing runs could repeat them.
+    """
+
+    BATCH_SIZE = 500
+    SAVE_INTERVAL = 30
+
+    def __init__(self, db_path, max_distance=MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.unsaved = []
+        self.saved_at = time.monotonic()
+        self.conn = connect(db_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS published (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "content_hash TEXT NOT NULL, dhash TEXT, caption_fp TEXT, filename TEXT, "
+            "media_id TEXT, posted_at TEXT)"
+        )
+        self.by_content = {}
+        self.by_band = {}
+        self.by_caption = {}
+        for row in self.conn.execute("SELECT * FROM published ORDER BY id"):
+            self.remember(dict(row))
+
+    def close(self):
+        self.save()
+        self.conn.close()
+
+    def save(self):
+        if self.unsaved:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO published (content_hash, dhash, caption_fp, filename, media_id, posted_at) "
+                    "VALUES (:content_hash, :dhash, :caption_fp, :filename, :media_id, :posted_at)", self.unsaved
+                )
+            self.unsaved = []
+        self.saved_at = time.monotonic()
+
+    def __len__(self):
+        return sum(len(entries) for entries in self.by_content.values())
+
+    def remember(self, entry):
+        self.by_content.setdefault(entry['content_hash'], []).append(entry)
+        if entry['dhash']:
+            for band in bands(entry['dhash']):
+                self.by_band.setdefault(band, []).append(entry)
+        if entry['caption_fp']:
+            self.by_caption.setdefault(entry['caption_fp'], []).append(entry)
+
+    def find(self, fingerprint):
+        """(reason, entry) of the earlier post this one repeats, or None.
+
+        reason is 'file', 'image' or 'caption', in that order of precedence.
+        A row that was already published matches its own entry, so reposting
+        it is a duplicate like any other.
+        """
+        entries = self.by_content.get(fingerprint.content_hash)
+        if entries:
+            return 'file', entries[0]
+        if fingerprint.dhash:
+            for band in bands(fingerprint.dhash):
+                for entry in self.by_band.get(band, ()):
+                    if distance(entry['dhash'], fingerprint.dhash) <= self.max_distance:
+                        return 'image', entry
+        entries = self.by_caption.get(fingerprint.caption_fp) if fingerprint.caption_fp else None
+        if entries:
+            return 'caption', entries[0]
+        return None
+
+    def add(self, fingerprint, filename, media_id, posted_at):
+        entry = {
+            'content_hash': fingerprint.content_hash,
+            'dhash': fingerprint.dhash,
+            'caption_fp': fingerprint.caption_fp,
+            'filename': filename,
+            'media_id': None if media_id is None else str(media_id),
+            'posted_at': posted_at,
+        }
+        self.remember(entry)
+        self.unsaved.append(entry)
+        if len(self.unsaved) >= self.BATCH_SIZE or time.monotonic() - self.saved_at >= self.SAVE_INTERVAL:
+            self.save()
+
+
+def index_path(dedup_dir, account):
+    return os.path.join(dedup_dir, f"{safe_name(account or 'default')}.db")
+
+
+def hash_library(csv_path, images_dir, dedup_dir, max_workers=None):
+    """Pre-hash every file named in a posts CSV, returns how many were hashed"""
+    paths = []
+    with open(csv_path, newline='', encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f):
+            if row.get('filename'):
+                paths.extend(os.path.join(images_dir, name) for name in media.media_files(row))
+    hashes = FileHashes(os.path.join(dedup_dir, HASHES_DB))
+    try:
+        return hashes.hash_files(paths, max_workers)
+    finally:
+        hashes.close()
@@ -1,6 +1,7 @@
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, 
-    QLineEdit, QPushButton, QApplication
+    QLineEdit, QPushButton, QApplication, QFormLayout,
+    QComboBox, QSpinBox, QCheckBox, QMessageBox
 )
 from PyQt5.QtCore import Qt
 
@@ -60,3 +61,106 @@ class AuthDialog(QDialog):
 
     def get_code(self):
         return self.code_input.text().strip()
+
+
+class AccountDialog(QDialog):
+    """Add or edit one account of the accounts dashboard"""
+
+    def __init__(self, account=None, parent=None):
+        super().__init__(parent=parent or QApplication.activeWindow())
+        self.setWindowTitle("Edit Account" if account else "Add Account")
+        self.setMinimumWidth(450)
+        account = account or {}
+        
+        layout = QVBoxLayout()
+        form = QFormLayout()
+        
+        self.name = QLineEdit(account.get('name', ''))
+        self.username = QLineEdit(account.get('username', ''))
+        self.password = QLineEdit(account.get('password', ''))
+        self.password.setEchoMode(QLineEdit.Password)
+        
+        self.session_file = QLineEdit(account.get('session_file', ''))
+        self.session_file.setPlaceholderText("sessions/<name>_session.json")
+        self.csv_path = QLineEdit(account.get('csv_path', ''))
+        self.csv_path.setPlaceholderText("Same as Post Setup")
+        self.images_dir = QLineEdit(account.get('images_dir', ''))
+        self.images_dir.setPlaceholderText("Same as Post Setup")
+        
+        self.queue_backend = QComboBox()
+        self.queue_backend.addItem("Same as Settings", "")
+        self.queue_backend.addItem("CSV file", "csv")
+        self.queue_backend.addItem("SQLite queue", "sqlite")
+        self.queue_backend.setCurrentIndex(
+            max(0, self.queue_backend.findData(account.get('queue_backend', '')))
+        )
+        self.queue_db = QLineEdit(account.get('queue_db', ''))
+        self.queue_db.setPlaceholderText("Same as Settings")
+        self.caption_signature = QLineEdit(account.get('caption_signature', ''))
+        self.caption_signature.setPlaceholderText("Same as Settings")
+        self.caption_signature.setToolTip("Replaces {signature} in caption templates")
+        
+        # -1 means "use the Post Setup value"
+        self.post_min = self.delay_spinbox(account.get('post_delay_min'), 48, " hours")
+        self.post_max = self.delay_spinbox(account.get('post_delay_max'), 48, " hours")
+        
+        self.enabled = QCheckBox("Include in Start All")
+        self.enabled.setChecked(account.get('enabled', True))
+        
+        form.addRow("Account Name:", self.name)
+        form.addRow("Username:", self.username)
+        form.addRow("Password:", self.password)
+        form.addRow("Session File:", self.session_file)
+        form.addRow("CSV File:", self.csv_path)
+        form.addRow("Image Folder:", self.images_dir)
+        form.addRow("Post Source:", self.queue_backend)
+        form.addRow("Queue Database:", self.queue_db)
+        form.addRow("Caption Signature:", self.caption_signature)
+        form.addRow("Post Delay Min:", self.post_min)
+        form.addRow("Post Delay Max:", self.post_max)
+        form.addRow(self.enabled)
+        layout.addLayout(form)
+        
+        button_layout = QHBoxLayout()
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.clicked.connect(self.reject)
+        self.save_btn = QPushButton("Save")
+        self.save_btn.clicked.connect(self.accept)
+        self.save_btn.setDefault(True)
+        
+        button_layout.addWidget(self.cancel_btn)
+        button_layout.addStretch()
+        button_layout.addWidget(self.save_btn)
+        layout.addLayout(button_layout)
+        
+        self.setLayout(layout)
+
+    def delay_spinbox(self, value, maximum, suffix):
+        spinbox = QSpinBox()
+        spinbox.setRange(-1, maximum)
+        spinbox.setSpecialValueText("Default")
+        spinbox.setSuffix(suffix)
+        spinbox.setValue(-1 if value is None else int(value))
+        return spinbox
+
+    def accept(self):
+        if not self.name.text().strip():
+            QMessageBox.critical(self, "Invalid Input", "Account name is required")
+            return
+        super().accept()
+
+    def get_account(self):
+        return {
+            'name': self.name.text().strip(),
+            'username': self.username.text().strip(),
+            'password': self.password.text(),
+            'session_file': self.session_file.text().strip(),
+            'csv_path': self.csv_path.text().strip(),
+            'images_dir': self.images_dir.text().strip(),
+            'queue_backend': self.queue_backend.currentData(),
+            'queue_db': self.queue_db.text().strip(),
+            'caption_signature': self.caption_signature.text().strip(),
+            'post_delay_min': None if self.post_min.value() < 0 else self.post_min.value(),
+            'post_delay_max': None if self.post_max.value() < 0 else self.post_max.value(),
+            'enabled': self.enabled.isChecked(),
+        }
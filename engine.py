@@ -0,0 +1,754 @@
+import os
+import time
+import random
+import logging
+import sqlite3
+from datetime import datetime
+from threading import Event
+from types import SimpleNamespace
+from contextlib import contextmanager, nullcontext
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from publishers import (
+    create_publisher, TwoFactorRequired, ChallengeRequired, LoginRequired,
+    ClientConnectionError, ClientThrottledError
+)
+from listener import EngineListener
+from journal import PostJournal
+from posts_csv import PostsCSV, POST_COLUMNS
+from post_queue import SQLitePostQueue
+from prefetch import PostPrefetcher, PreparedPost
+from captions import validate_caption, load_renderer, TemplateError
+from scheduler import RunControl, PostScheduler, parse_scheduled_at
+from metrics import default_registry
+from session_cache import SessionHealthCache, DEFAULT_TTL
+import retry
+import log_setup
+import preprocess
+import media
+import dedup
+
+
+class PostingEngine:
+    """Login and posting loop for one account, free of any GUI dependency"""
+
+    def __init__(self, config, listener=None):
+        self.config = config
+        self.listener = listener or EngineListener()
+        self.client = create_publisher(config)
+        self.awaiting_2fa = Event()
+        self.control = RunControl()
+        self.total_posts = 0
+        self.current_post = 0
+        
+        # Sessions validated within the TTL are used without checking them again
+        self.session_health = SessionHealthCache(
+            self.config['session_file'], self.config.get('session_validation_ttl', DEFAULT_TTL)
+        )
+        
+        # Failed posts are requeued with backoff; repeated throttling
+        # pauses the whole account
+        self.retry_policies = retry.load_policies(self.config.get('retry_policies'))
+        self.breaker = retry.CircuitBreaker(**self.config.get('circuit_breaker', {}))
+        self.retries = None
+        self.attempts = {}
+        
+        # Open for the duration of a run when duplicate checks are on
+        self.published = None
+        self.file_hashes = None
+        
+        # Caption templates, compiled when posts are loaded
+        self.caption_renderer = None
+        
+        # Setup logging (rotating files written from a background thread)
+        log_setup.setup_logging(
+            self.config.get('log_dir', 'logs'),
+            max_bytes=self.config.get('log_max_bytes', log_setup.MAX_BYTES),
+            backup_count=self.config.get('log_backup_count', log_setup.BACKUP_COUNT),
+        )
+        self.account = self.config.get('account')
+        self.logger = logging.getLogger(
+            f"InstagramAutoPost.{self.account}" if self.account else "InstagramAutoPost"
+        )
+        self.metrics = default_registry()
+        self.metrics_account = self.account or self.config.get('username', '')
+
+    @property
+    def running(self):
+        return self.control.running
+
+    @property
+    def paused(self):
+        return self.control.paused
+
+    def log(self, message, level="info"):
+        """Log message to both UI and file"""
+        self.listener.on_log(message, level)
+        
+        log_setup.log_message(self.logger, level, message, account=self.metrics_account)
+
+    def timed(self, stage):
+        """Context manager recording the duration of a pipeline stage"""
+        return self.metrics.time('instagram_stage_seconds', stage=stage, account=self.metrics_account)
+
+    def count(self, name, **labels):
+        self.metrics.inc(name, account=self.metrics_account, **labels)
+
+    def report_progress(self):
+        self.listener.on_progress(self.current_post, self.total_posts)
+        self.metrics.set('instagram_queue_depth', max(0, self.total_posts - self.current_post),
+                         account=self.metrics_account)
+
+    def run(self):
+        if not self.running:
+            return
+        try:
+            self.client.set_delay_range(self.config['api_delay_min'], self.config['api_delay_max'])
+            self.listener.on_status("Logging in...")
+            self.login()
+            
+            if not self.running:
+                return
+                
+            self.listener.on_status("Processing posts...")
+            self.process_posts()
+            
+        except Exception as e:
+            self.log(f"Unhandled error: {str(e)}", "error")
+        finally:
+            if self.running:
+                self.listener.on_status("Finished")
+            else:
+                self.listener.on_status("Stopped")
+
+    def login(self):
+        session_file = self.config['session_file']
+        
+        # Create session directory if it doesn't exist
+        os.makedirs(os.path.dirname(session_file), exist_ok=True)
+        
+        try:
+            if os.path.exists(session_file):
+                self.log("Attempting to use saved session...")
+                self.client.load_settings(session_file)
+                cached = self.session_health.fresh()
+                if cached:
+                    # Checked recently; a session that expired since fails
+                    # its first real call with LoginRequired instead
+                    age = (time.time() - cached['validated_at']) / 60
+                    self.log(f"Logged in as {cached['username']} using session (checked {age:.0f} min ago)")
+                    return
+                with self.timed('session_validation'):
+                    self.client.get_timeline_feed()  # Test if session is valid
+                    user_info = self.client.account_info()
+                self.session_health.record(user_info.username)
+                self.log(f"Logged in as {user_info.username} using session")
+                return
+        except Exception as e:
+            self.log(f"Session error: {str(e)}", "warning")
+            self.log("Will attempt fresh login", "info")
+
+        try:
+            self.log(f"Logging in as {self.config['username']}...")
+            with self.timed('login'):
+                self.client.login(self.config['username'], self.config['password'])
+                self.client.dump_settings(session_file)
+            # A successful login is its own validation, no account lookup needed
+            self.session_health.record(self.config['username'])
+            self.log(f"Login successful - Welcome @{self.config['username']}")
+        except TwoFactorRequired:
+            self.log("Two-factor authentication required", "warning")
+            self.listener.on_require_2fa()
+            self.awaiting_2fa.wait()
+        except ChallengeRequired:
+            self.log("Challenge required - Instagram needs verification", "warning")
+            self.listener.on_require_challenge(self.config['username'])
+        except ClientConnectionError:
+            self.log("Network error - Check your internet connection", "error")
+            self.count('instagram_connection_errors_total')
+            raise
+        except ClientThrottledError:
+            self.log("Instagram is limiting requests - Try again later", "error")
+            self.count('instagram_throttles_total')
+            raise
+        except Exception as e:
+            self.log(f"Login failed: {str(e)}", "error")
+            raise
+
+    def complete_2fa(self, code):
+        try:
+            self.log("Submitting 2FA code...")
+            self.client.two_factor_login(code.strip())
+            self.client.dump_settings(self.config['session_file'])
+            user_info = self.client.account_info()
+            self.session_health.record(user_info.username)
+            self.log(f"2FA successful - Welcome {user_info.full_name} (@{user_info.username})")
+        except Exception as e:
+            self.log(f"2FA failed: {str(e)}", "error")
+        finally:
+            self.awaiting_2fa.set()  # unblock login thread
+
+    def complete_challenge(self, code):
+        try:
+            self.log("Submitting verification code...")
+            self.client.challenge_code(code.strip())
+            self.client.dump_settings(self.config['session_file'])
+            user_info = self.client.account_info()
+            self.session_health.record(user_info.username)
+            self.log(f"Verification successful - Welcome {user_info.full_name} (@{user_info.username})")
+        except Exception as e:
+            self.log(f"Verification failed: {str(e)}", "error")
+
+    def process_posts(self):
+        post_login_delay = self.config.get('post_login_delay', 60)
+        if post_login_delay:
+            self.log(f"Sleeping for {post_login_delay} seconds after login to appear human...")
+            if not self.control.sleep(post_login_delay):
+                return
+
+        with self.pending_source() as pending:
+            if pending is not None:
+                self.post_pending(*pending)
+
+    def pending_source(self):
+        """Context manager yielding (source, store) or None if there is nothing to post.
+
+        source yields (key, row, due) in posting order. store records what
+        happened to a post: store.posted(key, row, timestamp, media_id),
+        store.retry(key, row, attempts, next_attempt_at, error) and
+        store.failed(key, row, attempts, error).
+        """
+        try:
+            self.caption_renderer = load_renderer(self.config)
+        except TemplateError as e:
+            self.log(f"Caption template error: {str(e)}", "error")
+            return nullcontext()
+        if self.config.get('queue_backend', 'csv') == 'sqlite':
+            return self.queue_source()
+        return self.csv_source()
+
+    @contextmanager
+    def csv_source(self):
+        csv_path = self.config['csv_path']
+        try:
+            self.log(f"Loading posts from {csv_path}...")
+
+            # State journaled by an earlier run that didn't compact is
+            # overlaid on the rows as they are read
+            self.journal = PostJournal(csv_path)
+            state = self.journal.replay()
+            if state:
+                self.log(f"Restored state of {len(state)} posts from journal")
+            columns = POST_COLUMNS
+            if self.caption_renderer is not None:
+                # Template variables are read along with the usual columns
+                columns += tuple(sorted(self.caption_renderer.columns.difference(POST_COLUMNS)))
+            posts = PostsCSV(csv_path, state, columns)
+            missing = [c for c in columns[len(POST_COLUMNS):] if c != 'template' and not posts.has_column(c)]
+            if missing:
+                self.log(f"Caption templates use columns the CSV doesn't have: {', '.join(missing)}", "warning")
+
+            # One streaming pass to count the pending rows; only the keys
+            # and scheduled_at values of a scheduled calendar are kept. A
+            # row's key is its data row index, which the journal records,
+            # and the offset to read it back from
+            repost = self.config.get('repost_existing', False)
+            has_schedule = posts.has_column('scheduled_at')
+            total = 0
+            pending = 0
+            schedule_entries = []
+            with self.timed('csv_load'):
+                for index, offset, row in posts.rows():
+                    total += 1
+                    # Posts that used up their retries wait for the failed cell to be cleared
+                    if not repost and (row['posted'] or row['failed']):
+                        continue
+                    pending += 1
+                    if has_schedule:
+                        schedule_entries.append(((index, offset), row['scheduled_at'] or None))
+        except FileNotFoundError:
+            self.log(f"CSV file not found: {csv_path}", "error")
+            yield None
+            return
+        except ValueError as e:
+            self.log(str(e), "error")
+            yield None
+            return
+        except Exception as e:
+            self.log(f"CSV load error: {str(e)}", "error")
+            yield None
+            return
+
+        try:
+            if not repost:
+                self.log(f"CSV loaded: {total} total rows, {pending} pending posts")
+                if pending == 0:
+                    self.log("No pending posts to process")
+                    yield None
+                    return
+            else:
+                self.log(f"CSV loaded: {total} posts (including already posted)")
+
+            # Update progress bar max
+            self.total_posts = pending
+            self.current_post = 0
+            self.report_progress()
+
+            if any(value for _, value in schedule_entries):
+                schedule = self.build_schedule(schedule_entries)
+                source = ((key, posts.row_at(*key), due) for due, key in schedule.drain())
+            else:
+                source = (
+                    ((index, offset), row, None) for index, offset, row in posts.rows()
+                    if repost or not (row['posted'] or row['failed'])
+                )
+
+            # Journal the new state, the CSV is rewritten once at the end
+            yield source, SimpleNamespace(
+                posted=lambda key, row, timestamp, media_id: self.journal.record(
+                    key[0], row['filename'], 'posted', timestamp, media_id),
+                retry=lambda key, row, attempts, next_attempt_at, error: self.journal.record(
+                    key[0], row['filename'], 'retry', attempts=attempts, next_attempt_at=next_attempt_at, error=error),
+                failed=lambda key, row, attempts, error: self.journal.record(
+                    key[0], row['filename'], 'failed', attempts=attempts, error=error),
+            )
+        finally:
+            self.compact_journal()
+
+    @contextmanager
+    def queue_source(self):
+        db_path = self.config['queue_db']
+        self.log(f"Loading posts from queue {db_path}...")
+
+        try:
+            with self.timed('queue_load'):
+                queue = SQLitePostQueue(db_path)
+        except sqlite3.Error as e:
+            self.log(f"Queue load error: {str(e)}", "error")
+            yield None
+            return
+
+        try:
+            if not self.config.get('repost_existing', False):
+                status = 'pending'
+                self.total_posts = queue.count(status)
+                self.log(f"Queue loaded: {queue.count()} total rows, {self.total_posts} pending posts")
+                if self.total_posts == 0:
+                    self.log("No pending posts to process")
+                    yield None
+                    return
+            else:
+                status = None
+                self.total_posts = queue.count()
+                self.log(f"Queue loaded: {self.total_posts} posts (including already posted)")
+
+            if queue.count_scheduled(status or 'pending'):
+                schedule = self.build_schedule(queue.schedule_entries(status))
+                source = ((post_id, queue.get(post_id), due) for due, post_id in schedule.drain())
+            else:
+                source = ((row['id'], row, None) for row in queue.rows(status))
+
+            self.current_post = 0
+            self.report_progress()
+
+            yield source, SimpleNamespace(
+                posted=lambda post_id, row, timestamp, media_id: queue.mark_posted(post_id, timestamp, media_id),
+                retry=lambda post_id, row, attempts, next_attempt_at, error: queue.mark_retry(
+                    post_id, attempts, next_attempt_at, error),
+                failed=lambda post_id, row, attempts, error: queue.mark_failed(post_id, attempts, error),
+            )
+        finally:
+            queue.close()
+
+    def build_schedule(self, entries):
+        """Build a due-time heap from (key, scheduled_at) pairs in queue order.
+
+        Rows without a scheduled_at are spaced by the usual random post
+        delay, starting now, so they interleave with the scheduled ones.
+        """
+        timezone = self.config.get('timezone') or None
+        if timezone:
+            try:
+                ZoneInfo(timezone)
+            except (ValueError, ZoneInfoNotFoundError):
+                self.log(f"Unknown timezone '{timezone}', using local time", "warning")
+                timezone = None
+        next_free = time.time()
+        due_times = []
+        scheduled = 0
+        for key, value in entries:
+            try:
+                due = parse_scheduled_at(value, timezone)
+            except ValueError:
+                self.log(f"Invalid scheduled_at '{value}', posting it with the normal delay", "warning")
+                due = None
+            if due is None:
+                due = next_free
+                next_free += self.random_delay()
+            else:
+                scheduled += 1
+            due_times.append((due, key))
+
+        schedule = PostScheduler(due_times)
+        if schedule:
+            first_due = datetime.fromtimestamp(schedule.peek_due()).strftime('%Y-%m-%d %H:%M:%S')
+            self.log(f"Scheduled {len(schedule)} posts ({scheduled} with scheduled_at), first due {first_due}")
+        return schedule
+
+    def random_delay(self):
+        """Seconds between posts, from the configured range in hours"""
+        return random.uniform(self.config['post_delay_min'], self.config['post_delay_max']) * 3600
+
+    def compact_journal(self):
+        if not self.journal.has_entries():
+            self.journal.close()
+            return
+        try:
+            self.journal.compact()
+            self.log("Post state saved to CSV")
+        except Exception as e:
+            self.log(f"Could not compact journal into CSV: {str(e)}", "error")
+
+    def post_pending(self, pending_posts, store):
+        with self.prefetching(pending_posts) as prefetcher:
+            self.post_loop(prefetcher, store)
+
+    @contextmanager
+    def prefetching(self, pending_posts):
+        """Wrap a pending source in a look-ahead PostPrefetcher"""
+        preflight = self.start_preflight()
+        self.retries = retry.RetryQueue(pending_posts)
+        self.attempts = {}
+        self.open_dedup_index()
+        try:
+            yield PostPrefetcher(
+                self.retries,
+                lambda key, row: self.prepare_post(key, row, preflight),
+                self.config.get('lookahead_posts', 5)
+            )
+        finally:
+            if preflight is not None:
+                preflight.close()
+            self.close_dedup_index()
+
+    def open_dedup_index(self):
+        if not self.config.get('dedup', True):
+            return
+        dedup_dir = self.config.get('dedup_dir', 'dedup')
+        self.file_hashes = dedup.FileHashes(os.path.join(dedup_dir, dedup.HASHES_DB))
+        self.published = dedup.PublishedIndex(dedup.index_path(dedup_dir, self.metrics_account))
+        self.log(f"Duplicate check: {len(self.published)} posts already published from this account")
+
+    def close_dedup_index(self):
+        if self.published is not None:
+            self.published.close()
+            self.file_hashes.close()
+            self.published = self.file_hashes = None
+
+    def start_preflight(self):
+        convert = self.config.get('preprocess_images', False)
+        images = preprocess.is_available()
+        videos = media.ffmpeg_available()
+        if not images and convert:
+            self.log("Pillow is not installed, uploading original images", "warning")
+        if not images and not videos:
+            return None
+        if images and convert:
+            self.log("Pre-processing upcoming images in the background...")
+        return preprocess.ImagePreflight(
+            self.config.get('media_cache_dir', os.path.join('cache', 'media')),
+            quality=self.config.get('jpeg_quality', 90),
+            convert=convert,
+            images=images,
+            videos=videos
+        )
+
+    def prepare_post(self, key, row, preflight):
+        """Validate a row as it enters the look-ahead window"""
+        paths = [os.path.join(self.config['images_dir'], name) for name in media.media_files(row)]
+        img_path = paths[0] if paths else os.path.join(self.config['images_dir'], str(row['filename']))
+        if not self.config.get('repost_existing', False) and row['posted']:
+            return PreparedPost(key, row, img_path, skip=True)
+
+        media_type = media.media_type_of(row)
+        with self.timed('image_validation'):
+            problems = media.validate_media(media_type, paths)
+            try:
+                caption = self.render_caption(row)
+                problems.extend(validate_caption(caption))
+            except TemplateError as e:
+                caption = None
+                problems.append(str(e))
+
+        fingerprint = None
+        if not problems and self.published is not None:
+            try:
+                with self.timed('content_hashing'):
+                    fingerprint = dedup.fingerprint(paths, caption, self.file_hashes)
+            except OSError as e:
+                problems.append(f"Could not hash {row['filename']}: {str(e)}")
+
+        futures = []
+        if not problems and preflight is not None:
+            for path in paths:
+                if media.is_video(path):
+                    future = preflight.submit_video(path, media_type)
+                else:
+                    future = preflight.submit(path)
+                if future is not None:
+                    future.add_done_callback(lambda f: self.control.poke())
+                futures.append(future)
+        post = PreparedPost(key, row, img_path, problems, futures, media_type=media_type, paths=paths)
+        post.caption = caption
+        post.fingerprint = fingerprint
+        return post
+
+    def render_caption(self, row):
+        """The caption to post for a row, from its template if one applies"""
+        if self.caption_renderer is None:
+            return row['caption']
+        return self.caption_renderer.render(row)
+
+    def report_upcoming(self, prefetcher):
+        """Log look-ahead failures as soon as they are known"""
+        for post in prefetcher.upcoming():
+            if post.skip or post.reported or not post.failed():
+                continue
+            post.reported = True
+            for message in post.failure_messages():
+                self.log(f"Upcoming post {post.row['filename']} will be skipped: {message}", "warning")
+
+    def upload_media(self, post):
+        """Prepared files of a post in order, or None if one could not be prepared.
+
+        Photos are paths, videos media.VideoInfo objects.
+        """
+        prepared = []
+        for path, future in zip(post.paths, post.futures):
+            if future is None:
+                prepared.append(media.VideoInfo(path) if media.is_video(path) else path)
+                continue
+            try:
+                prepared.append(future.result())
+            except Exception as e:
+                if post.reported:
+                    self.log(f"Skipping {post.row['filename']}", "error")
+                else:
+                    self.log(f"Media check failed for {path}: {str(e)}", "error")
+                return None
+        return prepared
+
+    def upload(self, post, prepared, caption):
+        if post.media_type == media.ALBUM:
+            paths = [getattr(item, 'path', item) for item in prepared]
+            return self.client.album_upload(paths, caption)
+        if post.media_type in (media.VIDEO, media.REEL):
+            return self.client.video_upload(prepared[0], caption, reel=post.media_type == media.REEL)
+        return self.client.photo_upload(prepared[0], caption)
+
+    def post_loop(self, prefetcher, store):
+        for post in prefetcher:
+            if not self.control.wait_if_paused():
+                self.log("Process stopped by user")
+                break
+                    
+            if not self.start_post(post):
+                continue
+
+            wait_time = self.wait_time_for(post)
+            if wait_time:
+                self.report_upcoming(prefetcher)
+                
+                # Sleeps until the post is due, waking early only for stop,
+                # pause/resume or a look-ahead item finishing preparation
+                if not self.control.sleep(wait_time, on_poke=lambda: self.report_upcoming(prefetcher)):
+                    self.log("Process stopped by user during waiting period")
+                    break
+
+            self.publish(post, store)
+
+    def start_post(self, post):
+        """Returns False for rows that are skipped or failed validation"""
+        if post.skip:
+            return False
+
+        if post.problems:
+            if not post.reported:
+                for message in post.problems:
+                    self.log(message, "error")
+            else:
+                self.log(f"Skipping {post.row['filename']}", "error")
+            self.count('instagram_posts_total', result='invalid')
+            return False
+
+        # Show preview of what we're about to post
+        self.listener.on_preview(post.img_path, post.caption)
+        self.log(f"Preparing to post {post.row['filename']}...")
+        return True
+
+    def wait_time_for(self, post):
+        """Seconds to wait before posting: until the scheduled time, or a
+        random delay if this is not the first post"""
+        wait_time = 0
+        if post.due is not None:
+            wait_time = max(0, int(post.due - time.time()))
+            if wait_time:
+                due = datetime.fromtimestamp(post.due).strftime('%Y-%m-%d %H:%M:%S')
+                self.log(f"Waiting until {due} for scheduled post...")
+        elif self.current_post > 0:
+            wait_time = int(self.random_delay())
+            self.log(f"Waiting {wait_time / 3600:.1f} hours before next post...")
+
+        paused = self.breaker.remaining()
+        if paused > wait_time:
+            until = datetime.fromtimestamp(self.breaker.open_until).strftime('%Y-%m-%d %H:%M:%S')
+            self.log(f"Posting paused by circuit breaker until {until}", "warning")
+            wait_time = int(paused) + 1
+        return wait_time
+
+    def publish(self, post, store):
+        row = post.row
+        prepared = self.upload_media(post)
+        if prepared is None:
+            self.count('instagram_posts_total', result='invalid')
+            return
+
+        duplicate = self.find_duplicate(post)
+        if duplicate is not None:
+            self.log(f"Skipping {row['filename']}: {duplicate}", "warning")
+            self.count('instagram_posts_total', result='duplicate')
+            if not row['posted']:
+                # A posted row being reposted keeps its posting history
+                store.failed(post.key, row, retry.stored_attempts(row), duplicate)
+            return
+
+        try:
+            self.log(f"Posting {post.media_type}: {row['filename']}")
+            
+            # Handle hashtags specially if configured
+            caption = post.caption
+            if self.config.get('hashtags_in_first_comment', False) and '#' in caption:
+                parts = caption.split('#', 1)
+                main_caption = parts[0].strip()
+                hashtags = '#' + parts[1].strip()
+                
+                self.log("Moving hashtags to first comment...")
+                with self.timed('upload'):
+                    uploaded = self.upload(post, prepared, main_caption)
+                with self.timed('comment'):
+                    self.client.media_comment(uploaded.id, hashtags)
+                self.log("Comment with hashtags added")
+            else:
+                with self.timed('upload'):
+                    uploaded = self.upload(post, prepared, caption)
+            
+            self.log("Post successful!")
+            self.count('instagram_posts_total', result='posted')
+            
+            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            store.posted(post.key, row, timestamp, uploaded.id)
+            if self.published is not None and post.fingerprint is not None:
+                self.published.add(post.fingerprint, row['filename'], uploaded.id, timestamp)
+            self.breaker.record_success()
+            
+            # Update progress
+            self.current_post += 1
+            self.report_progress()
+            
+        except ClientThrottledError as e:
+            self.log("Instagram is rate limiting this account", "warning")
+            self.count('instagram_throttles_total')
+            self.count('instagram_posts_total', result='failed')
+            self.retry_later(post, store, e)
+            if self.breaker.record_failure():
+                until = datetime.fromtimestamp(self.breaker.open_until).strftime('%Y-%m-%d %H:%M:%S')
+                self.log(f"Rate limited repeatedly, pausing this account until {until}", "warning")
+                self.listener.on_status(f"Paused until {until} (rate limited)")
+                self.count('instagram_circuit_breaker_trips_total')
+            
+        except ClientConnectionError as e:
+            self.log("Network error during posting", "error")
+            self.count('instagram_connection_errors_total')
+            self.count('instagram_posts_total', result='failed')
+            self.retry_later(post, store, e)
+            
+        except LoginRequired as e:
+            self.log("Session expired, attempting to login again...", "warning")
+            self.count('instagram_posts_total', result='failed')
+            self.retry_later(post, store, e)
+            self.relogin()
+            
+        except Exception as e:
+            self.log(f"Post failed: {str(e)}", "error")
+            self.count('instagram_posts_total', result='failed')
+            self.retry_later(post, store, e)
+            
+            # Try to check if we've been logged out
+            try:
+                self.client.account_info()
+            except LoginRequired:
+                self.log("Session expired, attempting to login again...", "warning")
+                self.relogin()
+            except Exception:
+                pass  # Other error, continue with next post
+
+    def relogin(self):
+        """Log in again after a call failed with LoginRequired"""
+        self.session_health.invalidate()
+        self.count('instagram_retries_total', operation='login')
+        self.login()
+
+    def find_duplicate(self, post):
+        """Why a post repeats one already published, or None.
+
+        Applies with repost_existing too; set dedup to false to post
+        duplicates on purpose. A repeated caption alone only skips the
+        post with dedup_captions.
+        """
+        if self.published is None or post.fingerprint is None:
+            return None
+        match = self.published.find(post.fingerprint)
+        if match is None:
+            return None
+        reason, entry = match
+        earlier = f"{entry['filename']} (posted {entry['posted_at']}, media {entry['media_id']})"
+        if reason == 'caption':
+            if self.config.get('dedup_captions', False):
+                return f"same caption as {earlier}"
+            self.log(f"{post.row['filename']} has the same caption as {earlier}", "warning")
+            return None
+        if reason == 'image':
+            return f"looks the same as {earlier}"
+        return f"same file as {earlier}"
+
+    def retry_later(self, post, store, error):
+        """Requeue a failed post with backoff, or give up once its policy is exhausted"""
+        kind = retry.classify(error)
+        policy = self.retry_policies[kind]
+        attempts = self.attempts.get(post.key, retry.stored_attempts(post.row)) + 1
+        self.attempts[post.key] = attempts
+        filename = post.row['filename']
+
+        if policy.exhausted(attempts):
+            self.log(f"Giving up on {filename} after {attempts} attempts", "error")
+            store.failed(post.key, post.row, attempts, str(error))
+            return
+
+        next_attempt = time.time() + policy.delay(attempts)
+        due = datetime.fromtimestamp(next_attempt).strftime('%Y-%m-%d %H:%M:%S')
+        self.log(f"Will retry {filename} at {due} (attempt {attempts + 1} of {policy.max_attempts})", "warning")
+        store.retry(post.key, post.row, attempts, next_attempt, str(error))
+        self.retries.push(next_attempt, post.key, post.row)
+        self.count('instagram_retries_total', operation=kind)
+
+    def pause(self):
+        self.control.pause()
+        self.listener.on_status("Paused")
+        
+    def resume(self):
+        self.control.resume()
+        self.listener.on_status("Running")
+
+    def stop(self):
+        self.control.stop()
+        self.awaiting_2fa.set()  # Don't leave the thread blocked on a 2FA prompt
+        self.listener.on_status("Stopping...")
@@ -0,0 +1,124 @@
+import os
+import csv
+import json
+import tempfile
+from posts_csv import apply_entry, journal_entry
+
+
+# Added to the CSV the first time a post is retried
+RETRY_COLUMNS = ("attempts", "next_attempt_at", "failed")
+
+
+class PostJournal:
+    """Append-only log of post state changes, compacted back into the CSV.
+
+    Every successful upload appends one line and fsyncs it, so a crash can
+    lose at most the line being written and never truncates the CSV itself.
+    Entries are keyed by the post's data row index, which compaction resets
+    along with the journal.
+    """
+
+    def __init__(self, csv_path):
+        self.csv_path = csv_path
+        self.path = csv_path + ".journal"
+        self._file = None
+
+    def record(self, row, filename, status, timestamp="", media_id=None, **fields):
+        """Append a state change of data row row; fields carries retry state (attempts, next_attempt_at)"""
+        entry = {"row": row, "filename": filename, "status": status, "timestamp": timestamp}
+        if media_id is not None:
+            entry["media_id"] = str(media_id)
+        entry.update(fields)
+
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def replay(self):
+        """Return the latest journal entry for each data row index"""
+        state = {}
+        if not os.path.exists(self.path):
+            return state
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Torn last line from an interrupted write
+                # Older journals keyed entries by filename
+                state[entry["row"] if "row" in entry else entry["key"]] = entry
+        return state
+
+    def read_from(self, offset):
+        """Read entries appended since offset, returns (entries, new_offset)
+
+        A trailing line without a newline is still being written and is left
+        for the next read.
+        """
+        entries = []
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+        return entries, offset + end
+
+    def compact(self):
+        """Rewrite the CSV with the journaled state and reset the journal.
+
+        The CSV is streamed row by row into a temporary file that replaces
+        it atomically; columns the app doesn't use are copied unchanged.
+        Returns the number of rows updated.
+        """
+        self.close()
+        state = self.replay()
+        changed = 0
+        directory = os.path.dirname(os.path.abspath(self.csv_path))
+        fd, tmp_path = tempfile.mkstemp(suffix=".csv", dir=directory)
+        try:
+            with open(self.csv_path, "r", encoding="utf-8-sig", newline="") as src, \
+                    os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+                reader = csv.DictReader(src)
+                fieldnames = list(reader.fieldnames or [])
+                extra = ["posted", "timestamp"]
+                if any(entry["status"] in ("retry", "failed") for entry in state.values()):
+                    extra.extend(RETRY_COLUMNS)
+                fieldnames.extend(column for column in extra if column not in fieldnames)
+
+                writer = csv.DictWriter(f, fieldnames, restval="", extrasaction="ignore")
+                writer.writeheader()
+                for index, row in enumerate(reader):
+                    if row.get("posted") in (None, ""):
+                        row["posted"] = False
+                    entry = journal_entry(state, index, row["filename"])
+                    if entry is not None:
+                        apply_entry(row, entry)
+                        changed += 1
+                    writer.writerow(row)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.csv_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        return changed
+
+    def has_entries(self):
+        return os.path.exists(self.path) and os.path.getsize(self.path) > 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
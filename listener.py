@@ -0,0 +1,25 @@
+class EngineListener:
+    """Receives engine events; subclasses override what they need.
+
+    The Qt worker turns them into signals, the CLI into log lines. It lives
+    apart from the engine so the GUI can define its listeners without
+    importing the engine at startup.
+    """
+
+    def on_log(self, message, level):
+        pass
+
+    def on_status(self, status):
+        pass
+
+    def on_progress(self, current, total):
+        pass
+
+    def on_preview(self, image_path, caption):
+        pass
+
+    def on_require_2fa(self):
+        pass
+
+    def on_require_challenge(self, username):
+        pass
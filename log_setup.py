@@ -0,0 +1,271 @@
+"""File logging for the posting engines.
+
+Engine threads only put records on a queue; one QueueListener thread
+writes them out, so a slow disk never stalls an upload. Records go to
+a shared text log and to a JSON-lines log per account. Both rotate by
+size and by age, and rotated files are gzip-compressed.
+"""
+import os
+import gzip
+import json
+import time
+import queue
+import atexit
+import shutil
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOGGER_NAME = "InstagramAutoPost"
+MAX_BYTES = 10 * 1024 * 1024
+BACKUP_COUNT = 10
+ROTATE_SECONDS = 24 * 3600
+FLUSH_SECONDS = 0.2
+
+LEVELS = {'debug': logging.DEBUG, 'info': logging.INFO, 'warning': logging.WARNING, 'error': logging.ERROR}
+
+_lock = threading.Lock()
+_active = None  # (log_dir, QueueHandler, QueueListener)
+
+
+def log_message(logger, level, message, **fields):
+    """Log message at level ("info", "error", ...) with fields as record attributes.
+
+    Builds the record itself: Logger.info walks the stack for the caller's
+    file and line, which none of the log formats show.
+    """
+    levelno = LEVELS.get(level)
+    if levelno is not None and logger.isEnabledFor(levelno):
+        logger.handle(logger.makeRecord(logger.name, levelno, "", 0, message, None, None, extra=fields))
+
+
+def gzip_rotator(source, dest):
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+class RotatingCompressedFileHandler(RotatingFileHandler):
+    """Rolls over at max_bytes or every interval seconds, whichever is first.
+
+    Old files are kept as name.1.gz ... name.N.gz. The size is tracked
+    here rather than asked of the stream, as tell() on a text file is slow.
+    """
+
+    def __init__(self, filename, max_bytes=MAX_BYTES, backup_count=BACKUP_COUNT, interval=ROTATE_SECONDS):
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+        self.namer = lambda name: name + ".gz"
+        self.rotator = gzip_rotator
+        self.interval = interval
+        # A file left by an earlier run keeps its size and age
+        try:
+            self.size = os.path.getsize(filename)
+            started = os.path.getmtime(filename)
+        except OSError:
+            self.size = 0
+            started = time.time()
+        self.rollover_at = started + interval
+
+    def emit(self, record):
+        try:
+            message = self.format(record) + self.terminator
+            # maxBytes counts bytes on disk, not characters
+            size = len(message) if message.isascii() else len(message.encode(self.encoding or 'utf-8'))
+            if self.size and (
+                (self.maxBytes and self.size + size > self.maxBytes)
+                or (self.interval and record.created >= self.rollover_at)
+            ):
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(message)
+            self.size += size
+        except Exception:
+            self.handleError(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.size = 0
+        self.rollover_at = time.time() + self.interval
+
+    def flush(self):
+        # Called after every record; the listener calls write_out() once
+        # per batch instead. Closing the stream still flushes it.
+        pass
+
+    def write_out(self):
+        with self.lock:
+            if self.stream:
+                self.stream.flush()
+
+
+class BatchingQueueListener(QueueListener):
+    """QueueListener that wakes at most every FLUSH_SECONDS.
+
+    Waking for every record makes the writer thread fight the engines for
+    the GIL; sleeping while the queue is empty lets records pile up and be
+    written, and flushed to disk, in one go.
+    """
+
+    def dequeue(self, block):
+        if block and self.queue.empty():
+            for handler in self.handlers:
+                handler.write_out()
+            time.sleep(FLUSH_SECONDS)
+        return self.queue.get(block)
+
+
+class LocalQueueHandler(QueueHandler):
+    """Puts records on the queue as they are.
+
+    QueueHandler formats and copies each record so it could be pickled to
+    another process; the listener here is a thread, and formats them itself.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class StampFormatter(logging.Formatter):
+    """Formatter that renders the date and time once per second.
+
+    Records arrive many per second, and strftime is most of the cost of
+    formatting one. Each instance is used with a single datefmt.
+    """
+
+    def __init__(self, fmt=None, datefmt=None):
+        super().__init__(fmt, datefmt)
+        self.stamp = (None, None)  # (second, text), replaced as one for other threads
+
+    def formatTime(self, record, datefmt=None):
+        second = int(record.created)
+        stamp_second, text = self.stamp
+        if stamp_second != second:
+            text = time.strftime(datefmt or self.default_time_format, self.converter(record.created))
+            self.stamp = (second, text)
+        if datefmt:
+            return text
+        return self.default_msec_format % (text, record.msecs)
+
+
+class TextFormatter(StampFormatter):
+    """Plain text lines, prefixed with the account when there is one"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s - %(levelname)s - %(message)s')
+
+    def formatMessage(self, record):
+        account = getattr(record, 'account', None)
+        if account:
+            record.message = f"[{account}] {record.message}"
+        return super().formatMessage(record)
+
+
+class JsonFormatter(StampFormatter):
+    """One JSON object per line"""
+
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname.lower(),
+            'account': getattr(record, 'account', None),
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return self.encode(entry)
+
+
+class AccountLogRouter(logging.Handler):
+    """Writes each record to <log_dir>/accounts/<account>.jsonl.
+
+    Runs on the listener thread only, so the handler map needs no lock.
+    """
+
+    def __init__(self, log_dir, **rotation):
+        super().__init__()
+        self.log_dir = os.path.join(log_dir, "accounts")
+        self.rotation = rotation
+        self.handlers = {}
+        self.formatter = JsonFormatter()
+
+    def handler_for(self, account):
+        handler = self.handlers.get(account)
+        if handler is None:
+            safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in account)
+            handler = RotatingCompressedFileHandler(
+                os.path.join(self.log_dir, f"{safe}.jsonl"), **self.rotation
+            )
+            handler.setFormatter(self.formatter)
+            self.handlers[account] = handler
+        return handler
+
+    def emit(self, record):
+        account = getattr(record, 'account', None)
+        if account:
+            self.handler_for(account).handle(record)
+
+    def write_out(self):
+        for handler in self.handlers.values():
+            handler.write_out()
+
+    def close(self):
+        for handler in self.handlers.values():
+            handler.close()
+        super().close()
+
+
+def setup_logging(log_dir, level=logging.INFO, max_bytes=MAX_BYTES, backup_count=BACKUP_COUNT,
+                  interval=ROTATE_SECONDS):
+    """Route the InstagramAutoPost loggers through a queue to log_dir.
+
+    Safe to call for every engine: later calls with the same directory
+    reuse the running listener, a new directory replaces it.
+    """
+    global _active
+    log_dir = os.path.abspath(log_dir)
+    with _lock:
+        if _active is not None:
+            if _active[0] == log_dir:
+                return
+            _stop()
+
+        rotation = {'max_bytes': max_bytes, 'backup_count': backup_count, 'interval': interval}
+        text_handler = RotatingCompressedFileHandler(os.path.join(log_dir, "instagram_posting.log"), **rotation)
+        text_handler.setFormatter(TextFormatter())
+
+        records = queue.SimpleQueue()
+        listener = BatchingQueueListener(
+            records, text_handler, AccountLogRouter(log_dir, **rotation), respect_handler_level=True
+        )
+        queue_handler = LocalQueueHandler(records)
+
+        logger = logging.getLogger(LOGGER_NAME)
+        logger.addHandler(queue_handler)
+        if logger.level == logging.NOTSET or logger.level > level:
+            logger.setLevel(level)
+        listener.start()
+        _active = (log_dir, queue_handler, listener)
+
+
+def _stop():
+    global _active
+    _, queue_handler, listener = _active
+    logging.getLogger(LOGGER_NAME).removeHandler(queue_handler)
+    listener.stop()  # Drains the queue first
+    for handler in listener.handlers:
+        handler.close()
+    _active = None
+
+
+def shutdown_logging():
+    """Flush queued records and close the files"""
+    with _lock:
+        if _active is not None:
+            _stop()
+
+
+atexit.register(shutdown_logging)
@@ -1,12 +1,31 @@
 import sys
+import asyncio
+from PyQt5.QtCore import QSettings
 from PyQt5.QtWidgets import QApplication
 from main_window import InstagramAutoPostApp
 
+def install_qasync_loop(app):
+    """Let the asyncio accounts engine share the Qt event loop if qasync is installed"""
+    if QSettings("InstagramAutoPoster", "ProApp").value("asyncio_engine", "false") != "true":
+        return None
+    try:
+        import qasync
+    except ImportError:
+        return None
+    loop = qasync.QEventLoop(app)
+    asyncio.set_event_loop(loop)
+    return loop
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
     app_icon = QApplication.style().standardIcon(QApplication.style().SP_DialogApplyButton)
     app.setWindowIcon(app_icon)
+    loop = install_qasync_loop(app)
     window = InstagramAutoPostApp()
     window.show()
+    if loop is not None:
+        with loop:
+            # qasync runs app.exec_() itself and returns when the app quits
+            sys.exit(loop.run_forever())
     sys.exit(app.exec_())
@@ -1,20 +1,27 @@
 import os
+import csv
 from datetime import datetime
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-    QLineEdit, QPushButton, QSpinBox, QFileDialog, QTextEdit,
+    QLineEdit, QPushButton, QSpinBox, QFileDialog,
     QFormLayout, QMessageBox, QGroupBox, QTabWidget, QProgressBar, QToolButton, QSystemTrayIcon,
-    QMenu, QAction, QApplication
+    QMenu, QAction, QApplication, QComboBox
 )
 from PyQt5.QtCore import (
-    QSettings
-)
-from PyQt5.QtGui import (
-    QTextCursor
+    QSettings, QTimer
 )
 from worker import InstagramWorker
+from journal import PostJournal
+from post_queue import SQLitePostQueue
+from posts_loader import LibraryHasher
 from dialogs import AuthDialog
-from widgets import PostPreviewWidget, PostsTableWidget, SettingsWidget
+from widgets import (
+    PostPreviewWidget, PostsTableWidget, SettingsWidget, AccountsDashboard, MetricsPanel, LogPane
+)
+from metrics import default_registry, MetricsExporter
+from captions import parse_pools
+from accounts import AccountRegistry
+from orchestrator import AccountOrchestrator, AsyncOrchestrator
 
 class InstagramAutoPostApp(QMainWindow):
     def __init__(self):
@@ -22,10 +29,33 @@ class InstagramAutoPostApp(QMainWindow):
         self.setWindowTitle("Instagram Auto Poster Pro")
         self.setGeometry(100, 100, 1000, 700)
         self.worker = None
+        self.library_hasher = None
+        self.hashing_queue = []  # (csv_path, images_dir, dedup_dir) waiting for the hasher
         
         # Load QSettings
         self.settings = QSettings("InstagramAutoPoster", "ProApp")
         
+        # Accounts driven from the Accounts tab, one worker each
+        self.accounts = AccountRegistry(self.settings.value("accounts_file", "accounts.json"))
+        max_accounts = int(self.settings.value("max_concurrent_accounts", 8))
+        if self.settings.value("asyncio_engine", "false") == "true":
+            self.orchestrator = AsyncOrchestrator(max_accounts, int(self.settings.value("blocking_calls", 16)))
+        else:
+            self.orchestrator = AccountOrchestrator(max_accounts)
+        self.orchestrator.account_log.connect(lambda name, message, level: self.log(message, level, name))
+        
+        # Prometheus exporter, off unless a metrics port is set
+        self.metrics_exporter = None
+        exporter_error = None
+        metrics_port = int(self.settings.value("metrics_port", 0))
+        if metrics_port:
+            exporter = MetricsExporter(default_registry(), metrics_port)
+            try:
+                exporter.start()
+                self.metrics_exporter = exporter
+            except OSError as e:
+                exporter_error = f"Could not start metrics exporter on port {metrics_port}: {str(e)}"
+        
         # Set up system tray icon
         self.setup_tray_icon()
         
@@ -37,6 +67,9 @@ class InstagramAutoPostApp(QMainWindow):
         
         # Ensure directories exist
         self.ensure_directories()
+        
+        if exporter_error:
+            self.log(exporter_error, "error")
 
     def setup_tray_icon(self):
         # Create system tray icon
@@ -70,8 +103,17 @@ class InstagramAutoPostApp(QMainWindow):
             self.show()
             self.activateWindow()
     
+    def tasks_running(self):
+        worker_running = self.worker is not None and self.worker.isRunning()
+        return worker_running or self.orchestrator.active_count() > 0
+        
+    def stop_all_tasks(self):
+        if self.worker:
+            self.worker.stop()
+        self.orchestrator.stop()
+    
     def quit_app(self):
-        if self.worker and self.worker.isRunning():
+        if self.tasks_running():
             reply = QMessageBox.question(
                 self, "Confirm Exit", 
                 "A posting task is currently running. Quitting will stop the task. Continue?",
@@ -80,14 +122,13 @@ class InstagramAutoPostApp(QMainWindow):
             )
             
             if reply == QMessageBox.Yes:
-                if self.worker:
-                    self.worker.stop()
+                self.stop_all_tasks()
                 QApplication.quit()
         else:
             QApplication.quit()
     
     def closeEvent(self, event):
-        if self.worker and self.worker.isRunning():
+        if self.tasks_running():
             reply = QMessageBox.question(
                 self, "Minimize to Tray", 
                 "A posting task is running. Do you want to minimize to system tray?",
@@ -107,8 +148,7 @@ class InstagramAutoPostApp(QMainWindow):
             elif reply == QMessageBox.Cancel:
                 event.ignore()
             else:
-                if self.worker:
-                    self.worker.stop()
+                self.stop_all_tasks()
                 event.accept()
         else:
             event.accept()
@@ -283,8 +323,34 @@ class InstagramAutoPostApp(QMainWindow):
         # Create the posts table for preview
         right_column = QVBoxLayout()
         self.posts_table = PostsTableWidget()
+        
+        filter_layout = QHBoxLayout()
+        self.posts_filter = QLineEdit()
+        self.posts_filter.setPlaceholderText("Filter by filename or caption")
+        self.posts_filter.textChanged.connect(self.posts_table.set_filter)
+        self.status_filter = QComboBox()
+        self.status_filter.addItem("All", None)
+        self.status_filter.addItem("Pending", "pending")
+        self.status_filter.addItem("Retrying", "retrying")
+        self.status_filter.addItem("Failed", "failed")
+        self.status_filter.addItem("Posted", "posted")
+        self.status_filter.currentIndexChanged.connect(
+            lambda: self.posts_table.set_status_filter(self.status_filter.currentData())
+        )
+        filter_layout.addWidget(self.posts_filter)
+        filter_layout.addWidget(self.status_filter)
+        
+        self.posts_load_bar = QProgressBar()
+        self.posts_load_bar.setFormat("Loading posts... %p%")
+        self.posts_load_bar.setMaximumHeight(16)
+        self.posts_load_bar.hide()
+        self.posts_table.loading_progress.connect(self.update_posts_load_progress)
+        self.posts_table.loading_finished.connect(self.posts_load_bar.hide)
+        
         right_column.addWidget(QLabel("<b>Posts from CSV:</b>"))
+        right_column.addLayout(filter_layout)
         right_column.addWidget(self.posts_table)
+        right_column.addWidget(self.posts_load_bar)
         
         # Add post preview
         self.preview_widget = PostPreviewWidget()
@@ -302,10 +368,7 @@ class InstagramAutoPostApp(QMainWindow):
         logs_tab = QWidget()
         logs_layout = QVBoxLayout()
         
-        self.log_output = QTextEdit()
-        self.log_output.setReadOnly(True)
-        self.log_output.setLineWrapMode(QTextEdit.NoWrap)
-        self.log_output.setStyleSheet("font-family: monospace;")
+        self.log_pane = LogPane()
         
         log_controls = QHBoxLayout()
         self.clear_log_btn = QPushButton("Clear Log")
@@ -318,16 +381,29 @@ class InstagramAutoPostApp(QMainWindow):
         log_controls.addStretch()
         
         logs_layout.addWidget(QLabel("<b>Activity Log:</b>"))
-        logs_layout.addWidget(self.log_output)
+        logs_layout.addWidget(self.log_pane)
         logs_layout.addLayout(log_controls)
         logs_tab.setLayout(logs_layout)
         
+        # Accounts Tab
+        self.accounts_dashboard = AccountsDashboard(self.accounts, self.orchestrator, self.get_config)
+        self.accounts_dashboard.max_workers.valueChanged.connect(
+            lambda value: self.settings.setValue("max_concurrent_accounts", value)
+        )
+        
+        # Metrics Tab
+        self.metrics_panel = MetricsPanel(
+            default_registry(), self.metrics_exporter.url if self.metrics_exporter else None
+        )
+        
         # Settings Tab
         self.settings_widget = SettingsWidget(self.settings)
         
         # Add all tabs
         self.tabs.addTab(post_tab, "Post Setup")
+        self.tabs.addTab(self.accounts_dashboard, "Accounts")
         self.tabs.addTab(logs_tab, "Logs")
+        self.tabs.addTab(self.metrics_panel, "Metrics")
         self.tabs.addTab(self.settings_widget, "Settings")
         
         layout.addWidget(self.tabs)
@@ -343,10 +419,23 @@ class InstagramAutoPostApp(QMainWindow):
         new_csv_action = QAction("Create New CSV", self)
         new_csv_action.triggered.connect(self.create_new_csv)
         
+        compact_action = QAction("Compact Post Journal", self)
+        compact_action.triggered.connect(self.compact_journal)
+        
+        import_queue_action = QAction("Import CSV into Queue...", self)
+        import_queue_action.triggered.connect(self.import_csv_to_queue)
+        
+        export_queue_action = QAction("Export Queue to CSV...", self)
+        export_queue_action.triggered.connect(self.export_queue_to_csv)
+        
         exit_action = QAction("Exit", self)
         exit_action.triggered.connect(self.quit_app)
         
         file_menu.addAction(new_csv_action)
+        file_menu.addAction(compact_action)
+        file_menu.addSeparator()
+        file_menu.addAction(import_queue_action)
+        file_menu.addAction(export_queue_action)
         file_menu.addSeparator()
         file_menu.addAction(exit_action)
         
@@ -383,8 +472,9 @@ class InstagramAutoPostApp(QMainWindow):
         post_delay_max = int(self.settings.value("post_delay_max", 0)) // 3600
         self.post_max.setValue(post_delay_max)
         
-        # Load CSV preview if possible
-        self.refresh_posts_table()
+        # Load CSV preview once the window has painted, so a large
+        # calendar doesn't hold up startup
+        QTimer.singleShot(0, self.refresh_posts_table)
         
     def save_current_settings(self):
         # Save current values
@@ -437,7 +527,9 @@ class InstagramAutoPostApp(QMainWindow):
         csv_path = self.csv_path.text()
         img_dir = self.img_dir.text()
         
-        if os.path.exists(csv_path):
+        if self.settings.value("queue_backend", "csv") == "sqlite":
+            self.posts_table.load_queue(self.settings.value("queue_db", "posts_queue.db"), img_dir)
+        elif os.path.exists(csv_path):
             self.posts_table.load_data(csv_path, img_dir)
         
     def create_new_csv(self):
@@ -452,15 +544,11 @@ class InstagramAutoPostApp(QMainWindow):
             
         try:
             # Create a template CSV
-            df = pd.DataFrame({
-                'filename': ['image1.jpg', 'image2.jpg'],
-                'caption': ['Your caption for post 1 #hashtag1 #hashtag2', 
-                           'Your caption for post 2 #awesome #instagram'],
-                'posted': [False, False],
-                'timestamp': ['', '']
-            })
-            
-            df.to_csv(file_path, index=False)
+            with open(file_path, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['filename', 'caption', 'posted', 'timestamp'])
+                writer.writerow(['image1.jpg', 'Your caption for post 1 #hashtag1 #hashtag2', False, ''])
+                writer.writerow(['image2.jpg', 'Your caption for post 2 #awesome #instagram', False, ''])
             
             # Ask if user wants to use this CSV
             reply = QMessageBox.question(
@@ -479,8 +567,111 @@ class InstagramAutoPostApp(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Could not create CSV file: {str(e)}")
             
+    def compact_journal(self):
+        # Account runs journal their own CSVs, which may be this one
+        if self.tasks_running():
+            QMessageBox.warning(
+                self, "Task Running",
+                "The journal is compacted automatically when the posting tasks end."
+            )
+            return
+
+        csv_path = self.csv_path.text()
+        journal = PostJournal(csv_path)
+        if not journal.has_entries():
+            QMessageBox.information(self, "Nothing to Compact", "The post journal is empty.")
+            return
+
+        try:
+            changed = journal.compact()
+            self.log(f"Compacted post journal into {csv_path} ({changed} posts updated)")
+            self.refresh_posts_table()
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Could not compact journal: {str(e)}")
+            
+    def import_csv_to_queue(self):
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "Import CSV into Queue", os.path.dirname(self.csv_path.text()) or os.getcwd(),
+            "CSV Files (*.csv);;All Files (*)"
+        )
+        
+        if not file_path:
+            return
+            
+        db_path = self.settings.value("queue_db", "posts_queue.db")
+        try:
+            queue = SQLitePostQueue(db_path)
+            try:
+                added, skipped = queue.import_csv(file_path)
+            finally:
+                queue.close()
+            self.log(f"Imported {added} posts into {db_path} ({skipped} already queued)")
+            self.refresh_posts_table()
+            self.start_library_hashing(file_path)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Could not import CSV: {str(e)}")
+            
+    def start_library_hashing(self, csv_path):
+        """Hash the imported files in the background so duplicate checks are lookups.
+
+        Imports made while an earlier one is still hashing wait their turn.
+        """
+        if self.settings.value("dedup", "true") != "true":
+            return
+        self.hashing_queue.append(
+            (csv_path, self.img_dir.text(), self.settings.value("dedup_dir", "dedup"))
+        )
+        if self.library_hasher is None:
+            self.hash_next_library()
+
+    def hash_next_library(self):
+        if not self.hashing_queue:
+            self.library_hasher = None
+            return
+        self.library_hasher = LibraryHasher(*self.hashing_queue.pop(0))
+        self.library_hasher.hashed.connect(
+            lambda count: self.log(f"Hashed {count} new files for the duplicate check")
+        )
+        self.library_hasher.hash_failed.connect(
+            lambda error: self.log(f"Could not hash imported files: {error}", "warning")
+        )
+        self.library_hasher.finished.connect(self.on_library_hashed)
+        self.library_hasher.start()
+
+    def on_library_hashed(self):
+        if self.sender() is not self.library_hasher:
+            return
+        # finished comes just before the thread exits; the wait is that short
+        self.library_hasher.wait()
+        self.hash_next_library()
+            
+    def export_queue_to_csv(self):
+        db_path = self.settings.value("queue_db", "posts_queue.db")
+        if not os.path.exists(db_path):
+            QMessageBox.critical(self, "Error", f"Queue database not found: {db_path}")
+            return
+            
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Export Queue to CSV", os.getcwd(),
+            "CSV Files (*.csv);;All Files (*)"
+        )
+        
+        if not file_path:
+            return
+            
+        try:
+            queue = SQLitePostQueue(db_path)
+            try:
+                queue.export_csv(file_path)
+            finally:
+                queue.close()
+            self.log(f"Exported queue {db_path} to {file_path}")
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Could not export queue: {str(e)}")
+            
     def get_config(self):
         # Create configuration dictionary for the worker
+        template = self.settings.value("caption_template", "")
         config = {
             'username': self.username.text(),
             'password': self.password.text(),
@@ -493,7 +684,21 @@ class InstagramAutoPostApp(QMainWindow):
             'post_delay_max': self.post_max.value(),
             'log_dir': self.settings.value("log_dir", "logs"),
             'hashtags_in_first_comment': self.settings.value("hashtags_in_comment", "false") == "true",
-            'repost_existing': self.settings.value("repost_existing", "false") == "true"
+            'caption_templates': {'default': template} if template.strip() else {},
+            'hashtag_pools': parse_pools(self.settings.value("hashtag_pools", "")),
+            'caption_signature': self.settings.value("caption_signature", ""),
+            'repost_existing': self.settings.value("repost_existing", "false") == "true",
+            'dedup': self.settings.value("dedup", "true") == "true",
+            'dedup_captions': self.settings.value("dedup_captions", "false") == "true",
+            'dedup_dir': self.settings.value("dedup_dir", "dedup"),
+            'queue_backend': self.settings.value("queue_backend", "csv"),
+            'queue_db': self.settings.value("queue_db", "posts_queue.db"),
+            'preprocess_images': self.settings.value("preprocess_images", "false") == "true",
+            'jpeg_quality': int(self.settings.value("jpeg_quality", 90)),
+            'media_cache_dir': self.settings.value("media_cache_dir", os.path.join("cache", "media")),
+            'lookahead_posts': int(self.settings.value("lookahead_posts", 5)),
+            'session_validation_ttl': int(self.settings.value("session_check_minutes", 360)) * 60,
+            'timezone': self.settings.value("timezone", "")
         }
         return config
         
@@ -505,8 +710,12 @@ class InstagramAutoPostApp(QMainWindow):
             
         config = self.get_config()
         
-        # Check CSV and images directory
-        if not os.path.exists(config['csv_path']):
+        # Check post source and images directory
+        if config['queue_backend'] == 'sqlite':
+            if not os.path.exists(config['queue_db']):
+                QMessageBox.critical(self, "Invalid Input", "Queue database not found")
+                return
+        elif not os.path.exists(config['csv_path']):
             QMessageBox.critical(self, "Invalid Input", "CSV file not found")
             return
             
@@ -587,20 +796,14 @@ class InstagramAutoPostApp(QMainWindow):
         if dialog.exec_():
             self.worker.complete_challenge(dialog.get_code())
             
-    def log(self, message):
-        now = datetime.now().strftime('%H:%M:%S')
-        self.log_output.append(f"[{now}] {message}")
-        
-        # Auto-scroll to bottom
-        cursor = self.log_output.textCursor()
-        cursor.movePosition(QTextCursor.End)
-        self.log_output.setTextCursor(cursor)
+    def log(self, message, level="info", account=""):
+        self.log_pane.append(message, level, account)
         
     def clear_log(self):
-        self.log_output.clear()
+        self.log_pane.clear()
         
     def save_log(self):
-        log_text = self.log_output.toPlainText()
+        log_text = self.log_pane.text()
         if not log_text:
             QMessageBox.information(self, "Empty Log", "There is no log content to save.")
             return
@@ -626,6 +829,11 @@ class InstagramAutoPostApp(QMainWindow):
         self.progress_bar.setMaximum(total)
         self.progress_bar.setValue(current)
         
+    def update_posts_load_progress(self, loaded, total):
+        self.posts_load_bar.setMaximum(max(total, 1))
+        self.posts_load_bar.setValue(loaded)
+        self.posts_load_bar.setVisible(loaded < total)
+        
     def update_preview(self, image_path, caption):
         self.preview_widget.set_preview(image_path, caption)
         
@@ -0,0 +1,184 @@
+"""Post media types: single photos, albums, videos and Reels.
+
+A row's media_type column picks the kind of post; rows without one are
+photos, or videos when the file is a video. Album rows list their files
+in the filename column separated by "|".
+
+Videos are probed, transcoded when Instagram would reject them, and get
+a thumbnail with ffmpeg. That runs in a worker process, like image
+preparation, and is skipped if ffmpeg is not installed.
+"""
+import os
+import json
+import shutil
+import tempfile
+import subprocess
+from preprocess import content_hash
+
+PHOTO = 'photo'
+ALBUM = 'album'
+VIDEO = 'video'
+REEL = 'reel'
+MEDIA_TYPES = (PHOTO, ALBUM, VIDEO, REEL)
+
+PHOTO_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+VIDEO_EXTENSIONS = ('.mp4', '.mov')
+ALBUM_SEPARATOR = '|'
+MAX_ALBUM_ITEMS = 10
+
+# Instagram video limits
+MAX_VIDEO_WIDTH = 1080
+VIDEO_CODECS = ('h264',)
+AUDIO_CODECS = ('aac',)
+MAX_VIDEO_SECONDS = {VIDEO: 60 * 60, REEL: 15 * 60}
+
+# Bump when the output of prepare_video changes so old cache entries are ignored
+PIPELINE_VERSION = 1
+
+
+def is_video(path):
+    return path.lower().endswith(VIDEO_EXTENSIONS)
+
+
+def media_files(row):
+    """File names of a row, several for an album"""
+    return [name.strip() for name in str(row['filename']).split(ALBUM_SEPARATOR) if name.strip()]
+
+
+def media_type_of(row):
+    value = row.get('media_type')
+    if isinstance(value, str) and value.strip():
+        return value.strip().lower()
+    files = media_files(row)
+    if len(files) > 1:
+        return ALBUM
+    if files and is_video(files[0]):
+        return VIDEO
+    return PHOTO
+
+
+def validate_media(media_type, paths):
+    """Problems that would make the upload fail, empty if none"""
+    if media_type not in MEDIA_TYPES:
+        return [f"Unknown media type: {media_type}"]
+    if not paths:
+        return ["No media file given"]
+
+    problems = []
+    if media_type == ALBUM:
+        if not 2 <= len(paths) <= MAX_ALBUM_ITEMS:
+            problems.append(f"Albums need 2 to {MAX_ALBUM_ITEMS} files, got {len(paths)}")
+        extensions = PHOTO_EXTENSIONS + VIDEO_EXTENSIONS
+    elif media_type == PHOTO:
+        extensions = PHOTO_EXTENSIONS
+    else:
+        extensions = VIDEO_EXTENSIONS
+        if len(paths) > 1:
+            problems.append(f"A {media_type} post takes one file, got {len(paths)}")
+
+    for path in paths:
+        if not os.path.exists(path):
+            problems.append(f"Media not found: {path}")
+        elif not path.lower().endswith(extensions):
+            problems.append(f"Unsupported {media_type} format: {path}")
+    return problems
+
+
+def ffmpeg_available():
+    return shutil.which('ffmpeg') is not None and shutil.which('ffprobe') is not None
+
+
+class VideoInfo:
+    """A video ready to upload, with what Instagram asks for when it is configured"""
+
+    def __init__(self, path, thumbnail=None, width=None, height=None, duration=None):
+        self.path = path
+        self.thumbnail = thumbnail
+        self.width = width
+        self.height = height
+        self.duration = duration
+
+
+def probe_video(path):
+    """(width, height, duration, video codec, audio codec) from ffprobe"""
+    output = subprocess.run(
+        ['ffprobe', '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', path],
+        capture_output=True, check=True, text=True
+    ).stdout
+    data = json.loads(output)
+    video = next((s for s in data['streams'] if s.get('codec_type') == 'video'), None)
+    if video is None:
+        raise ValueError(f"No video stream in {path}")
+    audio = next((s for s in data['streams'] if s.get('codec_type') == 'audio'), {})
+    duration = float(data['format'].get('duration') or video.get('duration') or 0)
+    return int(video['width']), int(video['height']), duration, video.get('codec_name'), audio.get('codec_name')
+
+
+def ffmpeg(*args):
+    subprocess.run(['ffmpeg', '-y', '-v', 'error', *args], capture_output=True, check=True)
+
+
+def atomic_output(out_path, suffix, write):
+    """Run write(tmp_path) and move the result to out_path"""
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix=suffix, dir=os.path.dirname(out_path))
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, out_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def prepare_video(src_path, cache_dir, media_type=VIDEO):
+    """Return a VideoInfo for an upload-ready copy of src_path.
+
+    Runs in a worker process. Videos Instagram accepts as they are keep
+    their file; others are transcoded to H.264/AAC MP4 no wider than
+    MAX_VIDEO_WIDTH. The thumbnail is the frame at one second. Results are
+    cached under cache_dir keyed by the source content hash.
+    """
+    width, height, duration, video_codec, audio_codec = probe_video(src_path)
+    limit = MAX_VIDEO_SECONDS.get(media_type, MAX_VIDEO_SECONDS[VIDEO])
+    if duration > limit:
+        raise ValueError(f"Video is {duration:.0f}s long, the limit for a {media_type} is {limit}s")
+
+    key = f"{content_hash(src_path)}-v{PIPELINE_VERSION}"
+    base = os.path.join(cache_dir, key[:2], key)
+    meta_path = base + ".json"
+    if os.path.exists(meta_path):
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return VideoInfo(**json.load(f))
+
+    path = src_path
+    needs_transcode = (
+        video_codec not in VIDEO_CODECS
+        or (audio_codec is not None and audio_codec not in AUDIO_CODECS)
+        or width > MAX_VIDEO_WIDTH
+        or not src_path.lower().endswith('.mp4')
+    )
+    if needs_transcode:
+        path = base + ".mp4"
+        atomic_output(path, ".mp4", lambda tmp: ffmpeg(
+            '-i', src_path,
+            '-vf', f"scale='min({MAX_VIDEO_WIDTH},iw)':-2",
+            '-c:v', 'libx264', '-preset', 'medium', '-crf', '23', '-pix_fmt', 'yuv420p',
+            '-c:a', 'aac', '-b:a', '128k',
+            '-movflags', '+faststart', tmp
+        ))
+        width, height, duration, _, _ = probe_video(path)
+
+    thumbnail = base + ".jpg"
+    atomic_output(thumbnail, ".jpg", lambda tmp: ffmpeg(
+        '-ss', str(min(1.0, duration / 2)), '-i', path, '-frames:v', '1', '-q:v', '2', tmp
+    ))
+
+    info = VideoInfo(path, thumbnail, width, height, duration)
+
+    def write_meta(tmp_path):
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(vars(info), f)
+    atomic_output(meta_path, ".json", write_meta)
+    return info
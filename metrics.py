@@ -0,0 +1,180 @@
+"""In-process metrics for the posting pipeline.
+
+Engines record stage timings, counters and gauges into a MetricsRegistry;
+the GUI panel reads snapshots of it and MetricsExporter serves it to
+Prometheus in the text exposition format.
+"""
+import time
+import threading
+from contextlib import contextmanager
+
+# Upper bounds of the timing histogram buckets, in seconds
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+# name: (type, help)
+METRICS = {
+    'instagram_stage_seconds': ('histogram', "Time spent in each pipeline stage"),
+    'instagram_posts_total': ('counter', "Posts processed, by result"),
+    'instagram_throttles_total': ('counter', "Requests rejected by Instagram rate limiting"),
+    'instagram_connection_errors_total': ('counter', "Requests that failed with a network error"),
+    'instagram_retries_total': ('counter', "Operations retried, by error class or a login after an expired session"),
+    'instagram_circuit_breaker_trips_total': ('counter', "Times repeated throttling paused an account"),
+    'instagram_queue_depth': ('gauge', "Posts still waiting to be posted in this run"),
+}
+
+_default_registry = None
+
+
+def default_registry():
+    """Process-wide registry shared by every engine"""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = MetricsRegistry()
+    return _default_registry
+
+
+def label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in pairs) + "}"
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+
+class MetricsRegistry:
+    """Thread-safe store of labelled counters, gauges and histograms"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {name: {} for name in METRICS}
+
+    def inc(self, name, amount=1, **labels):
+        key = label_key(labels)
+        with self.lock:
+            series = self.values[name]
+            series[key] = series.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.values[name][label_key(labels)] = value
+
+    def observe(self, name, value, **labels):
+        key = label_key(labels)
+        with self.lock:
+            series = self.values[name]
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(value)
+
+    @contextmanager
+    def time(self, name, **labels):
+        """Observe the wall-clock time of the with block, even if it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self):
+        """[(name, type, labels dict, value)], histograms as (count, sum, max)"""
+        rows = []
+        with self.lock:
+            for name, series in self.values.items():
+                kind = METRICS[name][0]
+                for key, value in sorted(series.items()):
+                    if kind == 'histogram':
+                        value = (value.count, value.sum, value.max)
+                    rows.append((name, kind, dict(key), value))
+        return rows
+
+    def render_prometheus(self):
+        lines = []
+        with self.lock:
+            for name, series in self.values.items():
+                kind, help_text = METRICS[name]
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for key, value in sorted(series.items()):
+                    if kind != 'histogram':
+                        lines.append(f"{name}{format_labels(key)} {value}")
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS, value.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{format_labels(key, [('le', bound)])} {cumulative}")
+                    lines.append(f"{name}_bucket{format_labels(key, [('le', '+Inf')])} {value.count}")
+                    lines.append(f"{name}_sum{format_labels(key)} {value.sum:.6f}")
+                    lines.append(f"{name}_count{format_labels(key)} {value.count}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """Serves a registry at http://host:port/metrics from a daemon thread.
+
+    Binds to localhost by default; the metrics include account names.
+    """
+
+    def __init__(self, registry, port=9464, host="127.0.0.1"):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.server = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/metrics"
+
+    def start(self):
+        # http.server pulls in email and ssl; only load it when exporting
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes every few seconds would flood the log
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, name="metrics-exporter", daemon=True).start()
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -0,0 +1,167 @@
+import asyncio
+import threading
+from collections import deque
+from PyQt5.QtCore import QObject, pyqtSignal
+from worker import InstagramWorker
+from listener import EngineListener
+
+
+class AccountOrchestrator(QObject):
+    """Runs one InstagramWorker per account, at most max_workers at a time.
+
+    Accounts beyond the limit wait in a FIFO and start as running ones
+    finish. Worker signals are re-emitted tagged with the account name.
+    """
+
+    account_log = pyqtSignal(str, str, str)  # account, message, level
+    account_status = pyqtSignal(str, str)  # account, status
+    account_progress = pyqtSignal(str, int, int)  # account, current, total
+    account_preview = pyqtSignal(str, str, str)  # account, image path, caption
+    account_finished = pyqtSignal(str)
+    require_2fa = pyqtSignal(str)
+    require_challenge = pyqtSignal(str, str)  # account, username
+
+    def __init__(self, max_workers=8, parent=None):
+        super().__init__(parent)
+        self.max_workers = max_workers
+        self.workers = {}
+        self.waiting = deque()
+
+    def start(self, configs):
+        for config in configs:
+            name = config['account']
+            if name in self.workers or any(c['account'] == name for c in self.waiting):
+                continue
+            self.waiting.append(config)
+            self.account_status.emit(name, "Queued")
+        self.fill()
+
+    def fill(self):
+        while self.waiting and len(self.workers) < self.max_workers:
+            self.launch(self.waiting.popleft())
+
+    def launch(self, config):
+        name = config['account']
+        worker = InstagramWorker(config)
+        worker.update_log.connect(lambda message, level: self.account_log.emit(name, message, level))
+        worker.update_status.connect(lambda status: self.account_status.emit(name, status))
+        worker.progress_update.connect(
+            lambda current, total: self.account_progress.emit(name, current, total)
+        )
+        worker.update_preview.connect(
+            lambda path, caption: self.account_preview.emit(name, path, caption)
+        )
+        worker.require_2fa.connect(lambda: self.require_2fa.emit(name))
+        worker.require_challenge.connect(lambda username: self.require_challenge.emit(name, username))
+        worker.finished.connect(lambda: self.on_worker_finished(name))
+        self.workers[name] = worker
+        worker.start()
+
+    def on_worker_finished(self, name):
+        self.workers.pop(name, None)
+        self.account_finished.emit(name)
+        self.fill()
+
+    def set_max_workers(self, max_workers):
+        self.max_workers = max_workers
+        self.fill()
+
+    def stop(self, name=None):
+        """Stop one account, or every running and queued account"""
+        names = [name] if name else list(self.workers) + [c['account'] for c in self.waiting]
+        for account in names:
+            before = len(self.waiting)
+            self.waiting = deque(c for c in self.waiting if c['account'] != account)
+            if len(self.waiting) != before:
+                self.account_status.emit(account, "Stopped")
+            if account in self.workers:
+                self.workers[account].stop()
+
+    def pause(self, name):
+        if name in self.workers:
+            self.workers[name].pause()
+
+    def resume(self, name):
+        if name in self.workers:
+            self.workers[name].resume()
+
+    def worker(self, name):
+        return self.workers.get(name)
+
+    def is_active(self, name):
+        return name in self.workers or any(c['account'] == name for c in self.waiting)
+
+    def active_count(self):
+        return len(self.workers) + len(self.waiting)
+
+
+class SignalListener(EngineListener):
+    """Relays one engine's events as orchestrator signals.
+
+    Engines call it from the event loop or an executor thread; Qt queues
+    the signals to the GUI thread.
+    """
+
+    def __init__(self, orchestrator, name):
+        self.orchestrator = orchestrator
+        self.name = name
+
+    def on_log(self, message, level):
+        self.orchestrator.account_log.emit(self.name, message, level)
+
+    def on_status(self, status):
+        self.orchestrator.account_status.emit(self.name, status)
+
+    def on_progress(self, current, total):
+        self.orchestrator.account_progress.emit(self.name, current, total)
+
+    def on_preview(self, image_path, caption):
+        self.orchestrator.account_preview.emit(self.name, image_path, caption)
+
+    def on_require_2fa(self):
+        self.orchestrator.require_2fa.emit(self.name)
+
+    def on_require_challenge(self, username):
+        self.orchestrator.require_challenge.emit(self.name, username)
+
+
+def gui_event_loop():
+    """The qasync loop driving the Qt event loop, if main.py installed one"""
+    try:
+        import qasync
+    except ImportError:
+        return None
+    loop = asyncio.get_event_loop_policy().get_event_loop()
+    return loop if isinstance(loop, qasync.QEventLoop) else None
+
+
+class AsyncOrchestrator(AccountOrchestrator):
+    """AccountOrchestrator running every account on one asyncio event loop.
+
+    Accounts are coroutines rather than QThreads; blocking calls share an
+    executor of max_blocking_calls threads. The loop is the Qt loop when
+    the app runs under qasync, otherwise a single background thread.
+    worker(name) returns the account's PostingEngine.
+    """
+
+    engine_done = pyqtSignal(str)
+
+    def __init__(self, max_workers=8, max_blocking_calls=16, parent=None):
+        super().__init__(max_workers, parent)
+        from async_engine import AsyncPostingService
+        self.service = AsyncPostingService(max_blocking_calls)
+        # Queued to the GUI thread when emitted from the loop thread
+        self.engine_done.connect(self.on_worker_finished)
+
+        self.loop = gui_event_loop()
+        if self.loop is None:
+            self.loop = asyncio.new_event_loop()
+            threading.Thread(target=self.loop.run_forever, name="asyncio-accounts", daemon=True).start()
+
+    def launch(self, config):
+        from engine import PostingEngine
+        name = config['account']
+        engine = PostingEngine(config, SignalListener(self, name))
+        self.workers[name] = engine
+        future = asyncio.run_coroutine_threadsafe(self.service.run(engine), self.loop)
+        future.add_done_callback(lambda f: self.engine_done.emit(name))
@@ -0,0 +1,275 @@
+import os
+import csv
+import json
+import sqlite3
+import tempfile
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    filename TEXT NOT NULL,
+    caption TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT 'pending',
+    scheduled_at TEXT,
+    timestamp TEXT NOT NULL DEFAULT '',
+    media_id TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL,
+    last_error TEXT,
+    media_type TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_posts_status ON posts (status, id);
+CREATE INDEX IF NOT EXISTS idx_posts_scheduled_at ON posts (scheduled_at);
+CREATE INDEX IF NOT EXISTS idx_posts_filename ON posts (filename);
+"""
+
+CSV_COLUMNS = ['filename', 'caption', 'posted', 'timestamp', 'media_type']
+
+# Exported after CSV_COLUMNS when any row has them, in the columns a
+# posts CSV keeps the same state in
+SCHEDULE_COLUMNS = ['scheduled_at']
+RETRY_COLUMNS = ['attempts', 'next_attempt_at', 'failed']
+
+# CSV columns with a place in the posts table; the others, such as a
+# caption template's template and variable columns, are kept in extra
+STATE_COLUMNS = (
+    'filename', 'caption', 'posted', 'timestamp', 'scheduled_at', 'media_type',
+    'media_id', 'attempts', 'next_attempt_at', 'failed',
+)
+
+# Columns added after the first release, created on older databases
+ADDED_COLUMNS = (
+    ('attempts', "INTEGER NOT NULL DEFAULT 0"),
+    ('next_attempt_at', "REAL"),  # UTC timestamp of the next retry
+    ('last_error', "TEXT"),
+    ('media_type', "TEXT NOT NULL DEFAULT ''"),  # Empty: photo, or video by file extension
+    ('extra', "TEXT"),  # JSON object of the row's other CSV columns
+)
+
+
+def is_truthy(value):
+    return str(value).strip().lower() in ('true', '1', 'yes')
+
+
+def stored_number(value, convert):
+    """A retry count or time read from a CSV cell, None if blank or invalid"""
+    if not value:
+        return None
+    try:
+        return convert(float(value))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def queue_post(row):
+    """A posts table row as the dict the engine works with"""
+    post = dict(row)
+    extra = post.pop('extra', None)
+    if extra:
+        post = dict(json.loads(extra), **post)
+    post['posted'] = post['status'] == 'posted'
+    return post
+
+
+class SQLitePostQueue:
+    """Post queue stored in SQLite, an alternative to the posts CSV"""
+
+    BATCH_SIZE = 500
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # The asyncio engine calls into one queue from successive executor
+        # threads; each account still uses it from one thread at a time
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.migrate()
+
+    def migrate(self):
+        existing = {row['name'] for row in self.conn.execute("PRAGMA table_info(posts)")}
+        with self.conn:
+            for name, declaration in ADDED_COLUMNS:
+                if name not in existing:
+                    self.conn.execute(f"ALTER TABLE posts ADD COLUMN {name} {declaration}")
+
+    def close(self):
+        self.conn.close()
+
+    def import_csv(self, csv_path):
+        """Add CSV rows to the queue, skipping posts queued by an earlier import.
+
+        A post is the same when both filename and caption match, so a file
+        repeated with another caption gets a row of its own, as does every
+        repeat within the CSV. Returns (added, skipped).
+        """
+        added = skipped = 0
+        with open(csv_path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            if reader.fieldnames is None:
+                raise ValueError("CSV file is empty")
+            if 'filename' not in reader.fieldnames or 'caption' not in reader.fieldnames:
+                raise ValueError("CSV must have 'filename' and 'caption' columns")
+
+            extra_columns = [column for column in reader.fieldnames
+                             if column and column not in STATE_COLUMNS]
+            last_id = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM posts").fetchone()[0]
+            with self.conn:
+                for row in reader:
+                    exists = self.conn.execute(
+                        "SELECT 1 FROM posts WHERE filename = ? AND caption = ? AND id <= ? LIMIT 1",
+                        (row['filename'], row['caption'] or '', last_id)
+                    ).fetchone()
+                    if exists:
+                        skipped += 1
+                        continue
+                    extra = {column: row[column] for column in extra_columns if row[column]}
+                    if is_truthy(row.get('posted', '')):
+                        status = 'posted'
+                    elif is_truthy(row.get('failed', '')):
+                        status = 'failed'
+                    else:
+                        status = 'pending'
+                    self.conn.execute(
+                        "INSERT INTO posts (filename, caption, status, scheduled_at, timestamp, media_type, "
+                        "attempts, next_attempt_at, extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            row['filename'],
+                            row['caption'] or '',
+                            status,
+                            row.get('scheduled_at') or None,
+                            row.get('timestamp') or '',
+                            (row.get('media_type') or '').strip().lower(),
+                            stored_number(row.get('attempts'), int) or 0,
+                            stored_number(row.get('next_attempt_at'), float) if status == 'pending' else None,
+                            json.dumps(extra, ensure_ascii=False) if extra else None,
+                        )
+                    )
+                    added += 1
+        return added, skipped
+
+    def extra_columns(self):
+        """Names of the extra columns imported with the queued posts, sorted"""
+        columns = set()
+        for (extra,) in self.conn.execute("SELECT DISTINCT extra FROM posts WHERE extra IS NOT NULL"):
+            columns.update(json.loads(extra))
+        return sorted(columns)
+
+    def state_columns(self):
+        """SCHEDULE_COLUMNS and RETRY_COLUMNS, each if any queued post uses them"""
+        columns = []
+        if self.conn.execute(
+            "SELECT 1 FROM posts WHERE scheduled_at IS NOT NULL AND scheduled_at != '' LIMIT 1"
+        ).fetchone():
+            columns += SCHEDULE_COLUMNS
+        if self.conn.execute(
+            "SELECT 1 FROM posts WHERE attempts > 0 OR next_attempt_at IS NOT NULL OR status = 'failed' LIMIT 1"
+        ).fetchone():
+            columns += RETRY_COLUMNS
+        return columns
+
+    def export_csv(self, csv_path):
+        """Write the queue out in the filename,caption,posted,timestamp,media_type
+        format, followed by scheduled_at and the retry state when posts have
+        them, then the extra columns the posts were imported with"""
+        state_columns = self.state_columns()
+        extra_columns = self.extra_columns()
+        directory = os.path.dirname(os.path.abspath(csv_path))
+        fd, tmp_path = tempfile.mkstemp(suffix=".csv", dir=directory)
+        try:
+            with os.fdopen(fd, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(CSV_COLUMNS + state_columns + extra_columns)
+                for row in self.rows():
+                    row['failed'] = row['status'] == 'failed'
+                    writer.writerow([
+                        row['filename'], row['caption'],
+                        row['posted'], row['timestamp'], row['media_type']
+                    ] + ['' if row[column] is None else row[column] for column in state_columns]
+                      + [row.get(column, '') for column in extra_columns])
+            os.replace(tmp_path, csv_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def rows(self, status=None):
+        """Yield queue rows in id order, fetched in batches"""
+        last_id = 0
+        while True:
+            if status is None:
+                batch = self.conn.execute(
+                    "SELECT * FROM posts WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, self.BATCH_SIZE)
+                ).fetchall()
+            else:
+                batch = self.conn.execute(
+                    "SELECT * FROM posts WHERE status = ? AND id > ? ORDER BY id LIMIT ?",
+                    (status, last_id, self.BATCH_SIZE)
+                ).fetchall()
+            if not batch:
+                return
+            for row in batch:
+                yield queue_post(row)
+            last_id = batch[-1]['id']
+
+    def pending(self):
+        return self.rows('pending')
+
+    def count(self, status=None):
+        if status is None:
+            return self.conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM posts WHERE status = ?", (status,)
+        ).fetchone()[0]
+
+    def get(self, post_id):
+        row = self.conn.execute("SELECT * FROM posts WHERE id = ?", (post_id,)).fetchone()
+        if row is None:
+            return None
+        return queue_post(row)
+
+    def count_scheduled(self, status='pending'):
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM posts WHERE status = ? AND scheduled_at IS NOT NULL "
+            "AND scheduled_at != ''", (status,)
+        ).fetchone()[0]
+
+    def schedule_entries(self, status='pending'):
+        """Yield (id, scheduled_at) in queue order without loading captions"""
+        if status is None:
+            cursor = self.conn.execute("SELECT id, scheduled_at FROM posts ORDER BY id")
+        else:
+            cursor = self.conn.execute(
+                "SELECT id, scheduled_at FROM posts WHERE status = ? ORDER BY id", (status,)
+            )
+        for row in cursor.fetchall():
+            yield row['id'], row['scheduled_at']
+
+    def mark_posted(self, post_id, timestamp, media_id=None):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE posts SET status = 'posted', timestamp = ?, media_id = ? WHERE id = ?",
+                (timestamp, None if media_id is None else str(media_id), post_id)
+            )
+
+    def mark_retry(self, post_id, attempts, next_attempt_at, error=None):
+        """Keep a failed post pending until next_attempt_at"""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE posts SET status = 'pending', attempts = ?, next_attempt_at = ?, last_error = ? "
+                "WHERE id = ?",
+                (attempts, next_attempt_at, error, post_id)
+            )
+
+    def mark_failed(self, post_id, attempts, error=None):
+        """Take a post out of the pending queue once its retries are used up"""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE posts SET status = 'failed', attempts = ?, next_attempt_at = NULL, last_error = ? "
+                "WHERE id = ?",
+                (attempts, error, post_id)
+            )
@@ -0,0 +1,125 @@
+"""Streaming reader for posts CSV files.
+
+Rows are parsed one at a time with the csv module and only the columns
+posting needs are kept, so memory stays flat however long the calendar
+is. Each row is identified by its index among the data rows, which the
+journal keys its entries by, and the byte offset it starts at, which
+lets scheduled calendars fetch rows in due order without holding them.
+"""
+import csv
+from post_queue import is_truthy
+
+REQUIRED_COLUMNS = ('filename', 'caption')
+
+# Columns the engine reads; others are left alone and kept when the CSV
+# is rewritten
+POST_COLUMNS = (
+    'filename', 'caption', 'posted', 'timestamp', 'scheduled_at', 'media_type',
+    'attempts', 'next_attempt_at', 'failed',
+)
+
+
+class OffsetLines:
+    """Iterates the lines of a binary file, remembering where the next one starts.
+
+    csv.reader never reads past the end of the record it returns, so
+    next_offset before a read is the offset of the record read.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.next_offset = f.tell()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.f.readline()
+        if not line:
+            raise StopIteration
+        self.next_offset += len(line)
+        return line.decode('utf-8')
+
+
+def apply_entry(row, entry):
+    """Overlay a journal entry onto a row dict"""
+    row['posted'] = entry['status'] == 'posted'
+    row['timestamp'] = entry.get('timestamp', '')
+    if 'media_id' in row and entry.get('media_id'):
+        row['media_id'] = entry['media_id']
+    if entry['status'] in ('retry', 'failed'):
+        row['attempts'] = entry.get('attempts', 0)
+        row['next_attempt_at'] = entry.get('next_attempt_at') or ''
+        row['failed'] = entry['status'] == 'failed'
+
+
+def journal_entry(state, index, filename):
+    """The journal entry for a data row, or None.
+
+    Entries name the filename as well, so a row only takes the state of one
+    recorded for the same post; journals written before rows were indexed
+    are keyed by filename alone.
+    """
+    entry = state.get(index)
+    if entry is not None and entry.get('filename') == filename:
+        return entry
+    return state.get(filename)
+
+
+class PostsCSV:
+    """A posts CSV read lazily, with journaled state overlaid on each row.
+
+    Raises ValueError if the file is empty or lacks the required columns.
+    """
+
+    def __init__(self, path, state=None, columns=POST_COLUMNS):
+        self.path = path
+        self.state = state or {}
+        with open(path, 'rb') as f:
+            header = f.readline()
+            self.data_offset = f.tell()
+        header = header.decode('utf-8-sig')
+        if not header.strip():
+            raise ValueError("CSV file is empty")
+        self.fieldnames = next(csv.reader([header]))
+        missing = [column for column in REQUIRED_COLUMNS if column not in self.fieldnames]
+        if missing:
+            raise ValueError("CSV must have 'filename' and 'caption' columns")
+        self.columns = [(column, self.fieldnames.index(column)) for column in columns
+                        if column in self.fieldnames]
+        self.absent = [column for column in columns if column not in self.fieldnames]
+
+    def has_column(self, column):
+        return column in self.fieldnames
+
+    def make_row(self, index, values):
+        row = dict.fromkeys(self.absent, '')
+        for column, position in self.columns:
+            row[column] = values[position] if position < len(values) else ''
+        row['posted'] = is_truthy(row['posted'])
+        row['failed'] = is_truthy(row['failed'])
+        entry = journal_entry(self.state, index, row['filename'])
+        if entry is not None:
+            apply_entry(row, entry)
+        return row
+
+    def rows(self):
+        """Yield (index, offset, row) in file order, blank lines aren't counted"""
+        with open(self.path, 'rb') as f:
+            f.seek(self.data_offset)
+            lines = OffsetLines(f)
+            reader = csv.reader(lines)
+            index = 0
+            while True:
+                offset = lines.next_offset
+                values = next(reader, None)
+                if values is None:
+                    return
+                if values:
+                    yield index, offset, self.make_row(index, values)
+                    index += 1
+
+    def row_at(self, index, offset):
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return self.make_row(index, next(csv.reader(OffsetLines(f))))
@@ -0,0 +1,136 @@
+import os
+from PyQt5.QtCore import QThread, pyqtSignal
+from journal import PostJournal
+from posts_csv import PostsCSV
+from post_queue import SQLitePostQueue
+
+TABLE_COLUMNS = ('filename', 'caption', 'posted', 'timestamp', 'attempts', 'failed')
+
+
+def post_status(row):
+    """Status column value of a CSV or queue row: posted, failed, retrying or pending"""
+    if row['posted']:
+        return 'posted'
+    if row.get('failed') is True or row.get('status') == 'failed':
+        return 'failed'
+    try:
+        attempts = int(float(row['attempts'] or 0))
+    except (TypeError, ValueError):
+        attempts = 0
+    return 'retrying' if attempts > 0 else 'pending'
+
+
+def scan_images(images_dir):
+    """List the images folder once instead of stat-ing every row"""
+    try:
+        with os.scandir(images_dir) as entries:
+            return {entry.name for entry in entries if entry.is_file()}
+    except OSError:
+        return set()
+
+
+class ImageScanner(QThread):
+    """Lists the images folder off the GUI thread"""
+
+    images_scanned = pyqtSignal(object)
+
+    def __init__(self, images_dir):
+        super().__init__()
+        self.images_dir = images_dir
+
+    def run(self):
+        self.images_scanned.emit(scan_images(self.images_dir))
+
+
+class LibraryHasher(QThread):
+    """Hashes the files of an imported calendar for the duplicate check"""
+
+    hashed = pyqtSignal(int)
+    hash_failed = pyqtSignal(str)
+
+    def __init__(self, csv_path, images_dir, dedup_dir):
+        super().__init__()
+        self.csv_path = csv_path
+        self.images_dir = images_dir
+        self.dedup_dir = dedup_dir
+
+    def run(self):
+        import dedup
+        try:
+            self.hashed.emit(dedup.hash_library(self.csv_path, self.images_dir, self.dedup_dir))
+        except Exception as e:
+            self.hash_failed.emit(str(e))
+
+
+class PostsLoader(QThread):
+    """Reads posts off the GUI thread and streams them to the table in chunks"""
+
+    images_scanned = pyqtSignal(object)  # set of filenames in images_dir
+    chunk_loaded = pyqtSignal(list, list, list, list)  # filenames, captions, statuses, timestamps
+    progress = pyqtSignal(int, int)  # loaded, total
+    load_failed = pyqtSignal(str)
+
+    CHUNK_SIZE = 2000
+
+    def __init__(self, source, path, images_dir):
+        super().__init__()
+        self.source = source  # "csv" or "sqlite"
+        self.path = path
+        self.images_dir = images_dir
+
+    def run(self):
+        try:
+            self.images_scanned.emit(scan_images(self.images_dir))
+            if self.source == "sqlite":
+                self.load_queue()
+            else:
+                self.load_csv()
+        except Exception as e:
+            self.load_failed.emit(str(e))
+
+    def load_csv(self):
+        # Show uploads from a running or interrupted worker
+        posts = PostsCSV(self.path, PostJournal(self.path).replay(), columns=TABLE_COLUMNS)
+
+        # Rows are streamed, so progress is measured in bytes of the file
+        total = os.path.getsize(self.path)
+        chunk = ([], [], [], [])
+        for index, offset, row in posts.rows():
+            chunk[0].append(row['filename'])
+            chunk[1].append(row['caption'])
+            chunk[2].append(post_status(row))
+            chunk[3].append(str(row['timestamp'] or ""))
+            if len(chunk[0]) >= self.CHUNK_SIZE:
+                if self.isInterruptionRequested():
+                    return
+                self.chunk_loaded.emit(*chunk)
+                self.progress.emit(offset, total)
+                chunk = ([], [], [], [])
+        if chunk[0]:
+            self.chunk_loaded.emit(*chunk)
+        self.progress.emit(total, total)
+
+    def load_queue(self):
+        queue = SQLitePostQueue(self.path)
+        try:
+            total = queue.count()
+            loaded = 0
+            chunk = ([], [], [], [])
+            for row in queue.rows():
+                if self.isInterruptionRequested():
+                    return
+                chunk[0].append(row['filename'])
+                chunk[1].append(row['caption'])
+                chunk[2].append(post_status(row))
+                chunk[3].append(row['timestamp'])
+                if len(chunk[0]) >= self.CHUNK_SIZE:
+                    loaded += len(chunk[0])
+                    self.chunk_loaded.emit(*chunk)
+                    self.progress.emit(loaded, total)
+                    chunk = ([], [], [], [])
+            if chunk[0]:
+                loaded += len(chunk[0])
+                self.chunk_loaded.emit(*chunk)
+            self.progress.emit(loaded, total)
+        finally:
+            queue.close()
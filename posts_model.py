@@ -0,0 +1,225 @@
+import os
+from PyQt5.QtCore import Qt, QAbstractTableModel, QSortFilterProxyModel, QModelIndex
+from PyQt5.QtGui import QColor
+from media import ALBUM_SEPARATOR
+
+HEADERS = ["Filename", "Caption", "Status", "Posted At"]
+
+# Post statuses shown in the Status column, with their colours
+STATUS_LABELS = {'pending': "Pending", 'retrying': "Retrying", 'failed': "Failed", 'posted': "Posted"}
+STATUS_COLORS = {'pending': 'blue', 'retrying': 'darkorange', 'failed': 'red', 'posted': 'green'}
+
+# Table status of each journal entry status
+JOURNAL_STATUSES = {'posted': 'posted', 'retry': 'retrying', 'failed': 'failed'}
+
+
+class PostsTableModel(QAbstractTableModel):
+    """Column-oriented store of posts, cells are only built when Qt asks"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.images_dir = ""
+        self.filenames = []
+        self.captions = []
+        self.statuses = []
+        self.timestamps = []
+        self.image_names = None
+        self._exists = {}
+        self._rows_by_filename = None
+
+    def set_columns(self, filenames, captions, statuses, timestamps, images_dir):
+        self.beginResetModel()
+        self.filenames = filenames
+        self.captions = captions
+        self.statuses = statuses
+        self.timestamps = timestamps
+        self.images_dir = images_dir
+        self.image_names = None
+        self._exists = {}
+        self._rows_by_filename = None
+        self.endResetModel()
+
+    def clear(self, images_dir=None):
+        self.set_columns([], [], [], [], self.images_dir if images_dir is None else images_dir)
+
+    def append_rows(self, filenames, captions, statuses, timestamps):
+        if not filenames:
+            return
+        first = len(self.filenames)
+        self.beginInsertRows(QModelIndex(), first, first + len(filenames) - 1)
+        self.filenames.extend(filenames)
+        self.captions.extend(captions)
+        self.statuses.extend(statuses)
+        self.timestamps.extend(timestamps)
+        self._rows_by_filename = None
+        self.endInsertRows()
+
+    def rows_for(self, filename):
+        if self._rows_by_filename is None:
+            self._rows_by_filename = {}
+            for row, name in enumerate(self.filenames):
+                self._rows_by_filename.setdefault(name, []).append(row)
+        return self._rows_by_filename.get(filename, [])
+
+    def emit_rows_changed(self, rows, first_column, last_column):
+        if rows:
+            self.dataChanged.emit(
+                self.index(min(rows), first_column), self.index(max(rows), last_column)
+            )
+
+    def apply_journal_entries(self, entries):
+        """Update status and timestamp of the rows named in journal entries"""
+        changed = []
+        for entry in entries:
+            # Rows are shown in CSV order, so an entry's data row index is
+            # its row here; older journals name rows by filename only
+            row = entry.get('row')
+            if row is not None:
+                rows = [row] if row < len(self.filenames) and self.filenames[row] == entry['filename'] else []
+            else:
+                rows = self.rows_for(entry['key'])
+            for row in rows:
+                self.statuses[row] = JOURNAL_STATUSES.get(entry['status'], 'pending')
+                self.timestamps[row] = entry.get('timestamp', '')
+                changed.append(row)
+        self.emit_rows_changed(changed, 2, 3)
+
+    def update_image_names(self, names):
+        """Refresh missing-image markers only for files added or removed"""
+        if self.image_names is None:
+            self.set_image_names(names)
+            return
+        changed = []
+        for filename in self.image_names ^ names:
+            changed.extend(self.rows_for(filename))
+        self.image_names = names
+        self.emit_rows_changed(changed, 0, 0)
+
+    def merge_columns(self, filenames, captions, statuses, timestamps):
+        """Apply a fresh load of the source, touching only rows that differ"""
+        common = min(len(self.filenames), len(filenames))
+        changed = []
+        for row in range(common):
+            if (self.filenames[row] != filenames[row] or self.captions[row] != captions[row]
+                    or self.statuses[row] != statuses[row] or self.timestamps[row] != timestamps[row]):
+                self.filenames[row] = filenames[row]
+                self.captions[row] = captions[row]
+                self.statuses[row] = statuses[row]
+                self.timestamps[row] = timestamps[row]
+                self._exists.pop(row, None)
+                changed.append(row)
+        if changed:
+            self._rows_by_filename = None
+        self.emit_rows_changed(changed, 0, len(HEADERS) - 1)
+
+        if len(filenames) > common:
+            self.append_rows(filenames[common:], captions[common:],
+                             statuses[common:], timestamps[common:])
+        elif len(self.filenames) > common:
+            self.beginRemoveRows(QModelIndex(), common, len(self.filenames) - 1)
+            del self.filenames[common:]
+            del self.captions[common:]
+            del self.statuses[common:]
+            del self.timestamps[common:]
+            self._exists = {row: exists for row, exists in self._exists.items() if row < common}
+            self._rows_by_filename = None
+            self.endRemoveRows()
+
+    def set_image_names(self, names):
+        """Use a single listing of images_dir for the missing-image markers"""
+        self.image_names = names
+        self._exists = {}
+        if self.filenames:
+            self.dataChanged.emit(
+                self.index(0, 0), self.index(len(self.filenames) - 1, 0),
+                [Qt.ForegroundRole, Qt.ToolTipRole]
+            )
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.filenames)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def image_exists(self, row):
+        # Album rows list several files, all of which must exist
+        names = [name.strip() for name in self.filenames[row].split(ALBUM_SEPARATOR)]
+        if self.image_names is not None and not any('/' in name or os.sep in name for name in names):
+            return all(name in self.image_names for name in names)
+
+        # Files in subfolders are checked only when Qt paints their row
+        if row not in self._exists:
+            self._exists[row] = all(
+                os.path.exists(os.path.join(self.images_dir, name)) for name in names
+            )
+        return self._exists[row]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return self.filenames[row]
+            if column == 1:
+                caption = self.captions[row]
+                return caption[:47] + "..." if len(caption) > 50 else caption
+            if column == 2:
+                return STATUS_LABELS[self.statuses[row]]
+            if column == 3:
+                return self.timestamps[row]
+
+        elif role == Qt.UserRole:
+            # Raw values used by the proxy model for sorting and filtering
+            return (self.filenames, self.captions, self.statuses, self.timestamps)[column][row]
+
+        elif role == Qt.ForegroundRole:
+            if column == 0 and not self.image_exists(row):
+                return QColor('red')
+            if column == 2:
+                return QColor(STATUS_COLORS[self.statuses[row]])
+
+        elif role == Qt.ToolTipRole:
+            if column == 0 and not self.image_exists(row):
+                return "Image file not found"
+            if column == 1:
+                return self.captions[row]
+
+        return None
+
+
+class PostsFilterProxyModel(QSortFilterProxyModel):
+    """Sorts and filters posts without touching the underlying store"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.text_filter = ""
+        self.status_filter = None  # None or one of STATUS_LABELS
+        self.setSortRole(Qt.UserRole)
+
+    def set_text_filter(self, text):
+        self.text_filter = text.strip().lower()
+        self.invalidateFilter()
+
+    def set_status_filter(self, status):
+        self.status_filter = status
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        model = self.sourceModel()
+
+        if self.status_filter is not None:
+            if model.statuses[source_row] != self.status_filter:
+                return False
+
+        if self.text_filter:
+            return (self.text_filter in model.filenames[source_row].lower()
+                    or self.text_filter in model.captions[source_row].lower())
+
+        return True
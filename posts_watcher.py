@@ -0,0 +1,121 @@
+import os
+from PyQt5.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+from journal import PostJournal
+
+
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
+
+class PostsWatcher(QObject):
+    """Watches the post source, its journal and the images folder.
+
+    Events are debounced, so copying a thousand images into the folder
+    produces a single rescan once the copy settles.
+    """
+
+    source_changed = pyqtSignal()  # CSV or queue database rewritten
+    journal_entries = pyqtSignal(list)  # entries appended to the CSV journal
+    images_dir_changed = pyqtSignal()
+
+    DEBOUNCE_MS = 750
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self.on_path_changed)
+        self.watcher.directoryChanged.connect(self.on_path_changed)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(self.DEBOUNCE_MS)
+        self.timer.timeout.connect(self.check_changes)
+
+        self.source_path = None
+        self.images_dir = None
+        self.journal = None
+        self.journal_offset = 0
+        self.source_signature = None
+        self.images_dirty = False
+
+    def watch(self, source_path, images_dir, use_journal=True):
+        self.stop()
+        self.source_path = os.path.abspath(source_path)
+        self.images_dir = os.path.abspath(images_dir) if images_dir else None
+        self.source_signature = self.signature()
+        self.images_dirty = False
+
+        if use_journal:
+            self.journal = PostJournal(self.source_path)
+            self.journal_offset = os.path.getsize(self.journal.path) if self.journal.has_entries() else 0
+        else:
+            self.journal = None
+            self.journal_offset = 0
+
+        self.add_paths()
+
+    def stop(self):
+        self.timer.stop()
+        paths = self.watcher.files() + self.watcher.directories()
+        if paths:
+            self.watcher.removePaths(paths)
+
+    def watched_paths(self):
+        paths = [self.source_path, os.path.dirname(self.source_path)]
+        if self.journal is not None:
+            paths.append(self.journal.path)
+        else:
+            # SQLite writes land in the WAL file first
+            paths.append(self.source_path + "-wal")
+        if self.images_dir:
+            paths.append(self.images_dir)
+        return paths
+
+    def add_paths(self):
+        # Files replaced atomically drop out of the watcher and need re-adding
+        current = set(self.watcher.files() + self.watcher.directories())
+        missing = [path for path in self.watched_paths()
+                   if path not in current and os.path.exists(path)]
+        if missing:
+            self.watcher.addPaths(missing)
+
+    def signature(self):
+        if self.journal is None:
+            return (file_signature(self.source_path),
+                    file_signature(self.source_path + "-wal"))
+        return file_signature(self.source_path)
+
+    def on_path_changed(self, path):
+        if self.images_dir and os.path.abspath(path) == self.images_dir:
+            self.images_dirty = True
+        self.timer.start()  # Restart the debounce window
+
+    def check_changes(self):
+        self.add_paths()
+
+        if self.images_dirty:
+            self.images_dirty = False
+            self.images_dir_changed.emit()
+
+        signature = self.signature()
+        if signature != self.source_signature:
+            # The worker compacts the journal into the CSV when it finishes
+            self.source_signature = signature
+            self.journal_offset = 0
+            self.source_changed.emit()
+            return
+
+        if self.journal is None:
+            return
+
+        size = file_signature(self.journal.path)
+        if size is None or size[1] < self.journal_offset:
+            self.journal_offset = 0
+        elif size[1] > self.journal_offset:
+            entries, self.journal_offset = self.journal.read_from(self.journal_offset)
+            if entries:
+                self.journal_entries.emit(entries)
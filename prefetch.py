@@ -0,0 +1,81 @@
+from collections import deque
+
+
+class PreparedPost:
+    """A pending row with its validation results and media preparation.
+
+    paths are the files of the post, several for an album, and futures
+    their preparation in the same order (None where a file is uploaded as
+    it is). img_path is the first file, shown as the preview.
+    """
+
+    def __init__(self, key, row, img_path, problems=None, futures=None, skip=False,
+                 media_type='photo', paths=None):
+        self.key = key
+        self.row = row
+        self.due = None  # UTC timestamp when scheduled
+        self.img_path = img_path
+        self.media_type = media_type
+        self.paths = paths or [img_path]
+        self.problems = problems or []
+        self.futures = futures or [None] * len(self.paths)
+        self.caption = row['caption']  # Rendered from a template when one applies
+        self.fingerprint = None  # dedup.PostFingerprint, when duplicates are checked
+        self.skip = skip
+        self.reported = False
+
+    def failed_futures(self):
+        return [f for f in self.futures if f is not None and f.done() and f.exception() is not None]
+
+    def failed(self):
+        """True once validation or media preparation has failed"""
+        return bool(self.problems) or bool(self.failed_futures())
+
+    def failure_messages(self):
+        messages = list(self.problems)
+        for future in self.failed_futures():
+            messages.append(f"media could not be prepared: {future.exception()}")
+        return messages
+
+
+class PostPrefetcher:
+    """Keeps the next N pending posts validated and their images in flight.
+
+    pending_posts yields (key, row, due) where due is a UTC timestamp or None.
+    prepare(key, row) turns a pending row into a PreparedPost; it is called
+    as rows enter the look-ahead window, not when they are due. A source
+    that ran out is asked again on every fill, so one that can grow (like
+    a RetryQueue) keeps the prefetcher going.
+    """
+
+    def __init__(self, pending_posts, prepare, size=5):
+        self.source = iter(pending_posts)
+        self.prepare = prepare
+        self.size = max(1, size)
+        self.window = deque()
+
+    def fill(self):
+        while len(self.window) < self.size:
+            try:
+                key, row, due = next(self.source)
+            except StopIteration:
+                break
+            post = self.prepare(key, row)
+            post.due = due
+            self.window.append(post)
+
+    def upcoming(self):
+        self.fill()
+        return list(self.window)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        self.fill()
+        if not self.window:
+            raise StopIteration
+        post = self.window.popleft()
+        # Top the window back up so the next rows start preparing right away
+        self.fill()
+        return post
@@ -0,0 +1,131 @@
+import os
+import hashlib
+import tempfile
+
+# Instagram feed limits
+MAX_WIDTH = 1080
+MIN_WIDTH = 320
+MIN_ASPECT = 4 / 5      # Portrait
+MAX_ASPECT = 1.91       # Landscape
+
+# Bump when the output of prepare_image changes so old cache entries are ignored
+PIPELINE_VERSION = 1
+
+
+def is_available():
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def content_hash(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fit_aspect(image):
+    """Center-crop to the closest aspect ratio Instagram accepts"""
+    width, height = image.size
+    aspect = width / height
+    if aspect < MIN_ASPECT:
+        new_height = int(width / MIN_ASPECT)
+        top = (height - new_height) // 2
+        return image.crop((0, top, width, top + new_height))
+    if aspect > MAX_ASPECT:
+        new_width = int(height * MAX_ASPECT)
+        left = (width - new_width) // 2
+        return image.crop((left, 0, left + new_width, height))
+    return image
+
+
+def prepare_image(src_path, cache_dir, quality=90):
+    """Return the path of an upload-ready JPEG for src_path.
+
+    Runs in a worker process. The result is cached under cache_dir keyed by
+    the source content hash and the pipeline settings.
+    """
+    from PIL import Image, ImageOps
+
+    key = f"{content_hash(src_path)}-q{quality}-v{PIPELINE_VERSION}"
+    out_path = os.path.join(cache_dir, key[:2], key + ".jpg")
+    if os.path.exists(out_path):
+        return out_path
+
+    with Image.open(src_path) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        image = fit_aspect(image)
+        width, height = image.size
+        if width > MAX_WIDTH or width < MIN_WIDTH:
+            target = MAX_WIDTH if width > MAX_WIDTH else MIN_WIDTH
+            image = image.resize((target, round(height * target / width)), Image.LANCZOS)
+
+        # Saving without exif/icc arguments strips the metadata
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix=".jpg", dir=os.path.dirname(out_path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                image.save(f, 'JPEG', quality=quality, optimize=True, progressive=True)
+            os.replace(tmp_path, out_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    return out_path
+
+
+def verify_image(src_path):
+    """Decode check for images uploaded as-is, returns src_path"""
+    from PIL import Image
+
+    with Image.open(src_path) as image:
+        image.verify()
+    return src_path
+
+
+class ImagePreflight:
+    """Runs image and video preparation for upcoming posts in a process pool.
+
+    images needs Pillow and videos needs ffmpeg; without them the files
+    are uploaded as they are.
+    """
+
+    def __init__(self, cache_dir, quality=90, convert=True, max_workers=None, images=True, videos=False):
+        self.cache_dir = cache_dir
+        self.quality = quality
+        self.convert = convert
+        self.images = images
+        self.videos = videos
+        from concurrent.futures import ProcessPoolExecutor  # multiprocessing is only needed once posting starts
+        self.executor = ProcessPoolExecutor(max_workers=max_workers)
+
+    def submit(self, img_path):
+        """Returns a future resolving to the path to upload, or None"""
+        if not self.images:
+            return None
+        if self.convert:
+            return self.executor.submit(prepare_image, img_path, self.cache_dir, self.quality)
+        return self.executor.submit(verify_image, img_path)
+
+    def submit_video(self, path, media_type):
+        """Returns a future resolving to a media.VideoInfo, or None"""
+        if not self.videos:
+            return None
+        from media import prepare_video
+        return self.executor.submit(prepare_video, path, self.cache_dir, media_type)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
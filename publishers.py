@@ -0,0 +1,438 @@
+"""Publisher interface between the posting engine and Instagram.
+
+The engine only talks to a Publisher. InstagrapiPublisher is the real
+thing; FakePublisher is an in-process stand-in that simulates latency,
+throttling, expired sessions and network errors, so whole pipeline runs
+can be tested and benchmarked offline.
+
+Publishers raise the exceptions below rather than instagrapi's, so the
+engine does not import instagrapi unless the real publisher is used.
+"""
+import os
+import json
+import time
+import uuid
+import random
+import threading
+import itertools
+from abc import ABC, abstractmethod
+from types import SimpleNamespace
+from contextlib import contextmanager
+from uploads import UploadLedger, resumable_upload, CHUNK_SIZE
+
+UPLOAD_STATE_DIR = os.path.join('cache', 'uploads')
+
+
+class PublisherError(Exception):
+    pass
+
+
+class LoginRequired(PublisherError):
+    pass
+
+
+class TwoFactorRequired(PublisherError):
+    pass
+
+
+class ChallengeRequired(PublisherError):
+    pass
+
+
+class ClientConnectionError(PublisherError):
+    pass
+
+
+class ClientThrottledError(PublisherError):
+    pass
+
+
+def create_publisher(config):
+    """Publisher selected by config['publisher'], instagrapi by default"""
+    kind = config.get('publisher', 'instagrapi')
+    uploads = {
+        'upload_dir': config.get('upload_state_dir', UPLOAD_STATE_DIR),
+        'chunk_size': config.get('upload_chunk_size', CHUNK_SIZE),
+    }
+    if kind == 'fake':
+        return FakePublisher(**dict(uploads, **config.get('fake_publisher', {})))
+    if kind == 'instagrapi':
+        return InstagrapiPublisher(**uploads)
+    raise ValueError(f"Unknown publisher: {kind}")
+
+
+class Publisher(ABC):
+    """The calls the engine makes to Instagram.
+
+    account_info() returns an object with username and full_name; the
+    upload calls return an object with the new media id.
+
+    Videos go up in chunks through start_upload, upload_offset and
+    upload_chunk, and are published by configure_video once every byte
+    has arrived. Progress is kept in an UploadLedger, so a retry after a
+    dropped connection sends only the rest of the file.
+    """
+
+    def __init__(self, upload_dir=UPLOAD_STATE_DIR, chunk_size=CHUNK_SIZE):
+        self.uploads = UploadLedger(upload_dir)
+        self.chunk_size = chunk_size
+
+    def set_delay_range(self, minimum, maximum):
+        """Random pause between API requests, in seconds"""
+
+    @abstractmethod
+    def load_settings(self, path):
+        pass
+
+    @abstractmethod
+    def dump_settings(self, path):
+        pass
+
+    @abstractmethod
+    def get_timeline_feed(self):
+        pass
+
+    @abstractmethod
+    def login(self, username, password):
+        pass
+
+    @abstractmethod
+    def two_factor_login(self, code):
+        pass
+
+    @abstractmethod
+    def challenge_code(self, code):
+        pass
+
+    @abstractmethod
+    def account_info(self):
+        pass
+
+    @abstractmethod
+    def photo_upload(self, path, caption):
+        pass
+
+    @abstractmethod
+    def album_upload(self, paths, caption):
+        pass
+
+    def video_upload(self, video, caption, reel=False):
+        """Upload a media.VideoInfo as a feed video, or as a Reel"""
+        state = resumable_upload(
+            video.path, self.uploads,
+            lambda: self.start_upload(video, reel),
+            self.upload_offset, self.upload_chunk, self.chunk_size
+        )
+        media = self.configure_video(state, video, caption, reel)
+        self.uploads.clear(video.path)
+        return media
+
+    @abstractmethod
+    def start_upload(self, video, reel):
+        """State of a new chunked upload, saved in the ledger between attempts"""
+
+    @abstractmethod
+    def upload_offset(self, state):
+        """Bytes the server already holds for an upload, None if it is unknown"""
+
+    @abstractmethod
+    def upload_chunk(self, state, offset, data, total):
+        pass
+
+    @abstractmethod
+    def configure_video(self, state, video, caption, reel):
+        pass
+
+    @abstractmethod
+    def media_comment(self, media_id, text):
+        pass
+
+
+class InstagrapiPublisher(Publisher):
+    """Publishes through instagrapi, with human-like pauses around logins"""
+
+    def __init__(self, **uploads):
+        super().__init__(**uploads)
+        import requests
+        from instagrapi import Client
+        from instagrapi import config
+        from instagrapi import exceptions
+
+        self.errors = (
+            (exceptions.TwoFactorRequired, TwoFactorRequired),
+            (exceptions.ChallengeRequired, ChallengeRequired),
+            (exceptions.LoginRequired, LoginRequired),
+            (exceptions.ClientThrottledError, ClientThrottledError),
+            (exceptions.ClientConnectionError, ClientConnectionError),
+            # Raised by the chunked video uploads, which use the session directly
+            (requests.exceptions.ConnectionError, ClientConnectionError),
+            (requests.exceptions.Timeout, ClientConnectionError),
+        )
+        self.api_domain = config.API_DOMAIN
+        self.client = Client()
+        self.client.set_device(self.client.device_settings)
+
+    @contextmanager
+    def translated_errors(self):
+        try:
+            yield
+        except PublisherError:
+            raise
+        except Exception as e:
+            for source, target in self.errors:
+                if isinstance(e, source):
+                    raise target(str(e)) from e
+            raise
+
+    def set_delay_range(self, minimum, maximum):
+        self.client.delay_range = (minimum, maximum)
+
+    def load_settings(self, path):
+        time.sleep(random.uniform(1.5, 3.0))  # Mimic human delay
+        self.client.load_settings(path)
+        time.sleep(random.uniform(1.0, 2.0))  # Mimic human delay
+
+    def dump_settings(self, path):
+        self.client.dump_settings(path)
+
+    def get_timeline_feed(self):
+        with self.translated_errors():
+            return self.client.get_timeline_feed()
+
+    def login(self, username, password):
+        time.sleep(random.uniform(2.0, 4.0))  # Mimic human delay
+        with self.translated_errors():
+            self.client.login(username, password)
+        time.sleep(random.uniform(1.0, 2.5))  # Mimic human delay
+
+    def two_factor_login(self, code):
+        with self.translated_errors():
+            self.client.two_factor_login(code)
+
+    def challenge_code(self, code):
+        with self.translated_errors():
+            self.client.challenge_code(code)
+
+    def account_info(self):
+        with self.translated_errors():
+            return self.client.account_info()
+
+    def photo_upload(self, path, caption):
+        with self.translated_errors():
+            return self.client.photo_upload(path, caption)
+
+    def album_upload(self, paths, caption):
+        with self.translated_errors():
+            return self.client.album_upload(paths, caption)
+
+    def video_upload(self, video, caption, reel=False):
+        if video.width is None:
+            # Not probed (no ffmpeg): instagrapi measures and thumbnails the
+            # video itself, and sends it in one request
+            upload = self.client.clip_upload if reel else self.client.video_upload
+            with self.translated_errors():
+                return upload(video.path, caption, thumbnail=video.thumbnail)
+        with self.translated_errors():
+            return super().video_upload(video, caption, reel)
+
+    def start_upload(self, video, reel):
+        upload_id = str(int(time.time() * 1000))
+        params = {
+            "retry_context": '{"num_step_auto_retry":0,"num_reupload":0,"num_step_manual_retry":0}',
+            "media_type": "2",
+            "xsharing_user_ids": "[]",
+            "upload_id": upload_id,
+            "upload_media_duration_ms": str(int(video.duration * 1000)),
+            "upload_media_width": str(video.width),
+            "upload_media_height": str(video.height),
+        }
+        if reel:
+            params["is_clips_video"] = "1"
+        return {
+            'upload_id': upload_id,
+            'upload_name': f"{upload_id}_0_{random.randint(1000000000, 9999999999)}",
+            'waterfall_id': str(uuid.uuid4()),
+            'params': json.dumps(params),
+        }
+
+    def rupload(self, method, state, **kwargs):
+        url = f"https://{self.api_domain}/rupload_igvideo/{state['upload_name']}"
+        headers = {
+            "Accept-Encoding": "gzip, deflate",
+            "X-Instagram-Rupload-Params": state['params'],
+            "X_FB_VIDEO_WATERFALL_ID": state['waterfall_id'],
+            "X-Entity-Type": "video/mp4",
+        }
+        headers.update(kwargs.pop('headers', {}))
+        response = getattr(self.client.private, method)(url, headers=headers, **kwargs)
+        if response.status_code == 429:
+            raise ClientThrottledError("Video upload rate limited")
+        return response
+
+    def upload_offset(self, state):
+        response = self.rupload('get', state)
+        if response.status_code != 200:
+            return None
+        return int(response.json().get('offset', 0))
+
+    def upload_chunk(self, state, offset, data, total):
+        response = self.rupload('post', state, data=data, headers={
+            "Offset": str(offset),
+            "X-Entity-Name": state['upload_name'],
+            "X-Entity-Length": str(total),
+            "Content-Type": "application/octet-stream",
+            "Content-Length": str(len(data)),
+        })
+        if response.status_code != 200:
+            raise PublisherError(f"Video chunk at {offset} rejected with HTTP {response.status_code}")
+
+    def configure_video(self, state, video, caption, reel):
+        from pathlib import Path
+        from instagrapi.extractors import extract_media_v1
+
+        upload_id = state['upload_id']
+        thumbnail = Path(video.thumbnail)
+        self.client.photo_rupload(thumbnail, upload_id)
+        configure = self.client.clip_configure if reel else self.client.video_configure
+        for _ in range(20):
+            time.sleep(3)  # Instagram transcodes the video before it can be published
+            try:
+                configured = configure(upload_id, video.width, video.height, video.duration, thumbnail, caption)
+            except Exception as e:
+                if "Transcode not finished yet" in str(e):
+                    continue
+                raise
+            if configured:
+                return extract_media_v1(configured.get("media"))
+        raise PublisherError("Instagram did not finish processing the video")
+
+    def media_comment(self, media_id, text):
+        with self.translated_errors():
+            return self.client.media_comment(media_id, text)
+
+
+class FakePublisher(Publisher):
+    """In-process fake Instagram for offline tests and load runs.
+
+    latency is the (min, max) seconds each call takes. The *_rate
+    arguments are the chance of each call failing that way; an expired
+    session keeps raising LoginRequired until login() is called again.
+    A seed makes the sequence of failures reproducible.
+    """
+
+    def __init__(self, latency=(0, 0), throttle_rate=0.0, login_required_rate=0.0,
+                 connection_error_rate=0.0, seed=None, username="fake_user", **uploads):
+        super().__init__(**uploads)
+        self.latency = tuple(latency)
+        self.throttle_rate = throttle_rate
+        self.login_required_rate = login_required_rate
+        self.connection_error_rate = connection_error_rate
+        self.random = random.Random(seed)
+        self.username = username
+        self.logged_in = False
+        self.media_ids = itertools.count(1)
+        self.posted = []  # (media id, path or paths, caption)
+        self.comments = []  # (media id, text)
+        self.upload_ids = itertools.count(1)
+        self.received = {}  # upload name: bytes received, the server side of chunked uploads
+        self.bytes_sent = 0
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def call(self, needs_login=True):
+        """Simulate one request: latency, then maybe a failure"""
+        with self.lock:
+            self.calls += 1
+            delay = self.random.uniform(*self.latency) if self.latency[1] else 0
+            roll = self.random.random()
+            throttled = self.login_required_rate + self.throttle_rate
+            failure = None
+            if needs_login and (not self.logged_in or roll < self.login_required_rate):
+                self.logged_in = False
+                failure = LoginRequired("login_required")
+            elif self.login_required_rate <= roll < throttled:
+                failure = ClientThrottledError("Please wait a few minutes before you try again.")
+            elif throttled <= roll < throttled + self.connection_error_rate:
+                failure = ClientConnectionError("Connection reset by fake server")
+        if delay:
+            time.sleep(delay)
+        if failure is not None:
+            raise failure
+
+    def load_settings(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            settings = json.load(f)
+        # Sessions written by real instagrapi runs are not valid here
+        self.username = settings.get('username', self.username)
+        self.logged_in = settings.get('fake', False)
+
+    def dump_settings(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'username': self.username, 'fake': True}, f)
+
+    def get_timeline_feed(self):
+        self.call()
+        return {'feed_items': []}
+
+    def login(self, username, password):
+        self.call(needs_login=False)
+        self.username = username or self.username
+        self.logged_in = True
+
+    def two_factor_login(self, code):
+        self.login(self.username, None)
+
+    def challenge_code(self, code):
+        self.login(self.username, None)
+
+    def account_info(self):
+        self.call()
+        return SimpleNamespace(username=self.username, full_name=self.username.title())
+
+    def photo_upload(self, path, caption):
+        if not os.path.exists(path):
+            raise PublisherError(f"No such file: {path}")
+        self.call()
+        return self.publish(path, caption)
+
+    def publish(self, media, caption):
+        media_id = str(next(self.media_ids))
+        with self.lock:
+            self.posted.append((media_id, media, caption))
+        return SimpleNamespace(id=media_id, pk=media_id, caption_text=caption)
+
+    def album_upload(self, paths, caption):
+        for path in paths:
+            if not os.path.exists(path):
+                raise PublisherError(f"No such file: {path}")
+        self.call()
+        return self.publish(list(paths), caption)
+
+    def start_upload(self, video, reel):
+        return {'upload_name': f"fake_{next(self.upload_ids)}"}
+
+    def upload_offset(self, state):
+        self.call()
+        with self.lock:
+            return self.received.get(state['upload_name'])
+
+    def upload_chunk(self, state, offset, data, total):
+        self.call()
+        with self.lock:
+            self.received[state['upload_name']] = offset + len(data)
+            self.bytes_sent += len(data)
+
+    def configure_video(self, state, video, caption, reel):
+        self.call()
+        if self.received.get(state['upload_name'], 0) != state['total']:
+            raise PublisherError("Video upload is incomplete")
+        return self.publish(video.path, caption)
+
+    def media_comment(self, media_id, text):
+        self.call()
+        with self.lock:
+            self.comments.append((media_id, text))
+        return SimpleNamespace(media_id=media_id, text=text)
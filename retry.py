@@ -0,0 +1,158 @@
+"""Retry policies and the per-account circuit breaker.
+
+A failed upload is classified (throttled, connection, login, error) and
+requeued after an exponential backoff from that class's policy, until
+its attempts run out. Repeated throttling opens the account's circuit
+breaker, which holds all posting for a cooldown.
+"""
+import time
+import random
+from collections import deque
+from publishers import ClientThrottledError, ClientConnectionError, LoginRequired
+from scheduler import PostScheduler
+
+
+class RetryPolicy:
+    """Exponential backoff with jitter and a cap on attempts.
+
+    The delay before retry n is base_delay * multiplier ** (n - 1), capped
+    at max_delay, then reduced by a random fraction of up to jitter so
+    accounts that failed together don't retry together.
+    """
+
+    def __init__(self, max_attempts=3, base_delay=60, max_delay=3600, multiplier=2, jitter=0.5):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+
+    def delay(self, attempt, rng=random):
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** max(0, attempt - 1))
+        return delay * (1 - self.jitter * rng.random())
+
+    def exhausted(self, attempts):
+        return attempts >= self.max_attempts
+
+
+# Seconds; throttling backs off the longest since retrying early makes it worse
+DEFAULT_POLICIES = {
+    'throttled': dict(max_attempts=5, base_delay=600, max_delay=4 * 3600),
+    'connection': dict(max_attempts=5, base_delay=30, max_delay=1800),
+    'login': dict(max_attempts=3, base_delay=60, max_delay=1800),
+    'error': dict(max_attempts=3, base_delay=300, max_delay=3600),
+}
+
+
+def load_policies(overrides=None):
+    """Policies by error class, with config['retry_policies'] applied on top"""
+    overrides = overrides or {}
+    return {
+        name: RetryPolicy(**dict(defaults, **overrides.get(name, {})))
+        for name, defaults in DEFAULT_POLICIES.items()
+    }
+
+
+def classify(error):
+    if isinstance(error, ClientThrottledError):
+        return 'throttled'
+    if isinstance(error, ClientConnectionError):
+        return 'connection'
+    if isinstance(error, LoginRequired):
+        return 'login'
+    return 'error'
+
+
+def stored_number(row, column):
+    """Numeric retry state saved on a queue or CSV row, 0 if absent"""
+    try:
+        value = float(row.get(column))
+    except (TypeError, ValueError):
+        return 0
+    return 0 if value != value else value  # NaN from pandas
+
+
+def stored_attempts(row):
+    return int(stored_number(row, 'attempts'))
+
+
+def stored_next_attempt(row):
+    return stored_number(row, 'next_attempt_at')
+
+
+class RetryQueue:
+    """Pending source with requeued posts merged in as they come due.
+
+    Wraps a (key, row, due) source. Rows an earlier run left waiting for
+    their next attempt are held back until then, alongside posts pushed
+    after failing in this run. Unlike a generator it can be iterated
+    again after running out, once something new is pushed.
+    """
+
+    def __init__(self, pending_posts):
+        self.source = iter(pending_posts)
+        self.waiting = PostScheduler()
+
+    def __len__(self):
+        return len(self.waiting)
+
+    def push(self, due, key, row):
+        self.waiting.push(due, (key, row))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        now = time.time()
+        if self.waiting and self.waiting.peek_due() <= now:
+            return self.pop()
+        for key, row, due in self.source:
+            next_attempt = stored_next_attempt(row)
+            if next_attempt > now:
+                self.push(max(next_attempt, due or 0), key, row)
+                continue
+            return key, row, due
+        if self.waiting:
+            return self.pop()
+        raise StopIteration
+
+    def pop(self):
+        due, (key, row) = self.waiting.pop()
+        return key, row, due
+
+
+class CircuitBreaker:
+    """Opens after threshold throttles within window seconds.
+
+    While open the account posts nothing. Each trip without a successful
+    post in between doubles the cooldown, up to max_cooldown.
+    """
+
+    def __init__(self, threshold=3, window=3600, cooldown=1800, max_cooldown=6 * 3600):
+        self.threshold = threshold
+        self.window = window
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.failures = deque()
+        self.trips = 0
+        self.open_until = 0
+
+    def record_failure(self, now=None):
+        """Returns True if this failure opened the breaker"""
+        now = time.time() if now is None else now
+        self.failures.append(now)
+        while self.failures and self.failures[0] < now - self.window:
+            self.failures.popleft()
+        if len(self.failures) < self.threshold:
+            return False
+        self.failures.clear()
+        self.trips += 1
+        self.open_until = now + min(self.max_cooldown, self.cooldown * 2 ** (self.trips - 1))
+        return True
+
+    def record_success(self):
+        self.trips = 0
+
+    def remaining(self, now=None):
+        now = time.time() if now is None else now
+        return max(0, self.open_until - now)
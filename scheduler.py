@@ -0,0 +1,152 @@
+import time
+import heapq
+import itertools
+import threading
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+
+def parse_scheduled_at(value, timezone=None):
+    """Parse a scheduled_at cell into a UTC timestamp, None if empty.
+
+    Values carrying an offset ("2025-05-01 09:00+02:00") are used as is;
+    naive values are read in the given IANA timezone, or local time.
+    Raises ValueError for malformed values.
+    """
+    if value is None or (isinstance(value, float) and value != value):  # NaN from pandas
+        return None
+    value = str(value).strip()
+    if not value:
+        return None
+
+    due = datetime.fromisoformat(value)
+    if due.tzinfo is None:
+        due = due.replace(tzinfo=ZoneInfo(timezone)) if timezone else due.astimezone()
+    return due.timestamp()
+
+
+class PostScheduler:
+    """Min-heap of post keys ordered by due time.
+
+    Pushing and popping are O(log n), so tens of thousands of future posts
+    never need a scan to find the next one due.
+    """
+
+    def __init__(self, entries=()):
+        # The counter keeps equal due times in queue order
+        self.counter = itertools.count()
+        self.heap = [(due, next(self.counter), key) for due, key in entries]
+        heapq.heapify(self.heap)
+
+    def __len__(self):
+        return len(self.heap)
+
+    def push(self, due, key):
+        heapq.heappush(self.heap, (due, next(self.counter), key))
+
+    def peek_due(self):
+        return self.heap[0][0] if self.heap else None
+
+    def pop(self):
+        due, _, key = heapq.heappop(self.heap)
+        return due, key
+
+    def drain(self):
+        """Yield (due, key) in due order, popping lazily"""
+        while self.heap:
+            yield self.pop()
+
+
+class RunControl:
+    """Stop/pause state shared between the GUI and a worker thread.
+
+    Waits block on a condition variable, so a sleeping worker uses no CPU
+    and wakes the moment it is stopped, paused, resumed or poked. Waiters
+    that are not threads (an asyncio task) register a listener instead.
+    """
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.running = True
+        self.paused = False
+        self.pokes = 0
+        self.listeners = []
+
+    def add_listener(self, callback):
+        """Call callback() after every state change, from the changing thread"""
+        with self.cond:
+            self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        with self.cond:
+            if callback in self.listeners:
+                self.listeners.remove(callback)
+
+    def notify(self):
+        # Called with the lock held; listeners run once it is released
+        self.cond.notify_all()
+        return list(self.listeners)
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            listeners = self.notify()
+        for callback in listeners:
+            callback()
+
+    def pause(self):
+        with self.cond:
+            self.paused = True
+            listeners = self.notify()
+        for callback in listeners:
+            callback()
+
+    def resume(self):
+        with self.cond:
+            self.paused = False
+            listeners = self.notify()
+        for callback in listeners:
+            callback()
+
+    def poke(self):
+        """Wake a sleep() that was given an on_poke callback"""
+        with self.cond:
+            self.pokes += 1
+            listeners = self.notify()
+        for callback in listeners:
+            callback()
+
+    def wait_if_paused(self):
+        """Block while paused, returns False if stopped"""
+        with self.cond:
+            while self.paused and self.running:
+                self.cond.wait()
+            return self.running
+
+    def sleep(self, seconds, on_poke=None):
+        """Sleep for seconds of un-paused time, returns False if stopped.
+
+        Time spent paused does not count towards the sleep. If on_poke is
+        given it is called (outside the lock) every time poke() is used.
+        """
+        deadline = time.monotonic() + seconds
+        with self.cond:
+            seen = self.pokes
+
+        while True:
+            with self.cond:
+                while self.running and (on_poke is None or self.pokes == seen):
+                    if self.paused:
+                        paused_at = time.monotonic()
+                        while self.paused and self.running:
+                            self.cond.wait()
+                        deadline += time.monotonic() - paused_at
+                        continue
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return True
+                    self.cond.wait(remaining)
+                if not self.running:
+                    return False
+                seen = self.pokes
+            on_poke()
@@ -0,0 +1,82 @@
+"""When each saved session was last known to work.
+
+Checking a saved session costs a timeline fetch and an account lookup.
+The result is remembered per session file in session_health.json next to
+it, and trusted for a TTL; a session that has since expired shows up as
+LoginRequired on the first real call, which clears its entry.
+"""
+import os
+import json
+import time
+import tempfile
+import threading
+
+HEALTH_FILE = "session_health.json"
+DEFAULT_TTL = 6 * 3600
+
+# Accounts in one process share the file; each write rewrites it whole
+_lock = threading.Lock()
+
+
+class SessionHealthCache:
+    def __init__(self, session_file, ttl=DEFAULT_TTL):
+        self.session_file = os.path.abspath(session_file)
+        self.path = os.path.join(os.path.dirname(self.session_file), HEALTH_FILE)
+        self.ttl = ttl
+
+    def read(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def write(self, entries):
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+    def session_mtime(self):
+        try:
+            return os.path.getmtime(self.session_file)
+        except OSError:
+            return None
+
+    def fresh(self, now=None):
+        """The cached entry if the session was validated within the TTL, else None.
+
+        A session file changed since (a new login, or one copied from another
+        device) always needs checking again.
+        """
+        if not self.ttl:
+            return None
+        entry = self.read().get(self.session_file)
+        if not entry or entry.get('session_mtime') != self.session_mtime():
+            return None
+        now = time.time() if now is None else now
+        if now - entry.get('validated_at', 0) > self.ttl:
+            return None
+        return entry
+
+    def record(self, username, now=None):
+        with _lock:
+            entries = self.read()
+            entries[self.session_file] = {
+                'username': username,
+                'validated_at': time.time() if now is None else now,
+                'session_mtime': self.session_mtime(),
+            }
+            self.write(entries)
+
+    def invalidate(self):
+        with _lock:
+            entries = self.read()
+            if entries.pop(self.session_file, None) is not None:
+                self.write(entries)
@@ -0,0 +1,112 @@
+import os
+import hashlib
+from collections import OrderedDict
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, QSize, pyqtSignal
+from PyQt5.QtGui import QImage, QImageReader
+
+_shared_cache = None
+
+
+def shared_cache():
+    """Process-wide cache shared by the preview widget and the posts table"""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = ThumbnailCache(os.path.join("cache", "thumbnails"))
+    return _shared_cache
+
+
+def cache_key(path, width, height):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, width, height)
+
+
+class ThumbnailSignals(QObject):
+    done = pyqtSignal(object, QImage)  # cache key, image (null on failure)
+
+
+class ThumbnailJob(QRunnable):
+    """Loads a thumbnail from disk cache or decodes it at reduced size"""
+
+    def __init__(self, key, disk_path):
+        super().__init__()
+        self.key = key
+        self.disk_path = disk_path
+        self.signals = ThumbnailSignals()
+
+    def run(self):
+        image = QImage()
+        if os.path.exists(self.disk_path):
+            image.load(self.disk_path)
+        if image.isNull():
+            image = self.decode()
+            if not image.isNull():
+                self.save(image)
+        self.signals.done.emit(self.key, image)
+
+    def decode(self):
+        path, _, _, width, height = self.key
+        reader = QImageReader(path)
+        reader.setAutoTransform(True)  # Honour EXIF orientation
+        size = reader.size()
+        if size.isValid():
+            # Let the decoder downscale so the full image is never materialized
+            reader.setScaledSize(size.scaled(QSize(width, height), Qt.KeepAspectRatio))
+        return reader.read()
+
+    def save(self, image):
+        os.makedirs(os.path.dirname(self.disk_path), exist_ok=True)
+        tmp_path = self.disk_path + ".tmp"
+        if image.save(tmp_path, "JPG", 85):
+            os.replace(tmp_path, self.disk_path)
+
+
+class ThumbnailCache(QObject):
+    """Two-level thumbnail cache: an in-memory LRU backed by files on disk.
+
+    Entries are keyed by path, mtime and size, so edited images are
+    regenerated automatically.
+    """
+
+    # Absolute image path, requested width and height, thumbnail (null on failure)
+    thumbnail_ready = pyqtSignal(str, int, int, QImage)
+
+    def __init__(self, cache_dir, capacity=200, parent=None):
+        super().__init__(parent)
+        self.cache_dir = cache_dir
+        self.capacity = capacity
+        self.memory = OrderedDict()
+        self.in_flight = set()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(2)
+
+    def disk_path(self, key):
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], digest + ".jpg")
+
+    def get(self, path, width, height):
+        """Return the cached thumbnail, or None and start generating it"""
+        key = cache_key(path, width, height)
+        if key is None:
+            return None
+
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return self.memory[key]
+
+        if key not in self.in_flight:
+            self.in_flight.add(key)
+            job = ThumbnailJob(key, self.disk_path(key))
+            job.signals.done.connect(self.on_done)
+            self.pool.start(job)
+        return None
+
+    def on_done(self, key, image):
+        self.in_flight.discard(key)
+        if not image.isNull():
+            self.memory[key] = image
+            while len(self.memory) > self.capacity:
+                self.memory.popitem(last=False)
+        self.thumbnail_ready.emit(key[0], key[3], key[4], image)
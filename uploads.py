@@ -0,0 +1,87 @@
+"""Chunked, resumable uploads for large media.
+
+A video is sent in chunks and the offset reached is saved after each
+one. When an upload fails part way, the post is retried later; the next
+attempt asks the server how much it already has and carries on from
+there instead of sending the file again.
+"""
+import os
+import json
+import hashlib
+import tempfile
+
+CHUNK_SIZE = 4 * 1024 * 1024
+
+
+class UploadLedger:
+    """Progress of unfinished uploads, one small JSON file per media file.
+
+    Entries are keyed by path, size and modification time, so an edited
+    file starts a new upload.
+    """
+
+    def __init__(self, state_dir):
+        self.state_dir = state_dir
+
+    def state_path(self, path):
+        stat = os.stat(path)
+        key = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        return os.path.join(self.state_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + ".json")
+
+    def load(self, path):
+        try:
+            with open(self.state_path(path), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, path, state):
+        os.makedirs(self.state_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.state_dir)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.state_path(path))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def clear(self, path):
+        try:
+            os.remove(self.state_path(path))
+        except OSError:
+            pass
+
+
+def resumable_upload(path, ledger, start, server_offset, send_chunk, chunk_size=CHUNK_SIZE):
+    """Send path in chunks, resuming a saved upload if there is one.
+
+    start() returns the state of a new upload, a JSON-serialisable dict;
+    server_offset(state) returns how many bytes the server holds for it,
+    or None if it no longer knows the upload; send_chunk(state, offset,
+    data, total) sends one chunk. Returns the state once every byte is
+    sent. The ledger entry is left for the caller to clear when the
+    upload has been published.
+    """
+    total = os.path.getsize(path)
+    state = ledger.load(path)
+    offset = 0
+    if state is not None:
+        offset = server_offset(state)
+        if offset is None or offset > total:
+            state = None
+            offset = 0
+    if state is None:
+        state = start()
+    state['total'] = total
+
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        while offset < total:
+            data = f.read(chunk_size)
+            send_chunk(state, offset, data, total)
+            offset += len(data)
+            state['offset'] = offset
+            ledger.save(path, state)
+    return state
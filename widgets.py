@@ -1,13 +1,23 @@
 import os
-import pandas as pd
+from collections import deque
+from datetime import datetime
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QLabel, QTextEdit, QTableWidget,
-    QTableWidgetItem, QHeaderView, QGroupBox, QFormLayout,
+    QWidget, QVBoxLayout, QLabel, QTextEdit, QPlainTextEdit, QTableView,
+    QHeaderView, QGroupBox, QFormLayout,
     QLineEdit, QToolButton, QHBoxLayout, QCheckBox, QSpinBox,
-    QTabWidget, QPushButton, QFileDialog, QMessageBox, QFrame
+    QTabWidget, QPushButton, QFileDialog, QMessageBox, QFrame, QComboBox,
+    QTableWidget, QTableWidgetItem, QProgressBar
 )
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QPixmap, QColor
+from PyQt5.QtCore import Qt, QPoint, QTimer, pyqtSignal
+from PyQt5.QtGui import QPixmap, QCursor
+from posts_loader import PostsLoader, ImageScanner
+from posts_watcher import PostsWatcher
+from thumbnails import shared_cache
+from accounts import account_config
+from dialogs import AuthDialog, AccountDialog
+from posts_model import PostsTableModel, PostsFilterProxyModel
+from media import ALBUM_SEPARATOR
+from captions import CaptionRenderer, TemplateError, parse_pools
 
 class PostPreviewWidget(QWidget):
     def __init__(self):
@@ -32,15 +42,19 @@ class PostPreviewWidget(QWidget):
         
         self.setLayout(layout)
         
+        # Thumbnails are decoded in the background and cached
+        self.image_path = None
+        self.thumbnails = shared_cache()
+        self.thumbnails.thumbnail_ready.connect(self.on_thumbnail_ready)
+        
     def set_preview(self, image_path, caption):
+        self.image_path = os.path.abspath(image_path)
         if os.path.exists(image_path):
-            pixmap = QPixmap(image_path)
-            if not pixmap.isNull():
-                pixmap = pixmap.scaled(400, 300, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                self.image_label.setPixmap(pixmap)
-                self.image_label.setText("")
+            image = self.thumbnails.get(image_path, 400, 300)
+            if image is not None:
+                self.show_image(image)
             else:
-                self.image_label.setText("Unable to load image")
+                self.image_label.setText("Loading preview...")
                 self.image_label.setPixmap(QPixmap())
         else:
             self.image_label.setText("Image not found")
@@ -48,76 +62,205 @@ class PostPreviewWidget(QWidget):
             
         self.caption_preview.setText(caption)
 
+    def on_thumbnail_ready(self, image_path, width, height, image):
+        if image_path == self.image_path and (width, height) == (400, 300):
+            self.show_image(image)
+
+    def show_image(self, image):
+        if not image.isNull():
+            self.image_label.setPixmap(QPixmap.fromImage(image))
+            self.image_label.setText("")
+        else:
+            self.image_label.setText("Unable to load image")
+            self.image_label.setPixmap(QPixmap())
+
+
+class HoverPreview(QLabel):
+    SIZE = 200
+
+    def __init__(self, parent=None):
+        super().__init__(parent, Qt.ToolTip)
+        self.setAlignment(Qt.AlignCenter)
+        self.setFrameShape(QFrame.Box)
+
+    def show_image(self, image):
+        self.setPixmap(QPixmap.fromImage(image))
+        self.adjustSize()
+        self.move(QCursor.pos() + QPoint(16, 16))
+        self.show()
+
+
+class PostsTableWidget(QTableView):
+    loading_progress = pyqtSignal(int, int)  # loaded, total
+    loading_finished = pyqtSignal()
 
-class PostsTableWidget(QTableWidget):
     def __init__(self):
         super().__init__()
-        self.setColumnCount(4)
-        self.setHorizontalHeaderLabels(["Filename", "Caption", "Status", "Posted At"])
+        self.loader = None
+        self.stale_loaders = set()
+        self.merge_buffer = None
+        self.scanner = None
+        self.rescan_pending = False
+        self.source = self.source_path = self.images_dir = None
+        
+        self.posts_model = PostsTableModel(self)
+        self.proxy_model = PostsFilterProxyModel(self)
+        self.proxy_model.setSourceModel(self.posts_model)
+        self.setModel(self.proxy_model)
+        
+        # Incremental refresh when the source, journal or images change
+        self.watcher = PostsWatcher(self)
+        self.watcher.source_changed.connect(self.reload_changed)
+        self.watcher.journal_entries.connect(self.posts_model.apply_journal_entries)
+        self.watcher.images_dir_changed.connect(self.rescan_images)
+        
         self.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
-        self.setSelectionBehavior(QTableWidget.SelectRows)
+        self.verticalHeader().setDefaultSectionSize(24)
+        self.setSelectionBehavior(QTableView.SelectRows)
         self.setAlternatingRowColors(True)
-        self.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.setEditTriggers(QTableView.NoEditTriggers)
+        self.setSortingEnabled(True)
+        self.sortByColumn(-1, Qt.AscendingOrder)  # Keep CSV order until a header is clicked
+        
+        # Thumbnail preview when hovering a filename
+        self.hover_preview = HoverPreview(self)
+        self.hover_path = None
+        self.thumbnails = shared_cache()
+        self.thumbnails.thumbnail_ready.connect(self.on_thumbnail_ready)
+        self.setMouseTracking(True)
+        self.entered.connect(self.on_entered)
         
     def load_data(self, csv_path, images_dir):
-        self.clearContents()
-        self.setRowCount(0)
-        
         if not os.path.exists(csv_path):
+            self.posts_model.clear(images_dir)
             return False
+        self.start_loading("csv", csv_path, images_dir)
+        return True
+
+    def load_queue(self, db_path, images_dir):
+        if not os.path.exists(db_path):
+            self.posts_model.clear(images_dir)
+            return False
+        self.start_loading("sqlite", db_path, images_dir)
+        return True
+
+    def start_loading(self, source, path, images_dir, merge=False):
+        self.stop_loading()
+        if not merge:
+            self.posts_model.clear(images_dir)
+            self.watcher.watch(path, images_dir, use_journal=source == "csv")
+        self.source, self.source_path, self.images_dir = source, path, images_dir
+        self.merge_buffer = ([], [], [], []) if merge else None
+        
+        self.loader = PostsLoader(source, path, images_dir)
+        self.loader.images_scanned.connect(self.on_images_scanned)
+        self.loader.chunk_loaded.connect(self.on_chunk_loaded)
+        if not merge:
+            self.loader.progress.connect(self.loading_progress)
+        self.loader.load_failed.connect(self.on_load_failed)
+        self.loader.finished.connect(self.on_loader_finished)
+        self.loader.start()
+
+    def stop_loading(self):
+        if self.loader is None:
+            return
             
-        try:
-            df = pd.read_csv(csv_path)
-            if 'filename' not in df.columns or 'caption' not in df.columns:
-                return False
-                
-            if 'posted' not in df.columns:
-                df['posted'] = False
-                
-            if 'timestamp' not in df.columns:
-                df['timestamp'] = ""
-                
-            self.setRowCount(len(df))
-            
-            for idx, row in df.iterrows():
-                # Filename
-                filename_item = QTableWidgetItem(row['filename'])
-                
-                # Check if image exists
-                img_path = os.path.join(images_dir, row['filename'])
-                if not os.path.exists(img_path):
-                    filename_item.setForeground(QColor('red'))
-                    filename_item.setToolTip("Image file not found")
-                    
-                self.setItem(idx, 0, filename_item)
-                
-                # Caption
-                caption = row['caption']
-                if len(caption) > 50:
-                    display_caption = caption[:47] + "..."
-                else:
-                    display_caption = caption
-                    
-                caption_item = QTableWidgetItem(display_caption)
-                caption_item.setToolTip(caption)
-                self.setItem(idx, 1, caption_item)
-                
-                # Status
-                status_item = QTableWidgetItem(
-                    "Posted" if row.get('posted', False) else "Pending"
-                )
-                status_color = QColor('green') if row.get('posted', False) else QColor('blue')
-                status_item.setForeground(status_color)
-                self.setItem(idx, 2, status_item)
-                
-                # Timestamp
-                self.setItem(idx, 3, QTableWidgetItem(str(row.get('timestamp', ''))))
-                
-            return True
+        # Drop anything still queued from the previous load, without blocking
+        # the GUI on a read that may be stuck on a slow network share
+        loader = self.loader
+        self.loader = None
+        for signal in (loader.images_scanned, loader.chunk_loaded,
+                       loader.load_failed, loader.finished):
+            signal.disconnect()
+        if self.merge_buffer is None:
+            loader.progress.disconnect()
+        loader.requestInterruption()
+        if loader.isRunning():
+            self.stale_loaders.add(loader)
+            loader.finished.connect(lambda: self.stale_loaders.discard(loader))
+
+    def reload_changed(self):
+        """Re-read a rewritten source and update only the rows that differ"""
+        if self.source_path is None:
+            return
+        if self.loader is not None and self.merge_buffer is None:
+            # A full load is still running and will pick up the change
+            return
+        self.start_loading(self.source, self.source_path, self.images_dir, merge=True)
+
+    def rescan_images(self):
+        if self.scanner is not None and self.scanner.isRunning():
+            self.rescan_pending = True
+            return
+        self.rescan_pending = False
+        self.scanner = ImageScanner(self.images_dir)
+        self.scanner.images_scanned.connect(self.posts_model.update_image_names)
+        self.scanner.finished.connect(self.on_scanner_finished)
+        self.scanner.start()
+
+    def on_scanner_finished(self):
+        if self.rescan_pending:
+            self.rescan_images()
+
+    def on_images_scanned(self, names):
+        if self.sender() is self.loader:
+            self.posts_model.update_image_names(names)
+
+    def on_chunk_loaded(self, filenames, captions, statuses, timestamps):
+        # Chunks already queued by a superseded loader are ignored
+        if self.sender() is not self.loader:
+            return
+        if self.merge_buffer is not None:
+            for column, values in zip(self.merge_buffer, (filenames, captions, statuses, timestamps)):
+                column.extend(values)
+        else:
+            self.posts_model.append_rows(filenames, captions, statuses, timestamps)
+
+    def on_loader_finished(self):
+        if self.sender() is not self.loader:
+            return
+        if self.merge_buffer is not None:
+            self.posts_model.merge_columns(*self.merge_buffer)
+            self.merge_buffer = None
+        self.loader = None
+        self.loading_finished.emit()
+
+    def on_load_failed(self, message):
+        print(f"Error loading posts: {message}")
+
+    def on_entered(self, index):
+        row = self.proxy_model.mapToSource(index).row()
+        if index.column() != 0 or not self.posts_model.image_exists(row):
+            self.hide_hover_preview()
+            return
             
-        except Exception as e:
-            print(f"Error loading CSV: {str(e)}")
-            return False
+        first_file = self.posts_model.filenames[row].split(ALBUM_SEPARATOR)[0].strip()
+        path = os.path.join(self.posts_model.images_dir, first_file)
+        self.hover_path = os.path.abspath(path)
+        image = self.thumbnails.get(path, HoverPreview.SIZE, HoverPreview.SIZE)
+        if image is not None and not image.isNull():
+            self.hover_preview.show_image(image)
+        else:
+            self.hover_preview.hide()
+
+    def on_thumbnail_ready(self, image_path, width, height, image):
+        if (image_path == self.hover_path and width == HoverPreview.SIZE
+                and not image.isNull() and self.underMouse()):
+            self.hover_preview.show_image(image)
+
+    def hide_hover_preview(self):
+        self.hover_path = None
+        self.hover_preview.hide()
+
+    def leaveEvent(self, event):
+        self.hide_hover_preview()
+        super().leaveEvent(event)
+
+    def set_filter(self, text):
+        self.proxy_model.set_text_filter(text)
+
+    def set_status_filter(self, status):
+        self.proxy_model.set_status_filter(status)
             
     def refresh(self, csv_path, images_dir):
         self.load_data(csv_path, images_dir)
@@ -151,6 +294,11 @@ class SettingsWidget(QWidget):
         self.browse_log_btn.setText("...")
         self.browse_log_btn.clicked.connect(lambda: self.browse_folder("log_dir"))
         
+        self.queue_db = QLineEdit(self.settings.value("queue_db", "posts_queue.db"))
+        self.browse_queue_btn = QToolButton()
+        self.browse_queue_btn.setText("...")
+        self.browse_queue_btn.clicked.connect(self.browse_queue_db)
+        
         # Add path fields
         session_layout = QHBoxLayout()
         session_layout.addWidget(self.session_dir)
@@ -161,7 +309,12 @@ class SettingsWidget(QWidget):
         log_layout.addWidget(self.browse_log_btn)
         
         paths_layout.addRow("Session Directory:", session_layout)
+        queue_layout = QHBoxLayout()
+        queue_layout.addWidget(self.queue_db)
+        queue_layout.addWidget(self.browse_queue_btn)
+        
         paths_layout.addRow("Log Directory:", log_layout)
+        paths_layout.addRow("Queue Database:", queue_layout)
         paths_group.setLayout(paths_layout)
         
         # Behavior group
@@ -178,13 +331,94 @@ class SettingsWidget(QWidget):
             self.settings.value("repost_existing", "false") == "true"
         )
         
+        self.dedup = QCheckBox("Skip posts already published from this account (same file or image)")
+        self.dedup.setChecked(self.settings.value("dedup", "true") == "true")
+        self.dedup.setToolTip("Also applies when reposting is allowed")
+        
+        self.dedup_captions = QCheckBox("Also skip posts repeating a published caption")
+        self.dedup_captions.setChecked(self.settings.value("dedup_captions", "false") == "true")
+        
+        self.queue_backend = QComboBox()
+        self.queue_backend.addItem("CSV file", "csv")
+        self.queue_backend.addItem("SQLite queue", "sqlite")
+        self.queue_backend.setCurrentIndex(
+            max(0, self.queue_backend.findData(self.settings.value("queue_backend", "csv")))
+        )
+        
         behavior_layout.addRow(self.hashtags_in_comment)
         behavior_layout.addRow(self.repost_existing)
+        behavior_layout.addRow(self.dedup)
+        behavior_layout.addRow(self.dedup_captions)
+        self.timezone = QLineEdit(self.settings.value("timezone", ""))
+        self.timezone.setPlaceholderText("Local time (e.g. Europe/London)")
+        self.timezone.setToolTip("Timezone for scheduled_at values without an offset")
+        
+        behavior_layout.addRow("Post source:", self.queue_backend)
+        behavior_layout.addRow("Schedule Timezone:", self.timezone)
         behavior_group.setLayout(behavior_layout)
         
+        # Image pre-processing group
+        images_group = QGroupBox("Image Pre-processing")
+        images_layout = QFormLayout()
+        
+        self.preprocess_images = QCheckBox("Resize, fix orientation and strip metadata before upload")
+        self.preprocess_images.setChecked(
+            self.settings.value("preprocess_images", "false") == "true"
+        )
+        
+        self.jpeg_quality = QSpinBox()
+        self.jpeg_quality.setRange(50, 100)
+        self.jpeg_quality.setValue(int(self.settings.value("jpeg_quality", 90)))
+        
+        self.lookahead_posts = QSpinBox()
+        self.lookahead_posts.setRange(1, 50)
+        self.lookahead_posts.setValue(int(self.settings.value("lookahead_posts", 5)))
+        self.lookahead_posts.setToolTip("Upcoming posts validated and prepared while waiting")
+        
+        images_layout.addRow(self.preprocess_images)
+        images_layout.addRow("JPEG Quality:", self.jpeg_quality)
+        images_layout.addRow("Look-ahead Posts:", self.lookahead_posts)
+        images_group.setLayout(images_layout)
+        
+        # Accounts engine group
+        engine_group = QGroupBox("Accounts Engine")
+        engine_layout = QFormLayout()
+        
+        self.asyncio_engine = QCheckBox("Run accounts on one asyncio event loop (restart required)")
+        self.asyncio_engine.setChecked(
+            self.settings.value("asyncio_engine", "false") == "true"
+        )
+        self.asyncio_engine.setToolTip("Sleeping accounts no longer hold a thread each")
+        
+        self.blocking_calls = QSpinBox()
+        self.blocking_calls.setRange(1, 256)
+        self.blocking_calls.setValue(int(self.settings.value("blocking_calls", 16)))
+        self.blocking_calls.setToolTip("Threads shared by all accounts for logins and uploads")
+        
+        engine_layout.addRow(self.asyncio_engine)
+        self.session_check_minutes = QSpinBox()
+        self.session_check_minutes.setRange(0, 7 * 24 * 60)
+        self.session_check_minutes.setValue(int(self.settings.value("session_check_minutes", 360)))
+        self.session_check_minutes.setSuffix(" min")
+        self.session_check_minutes.setSpecialValueText("Every login")
+        self.session_check_minutes.setToolTip("How long a checked saved session is trusted without checking it again")
+        
+        self.metrics_port = QSpinBox()
+        self.metrics_port.setRange(0, 65535)
+        self.metrics_port.setValue(int(self.settings.value("metrics_port", 0)))
+        self.metrics_port.setSpecialValueText("Disabled")
+        self.metrics_port.setToolTip("Serve Prometheus metrics on 127.0.0.1 (restart required)")
+        
+        engine_layout.addRow("Concurrent API Calls:", self.blocking_calls)
+        engine_layout.addRow("Session Check Interval:", self.session_check_minutes)
+        engine_layout.addRow("Metrics Port:", self.metrics_port)
+        engine_group.setLayout(engine_layout)
+        
         # Layout for general tab
         general_layout.addWidget(paths_group)
         general_layout.addWidget(behavior_group)
+        general_layout.addWidget(images_group)
+        general_layout.addWidget(engine_group)
         general_tab.setLayout(general_layout)
         
         # Delays tab
@@ -234,9 +468,34 @@ class SettingsWidget(QWidget):
         delays_layout.addWidget(post_group)
         delays_tab.setLayout(delays_layout)
         
+        # Captions tab
+        captions_tab = QWidget()
+        captions_layout = QFormLayout()
+        
+        self.caption_template = QPlainTextEdit(self.settings.value("caption_template", ""))
+        self.caption_template.setPlaceholderText("{caption}\n\n{#travel:10}\n{signature}")
+        self.caption_template.setToolTip(
+            "Applied to every post; empty posts captions as written.\n"
+            "{column} inserts a CSV column, {#pool} or {#pool:N} hashtags from a pool, "
+            "{signature} the account signature."
+        )
+        
+        self.hashtag_pools = QPlainTextEdit(self.settings.value("hashtag_pools", ""))
+        self.hashtag_pools.setPlaceholderText("travel: #travel #wanderlust #explore\nfood: #foodie #yum")
+        self.hashtag_pools.setToolTip("One pool per line; each post gets its own rotation of the pool")
+        
+        self.caption_signature = QLineEdit(self.settings.value("caption_signature", ""))
+        self.caption_signature.setToolTip("Accounts can set their own in the Accounts tab")
+        
+        captions_layout.addRow("Caption Template:", self.caption_template)
+        captions_layout.addRow("Hashtag Pools:", self.hashtag_pools)
+        captions_layout.addRow("Signature:", self.caption_signature)
+        captions_tab.setLayout(captions_layout)
+        
         # Add tabs to tab widget
         tabs.addTab(general_tab, "General")
         tabs.addTab(delays_tab, "Delays")
+        tabs.addTab(captions_tab, "Captions")
         
         # Add tab widget to main layout
         layout.addWidget(tabs)
@@ -260,16 +519,53 @@ class SettingsWidget(QWidget):
         if folder:
             sender.setText(folder)
     
+    def browse_queue_db(self):
+        current = self.queue_db.text()
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Select Queue Database", current or os.getcwd(),
+            "SQLite Databases (*.db *.sqlite);;All Files (*)"
+        )
+        
+        if file_path:
+            self.queue_db.setText(file_path)
+    
     def save_settings(self):
+        template = self.caption_template.toPlainText()
+        if template.strip():
+            try:
+                CaptionRenderer({'default': template}, parse_pools(self.hashtag_pools.toPlainText()))
+            except TemplateError as e:
+                QMessageBox.critical(self, "Invalid Caption Template", str(e))
+                return
+        
         # Save path settings
         self.settings.setValue("session_dir", self.session_dir.text())
         self.settings.setValue("log_dir", self.log_dir.text())
+        self.settings.setValue("queue_db", self.queue_db.text())
         
         # Save behavior settings
         self.settings.setValue("hashtags_in_comment", 
                               "true" if self.hashtags_in_comment.isChecked() else "false")
         self.settings.setValue("repost_existing", 
                               "true" if self.repost_existing.isChecked() else "false")
+        self.settings.setValue("dedup", "true" if self.dedup.isChecked() else "false")
+        self.settings.setValue("dedup_captions", "true" if self.dedup_captions.isChecked() else "false")
+        self.settings.setValue("queue_backend", self.queue_backend.currentData())
+        self.settings.setValue("timezone", self.timezone.text().strip())
+        self.settings.setValue("preprocess_images",
+                              "true" if self.preprocess_images.isChecked() else "false")
+        self.settings.setValue("jpeg_quality", self.jpeg_quality.value())
+        self.settings.setValue("lookahead_posts", self.lookahead_posts.value())
+        self.settings.setValue("asyncio_engine",
+                              "true" if self.asyncio_engine.isChecked() else "false")
+        self.settings.setValue("blocking_calls", self.blocking_calls.value())
+        self.settings.setValue("metrics_port", self.metrics_port.value())
+        self.settings.setValue("session_check_minutes", self.session_check_minutes.value())
+        
+        # Save caption templating
+        self.settings.setValue("caption_template", template)
+        self.settings.setValue("hashtag_pools", self.hashtag_pools.toPlainText())
+        self.settings.setValue("caption_signature", self.caption_signature.text().strip())
         
         # Save delay settings
         self.settings.setValue("api_delay_min", self.api_min.value())
@@ -280,3 +576,359 @@ class SettingsWidget(QWidget):
         self.settings.sync()
         
         QMessageBox.information(self, "Settings Saved", "Your settings have been saved.")
+
+
+class AccountsDashboard(QWidget):
+    """Runs many accounts from one window through the orchestrator"""
+
+    COLUMNS = ["Account", "Username", "Status", "Progress", "Last Message"]
+
+    def __init__(self, registry, orchestrator, base_config):
+        super().__init__()
+        self.registry = registry
+        self.orchestrator = orchestrator
+        self.base_config = base_config  # Callable returning the global worker config
+        self.rows = {}
+        
+        layout = QVBoxLayout()
+        
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(4, QHeaderView.Stretch)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.doubleClicked.connect(self.edit_account)
+        
+        # Account management buttons
+        manage_layout = QHBoxLayout()
+        self.add_btn = QPushButton("Add Account")
+        self.add_btn.clicked.connect(self.add_account)
+        self.edit_btn = QPushButton("Edit")
+        self.edit_btn.clicked.connect(self.edit_account)
+        self.remove_btn = QPushButton("Remove")
+        self.remove_btn.clicked.connect(self.remove_account)
+        manage_layout.addWidget(self.add_btn)
+        manage_layout.addWidget(self.edit_btn)
+        manage_layout.addWidget(self.remove_btn)
+        manage_layout.addStretch()
+        
+        # Run control buttons
+        control_layout = QHBoxLayout()
+        self.start_all_btn = QPushButton("Start All")
+        self.start_all_btn.clicked.connect(self.start_all)
+        self.start_selected_btn = QPushButton("Start Selected")
+        self.start_selected_btn.clicked.connect(self.start_selected)
+        self.pause_selected_btn = QPushButton("Pause/Resume Selected")
+        self.pause_selected_btn.clicked.connect(self.toggle_pause_selected)
+        self.stop_selected_btn = QPushButton("Stop Selected")
+        self.stop_selected_btn.clicked.connect(self.stop_selected)
+        self.stop_all_btn = QPushButton("Stop All")
+        self.stop_all_btn.clicked.connect(lambda: self.orchestrator.stop())
+        
+        self.max_workers = QSpinBox()
+        self.max_workers.setRange(1, 1000)
+        self.max_workers.setValue(self.orchestrator.max_workers)
+        self.max_workers.valueChanged.connect(self.orchestrator.set_max_workers)
+        
+        control_layout.addWidget(self.start_all_btn)
+        control_layout.addWidget(self.start_selected_btn)
+        control_layout.addWidget(self.pause_selected_btn)
+        control_layout.addWidget(self.stop_selected_btn)
+        control_layout.addWidget(self.stop_all_btn)
+        control_layout.addStretch()
+        control_layout.addWidget(QLabel("Concurrent accounts:"))
+        control_layout.addWidget(self.max_workers)
+        
+        layout.addWidget(QLabel("<b>Accounts:</b>"))
+        layout.addWidget(self.table)
+        layout.addLayout(manage_layout)
+        layout.addLayout(control_layout)
+        self.setLayout(layout)
+        
+        self.orchestrator.account_status.connect(self.on_status)
+        self.orchestrator.account_progress.connect(self.on_progress)
+        self.orchestrator.account_log.connect(self.on_log)
+        self.orchestrator.require_2fa.connect(self.show_2fa)
+        self.orchestrator.require_challenge.connect(self.show_challenge)
+        
+        self.reload()
+
+    def reload(self):
+        self.table.setRowCount(0)
+        self.rows = {}
+        for account in self.registry.accounts:
+            row = self.table.rowCount()
+            self.table.insertRow(row)
+            self.rows[account['name']] = row
+            
+            self.table.setItem(row, 0, QTableWidgetItem(account['name']))
+            self.table.setItem(row, 1, QTableWidgetItem(account['username']))
+            status = "Queued" if self.orchestrator.is_active(account['name']) else "Idle"
+            if not account.get('enabled', True):
+                status = "Disabled"
+            self.table.setItem(row, 2, QTableWidgetItem(status))
+            progress = QProgressBar()
+            progress.setTextVisible(True)
+            self.table.setCellWidget(row, 3, progress)
+            self.table.setItem(row, 4, QTableWidgetItem(""))
+
+    def selected_names(self):
+        rows = sorted({index.row() for index in self.table.selectedIndexes()})
+        return [self.table.item(row, 0).text() for row in rows]
+
+    def add_account(self):
+        dialog = AccountDialog(parent=self)
+        if dialog.exec_():
+            self.save_account(dialog.get_account())
+
+    def edit_account(self):
+        names = self.selected_names()
+        if not names:
+            return
+        dialog = AccountDialog(self.registry.get(names[0]), parent=self)
+        if dialog.exec_():
+            self.save_account(dialog.get_account(), names[0])
+
+    def save_account(self, account, previous_name=None):
+        try:
+            self.registry.set(account, previous_name)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Could not save account: {str(e)}")
+        self.reload()
+
+    def remove_account(self):
+        for name in self.selected_names():
+            if self.orchestrator.is_active(name):
+                QMessageBox.warning(self, "Account Running", f"Stop {name} before removing it.")
+                continue
+            self.registry.remove(name)
+        self.reload()
+
+    def start_accounts(self, names):
+        configs = []
+        base_config = self.base_config()
+        for name in names:
+            account = self.registry.get(name)
+            if not account['username'] or not account['password']:
+                self.on_status(name, "Missing username or password")
+                continue
+            configs.append(account_config(account, base_config))
+        self.orchestrator.start(configs)
+
+    def start_all(self):
+        self.start_accounts([a['name'] for a in self.registry.accounts if a.get('enabled', True)])
+
+    def start_selected(self):
+        self.start_accounts(self.selected_names())
+
+    def stop_selected(self):
+        for name in self.selected_names():
+            self.orchestrator.stop(name)
+
+    def toggle_pause_selected(self):
+        for name in self.selected_names():
+            worker = self.orchestrator.worker(name)
+            if worker is None:
+                continue
+            if worker.paused:
+                worker.resume()
+            else:
+                worker.pause()
+
+    def on_status(self, name, status):
+        if name in self.rows:
+            self.table.item(self.rows[name], 2).setText(status)
+
+    def on_progress(self, name, current, total):
+        if name in self.rows:
+            progress = self.table.cellWidget(self.rows[name], 3)
+            progress.setMaximum(total)
+            progress.setValue(current)
+
+    def on_log(self, name, message, level):
+        if name in self.rows:
+            self.table.item(self.rows[name], 4).setText(message)
+
+    def show_2fa(self, name):
+        dialog = AuthDialog(
+            f"Two-Factor Authentication Required for {name}",
+            "Enter the code sent to your phone or authentication app:"
+        )
+        worker = self.orchestrator.worker(name)
+        if dialog.exec_() and worker is not None:
+            worker.complete_2fa(dialog.get_code())
+        elif worker is not None:
+            worker.stop()
+
+    def show_challenge(self, name, username):
+        dialog = AuthDialog(
+            f"Verification Required for {username} ({name})",
+            "Enter the verification code sent by Instagram:"
+        )
+        worker = self.orchestrator.worker(name)
+        if dialog.exec_() and worker is not None:
+            worker.complete_challenge(dialog.get_code())
+
+
+class MetricsPanel(QWidget):
+    """Live table of the metrics registry: stage timings, counters and queue depth"""
+
+    REFRESH_MS = 1000
+
+    def __init__(self, registry, exporter_url=None):
+        super().__init__()
+        self.registry = registry
+        
+        layout = QVBoxLayout()
+        if exporter_url:
+            self.exporter_label = QLabel(f"Prometheus metrics at <a href=\"{exporter_url}\">{exporter_url}</a>")
+            self.exporter_label.setOpenExternalLinks(True)
+        else:
+            self.exporter_label = QLabel("Prometheus exporter disabled (set a metrics port in Settings)")
+        
+        self.table = QTableWidget(0, 4)
+        self.table.setHorizontalHeaderLabels(["Account", "Metric", "Labels", "Value"])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        
+        layout.addWidget(self.exporter_label)
+        layout.addWidget(self.table)
+        self.setLayout(layout)
+        
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(self.REFRESH_MS)
+
+    def refresh(self):
+        # Nothing to redraw while the tab is hidden
+        if not self.isVisible():
+            return
+        rows = self.registry.snapshot()
+        self.table.setRowCount(len(rows))
+        for i, (name, kind, labels, value) in enumerate(rows):
+            account = labels.pop('account', '')
+            if kind == 'histogram':
+                count, total, longest = value
+                text = f"{count} x {total / count:.2f}s avg, {longest:.2f}s max" if count else "0"
+            else:
+                text = f"{value:g}"
+            cells = (
+                account,
+                name.replace('instagram_', '', 1),
+                ", ".join(f"{k}={v}" for k, v in labels.items()),
+                text,
+            )
+            for column, cell in enumerate(cells):
+                item = self.table.item(i, column)
+                if item is None:
+                    self.table.setItem(i, column, QTableWidgetItem(cell))
+                elif item.text() != cell:
+                    item.setText(cell)
+
+
+class LogPane(QWidget):
+    """Activity log keeping the last MAX_LINES entries.
+
+    Messages are buffered and appended in one batch every FLUSH_MS, so a
+    burst from many accounts costs one repaint. Level and account filters
+    are applied to the buffered entries, not to the document.
+    """
+
+    MAX_LINES = 5000
+    FLUSH_MS = 250
+    LEVELS = {"debug": 0, "info": 1, "warning": 2, "error": 3}
+
+    def __init__(self):
+        super().__init__()
+        self.entries = deque(maxlen=self.MAX_LINES)  # (time, level, account, message)
+        self.pending = deque(maxlen=self.MAX_LINES)
+        self.accounts = set()
+        
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        
+        filters = QHBoxLayout()
+        self.level_filter = QComboBox()
+        self.level_filter.addItem("All levels", "debug")
+        self.level_filter.addItem("Info and above", "info")
+        self.level_filter.addItem("Warnings and errors", "warning")
+        self.level_filter.addItem("Errors only", "error")
+        self.level_filter.setCurrentIndex(1)
+        self.level_filter.currentIndexChanged.connect(self.refilter)
+        self.account_filter = QComboBox()
+        self.account_filter.addItem("All accounts", None)
+        self.account_filter.currentIndexChanged.connect(self.refilter)
+        filters.addWidget(QLabel("Show:"))
+        filters.addWidget(self.level_filter)
+        filters.addWidget(self.account_filter)
+        filters.addStretch()
+        
+        self.view = QPlainTextEdit()
+        self.view.setReadOnly(True)
+        self.view.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.view.setMaximumBlockCount(self.MAX_LINES)
+        self.view.setStyleSheet("font-family: monospace;")
+        
+        layout.addLayout(filters)
+        layout.addWidget(self.view)
+        self.setLayout(layout)
+        
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(self.FLUSH_MS)
+        self.flush_timer.timeout.connect(self.flush)
+
+    def append(self, message, level="info", account=""):
+        entry = (datetime.now().strftime('%H:%M:%S'), level, account, message)
+        self.entries.append(entry)
+        self.pending.append(entry)
+        if account and account not in self.accounts:
+            self.accounts.add(account)
+            self.account_filter.addItem(account, account)
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def matches(self, entry):
+        _, level, account, _ = entry
+        selected = self.account_filter.currentData()
+        if selected is not None and account != selected:
+            return False
+        return self.LEVELS.get(level, 1) >= self.LEVELS[self.level_filter.currentData()]
+
+    @staticmethod
+    def format(entry):
+        now, level, account, message = entry
+        prefix = f"[{now}]"
+        if level in ("warning", "error"):
+            prefix += f" {level.upper()}:"
+        if account:
+            prefix += f" [{account}]"
+        return f"{prefix} {message}"
+
+    def flush(self):
+        lines = [self.format(entry) for entry in self.pending if self.matches(entry)]
+        self.pending.clear()
+        if not lines:
+            return
+        # Only follow the output if the user hasn't scrolled up to read
+        scrollbar = self.view.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 2
+        self.view.appendPlainText("\n".join(lines))
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
+
+    def refilter(self):
+        self.pending.clear()
+        self.view.setPlainText("\n".join(self.format(entry) for entry in self.entries if self.matches(entry)))
+        self.view.verticalScrollBar().setValue(self.view.verticalScrollBar().maximum())
+
+    def clear(self):
+        self.entries.clear()
+        self.pending.clear()
+        self.view.clear()
+
+    def text(self):
+        """Everything currently shown, for saving"""
+        self.flush()
+        return self.view.toPlainText()